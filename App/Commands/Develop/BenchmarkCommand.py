@@ -0,0 +1,403 @@
+import argparse
+import json
+import os
+import socket
+import time
+import timeit
+from threading import Thread
+from typing import Callable, List, Optional
+
+from App.Core.Abstract import AbstractCommand
+from App.Core.Network.Client import ClientConfig, TcpClient, ResponseDataPromise, MessageReceiver
+from App.Core.Network.Protocol import RCLProtocol, CallRequest
+from App.Core.Network.Protocol.Compression import Compression
+from App.Core.Network.Protocol.ProtoBuilder import ProtoBuilder
+from App.Core.Network.Protocol.ProtoCompiler import ProtoCompiler
+from App.Core.Network.Protocol.ProtoFileResolver import ProtoFileResolver
+from App.Core.Network.Protocol.Resolvers import CallMessageResolver
+from App.helpers import app
+from config import ROOT
+
+
+class BenchmarkCommand(AbstractCommand):
+    signature = 'benchmark'
+    help = 'Network protocol micro-benchmarks'
+
+    INDENT = 2
+
+    ENCODE_FILE_SIZES = {
+        '1 KB': 1024,
+        '10 MB': 1024 * 1024 * 10,
+        '200 MB': 1024 * 1024 * 200,
+    }
+
+    def __init__(self):
+        super(BenchmarkCommand, self).__init__()
+
+    def _parameters(self):
+        subparser = self._argument_parser.add_subparsers(title='subjects')
+
+        header_parser = subparser.add_parser('rcl-header', help='Per message headers encode/decode cost')
+        header_parser.add_argument('-n', '--number', type=int, default=100000, help='Messages count')
+        header_parser.set_defaults(func=self._exec_rcl_header)
+
+        encode_parser = subparser.add_parser('rcl-encode', help='Call encoding cost with different `file` sizes')
+        encode_parser.set_defaults(func=self._exec_rcl_encode)
+
+        idle_parser = subparser.add_parser('client-idle', help='CPU time of clients waiting for responses')
+        idle_parser.add_argument('-n', '--number', type=int, default=20, help='Requests count')
+        idle_parser.add_argument('-d', '--duration', type=float, default=3.0, help='Waiting time in seconds')
+        idle_parser.set_defaults(func=self._exec_client_idle)
+
+        compression_parser = subparser.add_parser('rcl-compression', help='Transfer time and CPU cost per codec')
+        compression_parser.add_argument('-p', '--path', type=str, default=f"{ROOT}/tests/images", help='Files dir')
+        compression_parser.add_argument('-b', '--bandwidth', type=float, default=10.0, help='Link speed, Mbit/s')
+        compression_parser.set_defaults(func=self._exec_rcl_compression)
+
+        schema_parser = subparser.add_parser('rcl-schema', help='Proto schema loading and call parameters encoding')
+        schema_parser.add_argument('-n', '--number', type=int, default=20000, help='Calls count')
+        schema_parser.set_defaults(func=self._exec_rcl_schema)
+
+        response_parser = subparser.add_parser('rcl-response', help='JSON and binary responses size and cost')
+        response_parser.add_argument('-n', '--number', type=int, default=2000, help='Responses count')
+        response_parser.add_argument('-c', '--count', type=int, default=100, help='Devices in inventory response')
+        response_parser.set_defaults(func=self._exec_rcl_response)
+
+        receive_parser = subparser.add_parser('rcl-receive', help='Large response receiving cost')
+        receive_parser.add_argument('-s', '--size', type=int, default=16, help='Response size, MB')
+        receive_parser.add_argument('-n', '--number', type=int, default=5, help='Responses count')
+        receive_parser.set_defaults(func=self._exec_rcl_receive)
+
+    def _measure(self, name: str, func: Callable, number: int) -> float:
+        per_call = min(timeit.repeat(func, number=number, repeat=3)) / number * 1_000_000
+
+        self._output.line(f"{name:<32}{per_call:>10.3f} us", indent=self.INDENT)
+
+        return per_call
+
+    def _compare(self, name: str, legacy: float, current: float):
+        self._output.line(f"{name:<32}{legacy / current:>10.2f} x", indent=self.INDENT)
+
+    def _exec_rcl_header(self, args: argparse.Namespace):
+        app().get('rcl')
+
+        validation = RCLProtocol.headers_validation()
+        message = RCLProtocol.create_message(RCLProtocol.RCL_MESSAGE_TYPE_CALL, b"\x00" * 64, 64)
+        view = memoryview(message)
+
+        def encode():
+            RCLProtocol.encode_header(1, RCLProtocol.RCL_MESSAGE_TYPE_CALL, 64)
+
+        def decode():
+            RCLProtocol.get_headers(view)
+
+        self._output.header(f"RCL headers ({args.number} messages):")
+
+        try:
+            RCLProtocol.set_headers_validation(True)
+            legacy_encode = self._measure("Encode (field by field)", encode, args.number)
+            legacy_decode = self._measure("Decode (field by field)", decode, args.number)
+
+            RCLProtocol.set_headers_validation(False)
+            struct_encode = self._measure("Encode (struct)", encode, args.number)
+            struct_decode = self._measure("Decode (struct)", decode, args.number)
+        finally:
+            RCLProtocol.set_headers_validation(validation)
+
+        self._compare("Encode speedup", legacy_encode, struct_encode)
+        self._compare("Decode speedup", legacy_decode, struct_decode)
+
+    def _exec_rcl_encode(self, _: argparse.Namespace):
+        config = app().get('config')
+        max_packet_size = config.get('rcl.max_packet_size')
+
+        # One message for the whole file to measure encoding without streaming
+        config.set('rcl.max_packet_size', max(self.ENCODE_FILE_SIZES.values()) * 2)
+
+        try:
+            rcl = app().new('rcl')
+        finally:
+            config.set('rcl.max_packet_size', max_packet_size)
+
+        for name, size in self.ENCODE_FILE_SIZES.items():
+            request = CallRequest('print', parameters={'device': 'benchmark', 'file': bytes(size), 'mime-type': 'PDF'})
+            number = max(1, min(10000, (1024 * 1024 * 64) // size))
+
+            self._output.header(f"Call with {name} file ({number} calls):")
+
+            buffers = self._measure("Buffers (scatter-gather)", lambda: rcl.create_request_buffers(request), number)
+            joined = self._measure("Joined bytes", lambda: rcl.create_request(request), number)
+
+            self._compare("Joining overhead", joined, buffers)
+            self._output.endl()
+
+    @staticmethod
+    def _silent_server(connections: List[socket.socket]) -> socket.socket:
+        """
+        Server which accepts connections and never responds.
+        """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+
+        def accept():
+            try:
+                while True:
+                    connections.append(server.accept()[0])
+            except OSError:
+                pass
+
+        Thread(target=accept, daemon=True).start()
+
+        return server
+
+    def _exec_client_idle(self, args: argparse.Namespace):
+        rcl = app().get('rcl')
+        log = app().get('log')
+
+        connections: List[socket.socket] = []
+        server = self._silent_server(connections)
+        config = ClientConfig('127.0.0.1', server.getsockname()[1], 4096, False, int(args.duration) + 10)
+
+        promises: List[ResponseDataPromise] = []
+
+        for _ in range(args.number):
+            client = TcpClient(config, rcl, log)
+            client.start()
+            promises.append(client.send(rcl.create_request_messages(CallRequest('ping'))))
+
+        waiters = [Thread(target=x.wait_result, daemon=True) for x in promises]
+
+        for waiter in waiters:
+            waiter.start()
+
+        cpu_start, wall_start = time.process_time(), time.monotonic()
+        time.sleep(args.duration)
+        cpu, wall = time.process_time() - cpu_start, time.monotonic() - wall_start
+
+        self._output.header(f"{args.number} requests waiting for response ({wall:.1f} s):")
+        self._output.line(f"{'CPU time':<32}{cpu * 1000:>10.3f} ms", indent=self.INDENT)
+        self._output.line(f"{'CPU load':<32}{cpu / wall * 100:>10.2f} %", indent=self.INDENT)
+
+        server.close()
+
+        for connection in connections:
+            connection.close()
+
+        wakeup_start = time.monotonic()
+
+        for waiter in waiters:
+            waiter.join()
+
+        wakeup = (time.monotonic() - wakeup_start) * 1000
+
+        self._output.line(f"{'Wake up after server close':<32}{wakeup:>10.3f} ms", indent=self.INDENT)
+
+    def _compression_line(self, name: str, blocks: List[bytes], codec: Optional[str], args: argparse.Namespace):
+        compression: Compression = app().get('rcl').compression()
+        code = Compression.CODECS.get(codec)
+
+        start = time.process_time()
+        compressed = [compression.compress(codec, [x]) if codec else x for x in blocks]
+        encode = time.process_time() - start
+
+        start = time.process_time()
+
+        for data in compressed:
+            if codec:
+                Compression.decompress(code, data)
+
+        decode = time.process_time() - start
+
+        # Incompressible blocks are sent as is
+        size = sum(min(len(x) + Compression.CODEC_LEN, len(y)) if codec else len(x) for x, y in zip(compressed, blocks))
+        transfer = size * 8 / (args.bandwidth * 1_000_000)
+        total = encode + transfer + decode
+
+        self._output.line(
+            f"{name:<14}{size / 1024:>10.1f} KB{encode * 1000:>10.1f} ms{decode * 1000:>10.1f} ms"
+            f"{transfer * 1000:>10.1f} ms{total * 1000:>10.1f} ms",
+            indent=self.INDENT
+        )
+
+    def _exec_rcl_compression(self, args: argparse.Namespace):
+        chunk_size = app().get('rcl').stream_chunk_size()
+
+        self._output.line(
+            f"{'Codec':<14}{'Size':>13}{'Encode':>13}{'Decode':>13}{'Transfer':>13}{'Total':>13}",
+            indent=self.INDENT
+        )
+
+        for filename in sorted(os.listdir(args.path)):
+            with open(os.path.join(args.path, filename), 'rb') as f:
+                data = f.read()
+
+            for block_name, block_size in (('message', len(data)), ('stream chunks', chunk_size)):
+                blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+
+                self._output.header(f"{filename} as {block_name} ({args.bandwidth} Mbit/s):")
+
+                for codec in [None, *Compression.CODECS.keys()]:
+                    self._compression_line(codec or 'none', blocks, codec, args)
+
+                self._output.endl()
+
+    def _exec_rcl_schema(self, args: argparse.Namespace):
+        config = app().get('config')
+        compiler = ProtoCompiler(config, app().get('log'))
+        builder = ProtoBuilder(*compiler.compile())
+        resolver = CallMessageResolver()
+
+        self._output.header("Proto schema loading:")
+
+        parse = self._measure("Parse proto file", lambda: ProtoBuilder(*ProtoFileResolver(config).parse()), 100)
+        cached = self._measure("Load compiled proto file", lambda: ProtoBuilder(*compiler.compile()), 100)
+
+        self._compare("Speedup", parse, cached)
+        self._output.endl()
+
+        parameters = {
+            'device': 'benchmark',
+            'copies': 2,
+            'paper-size': 'A4',
+            'pages': [1, 2, 3],
+            'mirror': True,
+            'file': b"\x00" * 128,
+            'mime-type': 'PDF',
+        }
+
+        codes = resolver.parse(resolver.create(builder.encode('print', [], parameters)))
+
+        self._output.header(f"Call 'print' parameters ({args.number} calls):")
+
+        def encode_generic():
+            builder.prepare_command('print', [], parameters)
+
+        def encode_compiled():
+            builder.encode('print', [], parameters)
+
+        generic_encode = self._measure("Encode (generic)", encode_generic, args.number)
+        compiled_encode = self._measure("Encode (compiled)", encode_compiled, args.number)
+        generic_decode = self._measure("Decode (generic)", lambda: builder.from_codes(**codes), args.number)
+        compiled_decode = self._measure("Decode (compiled)", lambda: builder.decode(**codes), args.number)
+
+        self._compare("Encode speedup", generic_encode, compiled_encode)
+        self._compare("Decode speedup", generic_decode, compiled_decode)
+
+    def _exec_rcl_response(self, args: argparse.Namespace):
+        rcl = app().get('rcl')
+
+        with open(f"{ROOT}/tests/dictionaries/devices.json") as f:
+            devices = json.load(f)
+
+        inventory = [
+            dict(devices[i % len(devices)], name=f"printer_{i}", scope=i, hidden=bool(i % 2))
+            for i in range(args.count)
+        ]
+
+        responses = {
+            'Devices': devices,
+            f"Inventory ({args.count} devices)": inventory,
+            'Mixed values': {'queue': [1, -2, 300000], 'ratio': 0.5, 'state': None, 'printer': inventory[0]},
+        }
+
+        for name, data in responses.items():
+            json_message = rcl.response_success(data)
+            binary_message = rcl.response_success(data, binary=True)
+
+            for message in [json_message, binary_message]:
+                if rcl.parse_response(message).data() != data:
+                    self._output.error_message(f"{name}: response data changed after round-trip")
+                    return
+
+            self._output.header(f"{name} ({args.number} responses):")
+
+            self._output.line(f"{'Size (json)':<32}{len(json_message):>10} B", indent=self.INDENT)
+            self._output.line(f"{'Size (binary)':<32}{len(binary_message):>10} B", indent=self.INDENT)
+
+            json_encode = self._measure("Encode (json)", lambda: rcl.response_success(data), args.number)
+            binary_encode = self._measure(
+                "Encode (binary)",
+                lambda: rcl.response_success(data, binary=True),
+                args.number
+            )
+            # Data of response is decoded lazily
+            json_decode = self._measure("Decode (json)", lambda: rcl.parse_response(json_message).data(), args.number)
+            binary_decode = self._measure(
+                "Decode (binary)",
+                lambda: rcl.parse_response(binary_message).data(),
+                args.number
+            )
+
+            self._compare("Size reduction", len(json_message), len(binary_message))
+            self._compare("Encode speedup", json_encode, binary_encode)
+            self._compare("Decode speedup", json_decode, binary_decode)
+            self._output.endl()
+
+    @staticmethod
+    def _receive_legacy(sock: socket.socket, recv_size: int) -> bytes:
+        """
+        Receiving by appending segments and checking CRC of the whole message after it.
+        """
+        data = b""
+
+        while len(data) < RCLProtocol.RCL_HEADERS_LENGTH:
+            data += sock.recv(recv_size)
+
+        length = RCLProtocol.message_length(RCLProtocol.get_data_length(data))
+
+        while len(data) < length:
+            data += sock.recv(recv_size)
+
+        if not RCLProtocol.check_crc(data, RCLProtocol.get_data_length(data)):
+            raise Exception("Crc check failed")
+
+        return data
+
+    def _exec_rcl_receive(self, args: argparse.Namespace):
+        size = args.size * 1024 * 1024
+        message = RCLProtocol.create_message(RCLProtocol.RCL_MESSAGE_TYPE_RETURN, os.urandom(size), size)
+        recv_size = int(app().get('config').get('client.max_bytes_receive'))
+
+        def receive(func: Callable[[socket.socket], bytes]) -> float:
+            cpu = 0.0
+
+            # One message per connection: legacy receiving can read the beginning of the next message
+            for _ in range(args.number):
+                sender, receiver = socket.socketpair()
+                writer = Thread(target=sender.sendall, args=(message,), daemon=True)
+
+                start = time.process_time()
+                writer.start()
+
+                if len(func(receiver)) != len(message):
+                    raise Exception("Message is received partially")
+
+                writer.join()
+                cpu += time.process_time() - start
+
+                sender.close()
+                receiver.close()
+
+            return cpu / args.number * 1000
+
+        def receive_current(sock: socket.socket) -> bytes:
+            data, crc_ok = MessageReceiver(sock, recv_size).receive()
+
+            if not crc_ok:
+                raise Exception("Crc check failed")
+
+            return data
+
+        self._output.header(f"Receive {args.size} MB response ({args.number} responses, CPU per response):")
+
+        legacy = receive(lambda x: self._receive_legacy(x, recv_size))
+        current = receive(receive_current)
+
+        self._output.line(f"{'Append segments + CRC':<32}{legacy:>10.3f} ms", indent=self.INDENT)
+        self._output.line(f"{'recv_into + running CRC':<32}{current:>10.3f} ms", indent=self.INDENT)
+
+        self._compare("Speedup", legacy, current)
+
+    def _execute(self, args: argparse.Namespace):
+        pass
@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+import uuid
+from dataclasses import replace
+from typing import Callable, Optional, Tuple
+
+from App.Core.Abstract import AbstractCommand
+from App.Core.Network.Client import ClientConfig, TcpClient, AsyncBridge, ResponseSink
+from App.Core.Network.Protocol import RCLProtocol, CallRequest
+from App.Core.Network.Proxy import FaultProxy, Faults
+from App.helpers import app
+from config import ROOT
+
+# Scenario result: passed, details
+Result = Tuple[bool, str]
+
+
+class ProxyCommand(AbstractCommand):
+    signature = 'proxy'
+    help = 'TCP proxy to the configured server with network faults'
+
+    INDENT = 2
+
+    # Max memory of client receiving a scan through slow proxy
+    MAX_SCAN_MEMORY = 8 * 1024 * 1024
+
+    def __init__(self):
+        super(ProxyCommand, self).__init__()
+
+    def _parameters(self):
+        subparser = self._argument_parser.add_subparsers(title='subjects')
+
+        run_parser = subparser.add_parser('run', help='Proxy client connections until interrupted')
+        run_parser.add_argument('-l', '--listen', type=int, default=0, help='Proxy port, random free port if 0')
+        run_parser.add_argument('--latency', type=float, default=0, help='Delay of every chunk, ms')
+        run_parser.add_argument('--jitter', type=float, default=0, help='Random extra delay up to, ms')
+        run_parser.add_argument('--bandwidth', type=float, default=0, help='Speed of every direction, KB/s')
+        run_parser.add_argument('--fragment', type=int, default=0, help='Max bytes sent at once')
+        run_parser.add_argument('--reset-after', type=int, default=0, help='Reset connections after bytes')
+        run_parser.add_argument('--reset-rate', type=float, default=0, help='Reset probability per chunk')
+        run_parser.add_argument('--stall', type=float, default=0, help='Stall connections once for seconds')
+        run_parser.add_argument('--stall-after', type=int, default=0, help='Stall after bytes')
+        run_parser.add_argument('--stall-rate', type=float, default=0, help='Stall probability per chunk')
+        run_parser.add_argument('--corrupt-at', type=int, default=-1, help='Invert byte of responses at offset')
+        run_parser.add_argument('--seed', type=int, default=None, help='Seed of random faults')
+        run_parser.set_defaults(func=self._exec_run)
+
+        check_parser = subparser.add_parser('check', help='Check client under network faults')
+        check_parser.add_argument('-s', '--scan', help='Check memory of scan through slow proxy', action='store_true')
+        check_parser.add_argument(
+            '-b', '--breaker', help='Check cancelled trial of half-open circuit breaker', action='store_true'
+        )
+        check_parser.set_defaults(func=self._exec_check)
+
+    @staticmethod
+    def _faults(args: argparse.Namespace) -> Faults:
+        return Faults(
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            bandwidth=int(args.bandwidth * 1024),
+            fragment=args.fragment,
+            reset_after=args.reset_after,
+            reset_rate=args.reset_rate,
+            stall=args.stall,
+            stall_after=args.stall_after,
+            stall_rate=args.stall_rate,
+            corrupt_at=args.corrupt_at,
+        )
+
+    def _exec_run(self, args: argparse.Namespace):
+        config = ClientConfig.client()
+        proxy = FaultProxy((config.address, config.port), self._faults(args), app().get('log'), args.seed)
+
+        async def serve():
+            port = await proxy.start('127.0.0.1', args.listen)
+
+            self._output.success_message(f"Proxy 127.0.0.1:{port} -> {config.server_name()}. Press Ctrl+C to stop")
+
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await proxy.close()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+
+        self._output.header('Proxy stats:')
+
+        for name, value in proxy.stats().items():
+            self._output.line(f"{name:<16}{value:>10}", indent=self.INDENT)
+
+    def _exec_check(self, args: argparse.Namespace):
+        """
+        Drive clients through proxy to the configured server: calls succeed under latency and fragmentation, fail with
+        CRC error on corrupted responses and fail in time on resets and stalls.
+        """
+        config = ClientConfig.client()
+
+        checks = [
+            ('latency', Faults(latency=0.2, jitter=0.05), self._check_latency),
+            ('fragments', Faults(fragment=7, bandwidth=256 * 1024), self._check_fragments),
+            ('crc', Faults(corrupt_at=RCLProtocol.RCL_HEADERS_LENGTH), self._check_crc),
+            ('reset', Faults(reset_after=1), self._check_reset),
+            ('stall', Faults(stall=60), self._check_stall),
+            ('timeout', Faults(stall=60), self._check_timeout),
+        ]
+
+        if args.scan:
+            checks.append(('scan memory', Faults(fragment=1024, bandwidth=4 * 1024 * 1024), self._check_scan))
+
+        if args.breaker:
+            checks.append(('breaker', Faults(latency=1), self._check_breaker))
+
+        failed = 0
+
+        for name, faults, check in checks:
+            passed, details = self._check(config, faults, check)
+            failed += 0 if passed else 1
+
+            self._output.line(f"{name:<16}{'ok' if passed else 'FAILED':<8}{details}", indent=self.INDENT)
+
+        if failed:
+            self._output.error_message(f"{failed} of {len(checks)} checks failed")
+        else:
+            self._output.success_message(f"All {len(checks)} checks passed")
+
+    @staticmethod
+    def _check(config: ClientConfig, faults: Faults, check: Callable[[ClientConfig], Result]) -> Result:
+        """
+        Run check with client config of new proxy. Every check has own proxy port, so pooled connections and circuit
+        breakers of previous checks do not affect it.
+        """
+        proxy = FaultProxy((config.address, config.port), faults, app().get('log'))
+        port = AsyncBridge.submit(proxy.start()).result()
+
+        try:
+            return check(config.for_server('127.0.0.1', port))
+        except Exception as e:
+            return False, f"{e.__class__.__name__}: {e}"
+        finally:
+            AsyncBridge.submit(proxy.close()).result()
+
+    @staticmethod
+    def _ping(config: ClientConfig, timeout: Optional[float] = None) -> Tuple[bool, object, float]:
+        started = time.monotonic()
+        promise = app().get('network.manager').request(CallRequest('ping'), config)
+
+        if timeout:
+            promise = promise.with_timeout(timeout)
+
+        ok, result = promise.wait_result()
+
+        return ok, result, time.monotonic() - started
+
+    @staticmethod
+    def _direct(config: ClientConfig, request: CallRequest) -> Tuple[bool, object, float]:
+        rcl = app().get('rcl')
+        client = TcpClient(config, rcl, app().get('log'))
+        started = time.monotonic()
+
+        client.start()
+        ok, result = client.send(rcl.create_request_messages(request)).wait_result()
+
+        return ok, result, time.monotonic() - started
+
+    def _check_latency(self, config: ClientConfig) -> Result:
+        ok, result, elapsed = self._ping(config)
+
+        return ok and elapsed >= 0.2, f"ping in {elapsed:.2f} s with 200 ms latency"
+
+    def _check_fragments(self, config: ClientConfig) -> Result:
+        request = CallRequest('printers', ['list'])
+        ok, result, elapsed = self._direct(config, request)
+        expected_ok, expected, _ = self._direct(ClientConfig.client(), request)
+
+        if not ok:
+            return False, f"printers list failed: {result}"
+
+        same = expected_ok and result.data() == expected.data()
+
+        return same, f"printers list in {elapsed:.2f} s by 7 bytes, {'same' if same else 'other'} data"
+
+    def _check_crc(self, config: ClientConfig) -> Result:
+        ok, result, elapsed = self._direct(config, CallRequest('ping'))
+
+        return not ok and 'Crc' in str(result), f"corrupted ping: {result if not ok else 'accepted'}"
+
+    def _check_reset(self, config: ClientConfig) -> Result:
+        ok, result, elapsed = self._ping(config)
+
+        return not ok and elapsed < config.timeout, f"ping failed in {elapsed:.2f} s: {result}"
+
+    def _check_stall(self, config: ClientConfig) -> Result:
+        # Pooled connection exchanges capabilities with server while connecting
+        ok, result, elapsed = self._ping(config, 1)
+
+        passed = not ok and elapsed < 1.5 + config.connect_timeout
+
+        return passed, f"ping with 1 s timeout failed in {elapsed:.2f} s: {result}"
+
+    def _check_timeout(self, config: ClientConfig) -> Result:
+        ok, result, elapsed = self._direct(replace(config, timeout=2), CallRequest('ping'))
+
+        return not ok and elapsed < 3, f"ping with 2 s socket timeout failed in {elapsed:.2f} s: {result}"
+
+    def _check_breaker(self, config: ClientConfig) -> Result:
+        # Open breaker lets the trial call through after reset timeout
+        breaker = app().get('network.manager').circuit_breaker(config)
+
+        while breaker.state() != breaker.STATE_OPEN:
+            breaker.failure()
+
+        time.sleep(breaker.retry_after())
+
+        # Deadline cancels the trial in flight
+        if app().get('network.manager').request(CallRequest('ping'), config, 0.5).wait_result()[0]:
+            return False, 'trial ping with 0.5 s deadline succeeded with 1 s latency'
+
+        ok, result, elapsed = self._ping(config, 10)
+
+        state = breaker.state()
+
+        return ok and state == breaker.STATE_CLOSED, f"ping after cancelled trial: {'ok' if ok else result}, {state}"
+
+    def _check_scan(self, config: ClientConfig) -> Result:
+        path = os.path.join(ROOT, 'tests', f"scan_{uuid.uuid4().hex}.tiff")
+
+        tracemalloc.start()
+
+        try:
+            promise = app().get('network.manager').request(CallRequest('scan'), config, None, ResponseSink(path))
+            ok, result = promise.wait_result()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        if not ok:
+            return False, f"scan failed: {result}"
+
+        size = os.path.getsize(path)
+        os.remove(path)
+
+        passed = peak < self.MAX_SCAN_MEMORY
+
+        return passed, f"scan of {size / 1024 / 1024:.1f} MB, peak memory {peak / 1024 / 1024:.1f} MB"
+
+    def _execute(self, args: argparse.Namespace):
+        pass
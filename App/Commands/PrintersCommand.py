@@ -4,6 +4,7 @@ from App.Core.Abstract import AbstractCommand
 from App.Core.Console import Output
 from App.Core.Network.Client import ClientConfig
 from App.Services import PrinterService
+from App.Services.Client.ClientPrinterService import ClientPrinterService
 from App.helpers import app
 
 
@@ -30,6 +31,21 @@ class PrintersCommand(AbstractCommand):
         update_cache_parser.add_argument('-o', '--out', help='Show printers list', action="store_true")
         update_cache_parser.set_defaults(func=self._exec_update_cache)
 
+        servers_parser = subparser.add_parser('servers', help='Ping print servers and rank them by latency')
+        servers_parser.set_defaults(func=self._exec_servers)
+
+    def _exec_servers(self, _: argparse.Namespace):
+        config = ClientConfig.client()
+        latencies = self.__network_manager.probe(config)
+
+        self.__console.header("Servers:")
+
+        for server in self.__network_manager.servers(config):
+            latency = latencies.get(server.server_name())
+            state = f"{latency * 1000:.2f} ms" if latency is not None else "unavailable"
+
+            self.__console.line(f"{server.server_name():<32}{state}", indent=self.__services.INDENT)
+
     def _exec_update_cache(self, args: argparse.Namespace):
         out = args.out or False
 
@@ -51,7 +67,7 @@ class PrintersCommand(AbstractCommand):
         printers = (
             self.__services.get_printers()
             if local
-            else self.__services.get_printers_by_network(ClientConfig.client(), self.__network_manager)
+            else ClientPrinterService().get_printers_by_network(ClientConfig.client(), self.__network_manager)
         )
 
         self.__services.printers_console_out(printers)
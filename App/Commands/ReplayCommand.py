@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+from threading import Thread, Lock, Event
+from typing import List, Dict
+
+from App.Core.Abstract import AbstractCommand
+from App.Core.Network.Client import ClientConfig, TcpClient
+from App.Core.Network.Tracing import Capture, Histogram
+from App.helpers import app
+
+
+class ReplayCommand(AbstractCommand):
+    signature = 'replay'
+    help = 'Replay captured client traffic against a server'
+
+    INDENT = 2
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self):
+        super(ReplayCommand, self).__init__()
+
+        self.__capture: Capture = app().get('network.capture')
+
+    def _parameters(self):
+        subparser = self._argument_parser.add_subparsers(title='subjects')
+
+        run_parser = subparser.add_parser('run', help='Send captured calls to the configured server')
+        run_parser.add_argument('-p', '--path', type=str, default=self.__capture.path(), help='Capture file')
+        run_parser.add_argument('-f', '--fast', help='Send calls as fast as possible', action='store_true')
+        run_parser.add_argument('-s', '--speed', type=float, default=1.0, help='Rate of calls to the original rate')
+        run_parser.add_argument('-j', '--jobs', type=int, default=1, help='Parallel calls of fast replay')
+        run_parser.add_argument('-n', '--number', type=int, default=0, help='Replay first calls only')
+        run_parser.set_defaults(func=self._exec_run)
+
+        info_parser = subparser.add_parser('info', help='Calls and latencies of captured session')
+        info_parser.add_argument('-p', '--path', type=str, default=self.__capture.path(), help='Capture file')
+        info_parser.set_defaults(func=self._exec_info)
+
+        clear_parser = subparser.add_parser('clear', help='Remove capture file')
+        clear_parser.add_argument('-p', '--path', type=str, default=self.__capture.path(), help='Capture file')
+        clear_parser.set_defaults(func=self._exec_clear)
+
+    def _calls(self, path: str) -> List[dict]:
+        if not os.path.isfile(path):
+            self._output.error_message(f"No capture in {path}. Enable `client.capture` to collect calls")
+            return []
+
+        if not (calls := Capture.calls(path)):
+            self._output.error_message(f"No calls in {path}")
+
+        return calls
+
+    def _exec_info(self, args: argparse.Namespace):
+        if not (calls := self._calls(args.path)):
+            return
+
+        duration = max(x['time'] + (x['latency'] or 0.0) for x in calls) - calls[0]['time']
+        recorded = Histogram()
+
+        for call in calls:
+            if call['latency'] is not None:
+                recorded.add(call['latency'])
+
+        errors = sum(1 for x in calls if not x['ok'])
+
+        self._output.header(f"Captured {len(calls)} calls ({errors} errors) in {duration:.2f} s:")
+        self._transfer(len(calls), sum(x['bytes_out'] for x in calls), sum(x['bytes_in'] for x in calls), duration)
+        self._latency('latency', recorded)
+
+    def _exec_run(self, args: argparse.Namespace):
+        if not (calls := self._calls(args.path)):
+            return
+
+        if args.number > 0:
+            calls = calls[:args.number]
+
+        config = ClientConfig.client()
+        rcl, log = app().get('rcl'), app().get('log')
+        results: Dict[str, Histogram] = {'latency': Histogram(), 'recorded': Histogram(), 'lag': Histogram()}
+        counters = {'errors': 0, 'bytes_in': 0}
+        lock = Lock()
+
+        def replay(call: dict, due: float) -> Event:
+            done = Event()
+            started = time.perf_counter()
+            client = TcpClient(config, rcl, log)
+
+            def finish(ok: bool, received: int):
+                latency = time.perf_counter() - started
+
+                with lock:
+                    results['latency'].add(latency)
+                    results['lag'].add(max(0.0, started - due))
+                    counters['errors'] += 0 if ok else 1
+                    counters['bytes_in'] += received
+
+                    if call['latency'] is not None:
+                        results['recorded'].add(call['latency'])
+
+                done.set()
+
+            client.start()
+            promise = client.send(Capture.messages(args.path, call['requests']))
+            promise.then(lambda _: finish(True, len(promise.data()))).catch(lambda _: finish(False, 0))
+
+            return done
+
+        started_at = time.perf_counter()
+
+        if args.fast:
+            self._fast(calls, replay, max(1, min(args.jobs, len(calls))))
+        else:
+            self._paced(calls, replay, max(args.speed, 0.001), started_at)
+
+        duration = time.perf_counter() - started_at
+        mode = 'as fast as possible' if args.fast else f"at x{args.speed:g} of the original rate"
+
+        self._output.header(f"Replayed {len(calls)} calls {mode} ({counters['errors']} errors) in {duration:.2f} s:")
+        self._transfer(len(calls), sum(x['bytes_out'] for x in calls), counters['bytes_in'], duration)
+        self._latency('latency', results['latency'])
+        self._latency('recorded', results['recorded'])
+
+        if not args.fast:
+            self._latency('lag', results['lag'])
+
+    @staticmethod
+    def _fast(calls: List[dict], replay, jobs: int):
+        """
+        Every job sends the next call after response to the previous one.
+        """
+        pending = iter(calls)
+        lock = Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    call = next(pending, None)
+
+                if call is None:
+                    return
+
+                replay(call, time.perf_counter()).wait()
+
+        workers = [Thread(target=worker, daemon=True) for _ in range(jobs)]
+
+        for thread in workers:
+            thread.start()
+
+        for thread in workers:
+            thread.join()
+
+    @staticmethod
+    def _paced(calls: List[dict], replay, speed: float, started_at: float):
+        """
+        Calls are sent at offsets of capture divided by `speed`, without waiting for responses. Sending late is
+        reported as lag.
+        """
+        first = calls[0]['time']
+        waiting = []
+
+        for call in calls:
+            due = started_at + (call['time'] - first) / speed
+
+            if (delay := due - time.perf_counter()) > 0:
+                time.sleep(delay)
+
+            waiting.append(replay(call, due))
+
+        for done in waiting:
+            done.wait()
+
+    def _transfer(self, count: int, bytes_out: int, bytes_in: int, duration: float):
+        duration = max(duration, 1e-9)
+
+        self._output.line(f"{'calls':<12}{count / duration:>10.2f} /s", indent=self.INDENT)
+        self._output.line(f"{'bytes_out':<12}{bytes_out / 1024 / duration:>10.2f} KB/s", indent=self.INDENT)
+        self._output.line(f"{'bytes_in':<12}{bytes_in / 1024 / duration:>10.2f} KB/s", indent=self.INDENT)
+
+        columns = ''.join(f"{'p' + str(x):>10}" for x in self.PERCENTILES)
+
+        self._output.line(f"{'':<12}{columns}{'max':>10}", indent=self.INDENT)
+
+    def _latency(self, name: str, histogram: Histogram):
+        if not histogram.count():
+            return
+
+        values = ''.join(f"{histogram.percentile(x) * 1000:>10.2f}" for x in self.PERCENTILES)
+
+        self._output.line(f"{name:<12}{values}{histogram.max() * 1000:>10.2f} ms", indent=self.INDENT)
+
+    def _exec_clear(self, args: argparse.Namespace):
+        if os.path.isfile(args.path):
+            os.remove(args.path)
+
+        self._output.success_message('Capture removed')
+
+    def _execute(self, args: argparse.Namespace):
+        pass
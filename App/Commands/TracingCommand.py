@@ -0,0 +1,129 @@
+import argparse
+import os
+from threading import Thread
+from typing import List
+
+from App.Core.Abstract import AbstractCommand
+from App.Core.Network.Client import ClientConfig
+from App.Core.Network.Protocol import CallRequest
+from App.Core.Network.Tracing import Tracer, Histogram
+from App.Core.Network.Tracing.Tracer import Stats
+from App.helpers import app
+
+
+class TracingCommand(AbstractCommand):
+    signature = 'tracing'
+    help = 'Timings of network calls by phases'
+
+    INDENT = 2
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self):
+        super(TracingCommand, self).__init__()
+
+        self.__tracer: Tracer = app().get('network.tracer')
+
+    def _parameters(self):
+        subparser = self._argument_parser.add_subparsers(title='subjects')
+
+        report_parser = subparser.add_parser('report', help='Histograms of calls dumped by clients')
+        report_parser.add_argument('-p', '--path', type=str, default=self.__tracer.path(), help='JSON lines file')
+        report_parser.add_argument('-c', '--command', type=str, default=None, help='Show only command')
+        report_parser.set_defaults(func=self._exec_report)
+
+        run_parser = subparser.add_parser('run', help='Trace calls to the configured server')
+        run_parser.add_argument('-c', '--command', type=str, default='ping', help='Command with subcommands')
+        run_parser.add_argument('-n', '--number', type=int, default=100, help='Calls count')
+        run_parser.add_argument('-j', '--jobs', type=int, default=1, help='Parallel calls')
+        run_parser.add_argument('-d', '--dump', help='Append traces to dump file', action='store_true')
+        run_parser.set_defaults(func=self._exec_run)
+
+        clear_parser = subparser.add_parser('clear', help='Remove dump file')
+        clear_parser.add_argument('-p', '--path', type=str, default=self.__tracer.path(), help='JSON lines file')
+        clear_parser.set_defaults(func=self._exec_clear)
+
+    def _exec_report(self, args: argparse.Namespace):
+        if not os.path.isfile(args.path):
+            self._output.error_message(f"No traces in {args.path}. Enable `client.tracing.dump` to collect them")
+            return
+
+        with open(args.path, 'r') as file:
+            stats = Tracer.load(file)
+
+        if args.command:
+            stats = {k: v for k, v in stats.items() if k == args.command}
+
+        self._report(stats)
+
+    def _exec_run(self, args: argparse.Namespace):
+        manager = app().get('network.manager')
+        config = ClientConfig.client()
+        command, *subcommands = args.command.split()
+
+        self.__tracer.enable(True, args.dump)
+        self.__tracer.reset()
+
+        def worker(number: int):
+            for _ in range(number):
+                manager.request(CallRequest(command, subcommands, {}), config).wait_result()
+
+        jobs = max(1, min(args.jobs, args.number))
+        workers: List[Thread] = [
+            Thread(target=worker, args=(args.number // jobs + (1 if i < args.number % jobs else 0),), daemon=True)
+            for i in range(jobs)
+        ]
+
+        for thread in workers:
+            thread.start()
+
+        for thread in workers:
+            thread.join()
+
+        self._report(self.__tracer.stats())
+        self._coalescing(manager.coalescing_stats())
+
+    def _exec_clear(self, args: argparse.Namespace):
+        if os.path.isfile(args.path):
+            os.remove(args.path)
+
+        self._output.success_message('Traces removed')
+
+    def _report(self, stats: Stats):
+        if not stats:
+            self._output.error_message('No traces')
+            return
+
+        columns = ''.join(f"{'p' + str(x):>10}" for x in self.PERCENTILES)
+
+        for command, data in sorted(stats.items()):
+            self._output.header(f"{command} ({data['calls']} calls, {data['errors']} errors):")
+            self._output.line(f"{'':<12}{columns}{'max':>10}", indent=self.INDENT)
+
+            for name, histogram in data['metrics'].items():
+                if not histogram.count():
+                    continue
+
+                if name.startswith('bytes'):
+                    self._line(name, histogram, 1 / 1024, 'KB')
+                else:
+                    self._line(name, histogram, 1000, 'ms')
+
+            self._output.endl()
+
+    def _coalescing(self, stats: dict):
+        if not stats:
+            return
+
+        self._output.header("Coalesced calls (identical calls in flight):")
+
+        for command, data in sorted(stats.items()):
+            self._output.line(f"{command:<24}{data['coalesced']:>8} of {data['calls']}", indent=self.INDENT)
+
+    def _line(self, name: str, histogram: Histogram, scale: float, unit: str):
+        values = ''.join(f"{histogram.percentile(x) * scale:>10.2f}" for x in self.PERCENTILES)
+
+        self._output.line(f"{name:<12}{values}{histogram.max() * scale:>10.2f} {unit}", indent=self.INDENT)
+
+    def _execute(self, args: argparse.Namespace):
+        pass
@@ -1,5 +1,9 @@
 from .PrintersCommand import PrintersCommand
+from .ReplayCommand import ReplayCommand
+from .TracingCommand import TracingCommand
 
 __all__ = [
     "PrintersCommand",
+    "ReplayCommand",
+    "TracingCommand",
 ]
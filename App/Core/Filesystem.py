@@ -1,5 +1,6 @@
 import os
 import json
+import shutil
 import tempfile
 
 import yaml
@@ -119,7 +120,13 @@ class Filesystem:
     def move(path_from: str, path_to: str) -> bool:
         Filesystem._raise_is_not_a_file(path_from, 'move')
 
-        os.replace(Filesystem._prepare_path(path_from), Filesystem._prepare_path(path_to))
+        path_from, path_to = Filesystem._prepare_path(path_from), Filesystem._prepare_path(path_to)
+
+        try:
+            os.replace(path_from, path_to)
+        except OSError:
+            # Another filesystem (temporary dir), file is copied by parts
+            shutil.move(path_from, path_to)
 
         return True
 
@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import Future
+from threading import Thread, Lock
+from typing import Optional, Coroutine, Any, Callable
+
+from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
+from App.Core.Network.Protocol import RCL
+
+
+class AsyncBridge:
+    """
+    Runs coroutines from synchronous code (Qt UI, console commands) on a background event loop.
+
+    The caller thread is never blocked: result is returned as future or as `ResponseDataPromise`, which UI already
+    handles with signals.
+    """
+
+    __loop: Optional[asyncio.AbstractEventLoop] = None
+    __lock = Lock()
+
+    @staticmethod
+    def loop() -> asyncio.AbstractEventLoop:
+        with AsyncBridge.__lock:
+            if AsyncBridge.__loop is None:
+                AsyncBridge.__loop = asyncio.new_event_loop()
+
+                Thread(target=AsyncBridge.__loop.run_forever, daemon=True).start()
+
+            return AsyncBridge.__loop
+
+    @staticmethod
+    def submit(coroutine: Coroutine[Any, Any, Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, AsyncBridge.loop())
+
+    @staticmethod
+    def call_later(delay: float, callback: Callable[[], None]) -> None:
+        """
+        Run callback on the background loop after `delay` seconds. Callback must not block the loop.
+        """
+        loop = AsyncBridge.loop()
+
+        loop.call_soon_threadsafe(loop.call_later, delay, callback)
+
+    @staticmethod
+    def promise(coroutine: Coroutine[Any, Any, bytes], rcl: RCL) -> ResponseDataPromise:
+        """
+        Run coroutine, which returns response message, and resolve promise with it.
+        """
+        promise = ResponseDataPromise(rcl)
+
+        def done(future: Future):
+            if future.cancelled():
+                promise.set_error(ResponseDataPromise.CANCELLED_MESSAGE)
+            elif error := future.exception():
+                promise.set_error(str(error) or error.__class__.__name__)
+            else:
+                promise.set_result(future.result())
+
+        task = AsyncBridge.submit(coroutine)
+        task.add_done_callback(done)
+
+        # Cancelled promise cancels the coroutine
+        promise.on_cancel(task.cancel)
+
+        return promise
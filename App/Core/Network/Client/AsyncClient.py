@@ -0,0 +1,107 @@
+import asyncio
+from typing import Optional
+
+from App.Core.Logger import Log
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.MessageReceiver import MessageReceiver
+from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
+from App.Core.Network.Protocol import RCL, RCLProtocol, CallRequest
+from App.Core.Network.Protocol.Requests import AbstractRequest
+from App.Core.Network.Protocol.Responses import AbstractResponse
+
+
+class AsyncClient:
+    """
+    asyncio counterpart of `NetworkManager.request`.
+
+    Every call opens its own stream connection, so one event loop can run hundreds of calls without OS threads. Calls
+    in flight are limited by `concurrency` of client config. Call is cancelled after `timeout` seconds.
+
+    >>> response = await client.call("printers", ["list"])
+    """
+
+    def __init__(self, config: ClientConfig, rcl: RCL, log: Log):
+        self.__config = config
+        self.__rcl = rcl
+        self.__log = log
+
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __debug(self, message: str):
+        if self.__config.debug:
+            self.__log.debug(message, {'object': self})
+
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphore is bound to the loop it was first used in
+        if self.__semaphore is None or self.__loop is not asyncio.get_running_loop():
+            self.__loop = asyncio.get_running_loop()
+            self.__semaphore = asyncio.Semaphore(max(1, self.__config.concurrency))
+
+        return self.__semaphore
+
+    async def __exchange(self, request: AbstractRequest) -> bytes:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.__config.address,
+                self.__config.port,
+                limit=self.__config.max_bytes_receive,
+            ),
+            self.__config.connect_timeout or None
+        )
+
+        try:
+            self.__config.tune_socket(writer.get_extra_info('socket'))
+
+            for message in self.__rcl.create_request_messages(request):
+                writer.writelines(message)
+                await writer.drain()
+
+            header = await reader.readexactly(RCLProtocol.RCL_HEADERS_LENGTH)
+            length = RCLProtocol.message_length(RCLProtocol.get_data_length(header))
+
+            if length > (max_size := self.__config.max_message_size):
+                raise MessageReceiver.ProtocolError(f"Message len {length} is more than max message size {max_size}")
+
+            return header + await reader.readexactly(length - len(header))
+        finally:
+            writer.close()
+
+    async def request_raw(self, request: AbstractRequest, timeout: Optional[float] = None) -> bytes:
+        """
+        Send request and return response message as is.
+        """
+        timeout = self.__config.timeout if timeout is None else timeout
+
+        async with self.__get_semaphore():
+            try:
+                return await asyncio.wait_for(self.__exchange(request), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No response from {self.__config.address}:{self.__config.port} in {timeout} s")
+            except asyncio.IncompleteReadError:
+                raise ConnectionError("Connection closed by server")
+
+    async def request(self, request: AbstractRequest, timeout: Optional[float] = None) -> AbstractResponse:
+        """
+        Send request and return response. Error response is raised as exception with its message.
+        """
+        data = await self.request_raw(request, timeout)
+
+        if not (response := self.__rcl.parse_response(data)):
+            raise Exception("Cannot parse response")
+
+        if (response.type() & 0xF0) >= RCLProtocol.RCL_MESSAGE_GROUP_CLIENT_ERRORS:
+            raise Exception(response.data() or ResponseDataPromise.DEFAULT_ERROR_MESSAGE)
+
+        self.__debug(f"Response {response.type()} received")
+
+        return response
+
+    async def call(
+        self,
+        command: str,
+        subcommands: Optional[list] = None,
+        parameters: Optional[dict] = None,
+        timeout: Optional[float] = None
+    ) -> AbstractResponse:
+        return await self.request(CallRequest(command, subcommands, parameters), timeout)
@@ -0,0 +1,82 @@
+import time
+from threading import Lock
+
+
+class CircuitBreaker:
+    """
+    Fail fast while server is down.
+
+    Breaker opens after `failures` connection errors in a row. Open breaker rejects calls for `reset_timeout` seconds,
+    then lets one trial call through (half-open). Success of the trial closes breaker, failure opens it again.
+    Cancelled trial is released, so the next call is the trial.
+    """
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half-open'
+
+    def __init__(self, failures: int, reset_timeout: float):
+        self.__max_failures = max(1, failures)
+        self.__reset_timeout = reset_timeout
+
+        self.__state = self.STATE_CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__trial = False
+        self.__lock = Lock()
+
+    def allow(self) -> bool:
+        with self.__lock:
+            if self.__state == self.STATE_CLOSED:
+                return True
+
+            if self.__state == self.STATE_OPEN:
+                if time.monotonic() - self.__opened_at < self.__reset_timeout:
+                    return False
+
+                self.__state = self.STATE_HALF_OPEN
+                self.__trial = False
+
+            # Half-open: only one trial call at a time
+            if self.__trial:
+                return False
+
+            self.__trial = True
+
+            return True
+
+    def success(self) -> None:
+        with self.__lock:
+            self.__state = self.STATE_CLOSED
+            self.__failures = 0
+            self.__trial = False
+
+    def failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            self.__trial = False
+
+            if self.__state == self.STATE_HALF_OPEN or self.__failures >= self.__max_failures:
+                self.__state = self.STATE_OPEN
+                self.__opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """
+        Call finished without result (cancelled), breaker state is kept.
+        """
+        with self.__lock:
+            self.__trial = False
+
+    def state(self) -> str:
+        with self.__lock:
+            return self.__state
+
+    def retry_after(self) -> float:
+        """
+        Seconds until open breaker lets the trial call through.
+        """
+        with self.__lock:
+            if self.__state != self.STATE_OPEN:
+                return 0.0
+
+            return max(0.0, self.__reset_timeout - (time.monotonic() - self.__opened_at))
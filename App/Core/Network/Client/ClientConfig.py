@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from socket import socket, IPPROTO_TCP, TCP_NODELAY, SOL_SOCKET, SO_KEEPALIVE
+from typing import List, Tuple, Union
 
 from App import Application
 from App.Core import Config
@@ -12,6 +14,14 @@ class ClientConfig:
     max_bytes_receive: int
     debug: bool
     timeout: int
+    multiplex: bool = False
+    tcp_nodelay: bool = True
+    keepalive: bool = True
+    concurrency: int = 32
+    connect_timeout: float = 5
+    max_message_size: int = 1024 * 1024 * 512
+    # Other servers of the site. Calls fail over between `address`:`port` and these servers
+    servers: List[Tuple[str, int]] = field(default_factory=list)
 
     def to_dict(self) -> dict:
         return {
@@ -20,8 +30,58 @@ class ClientConfig:
             'max_bytes_receive': self.max_bytes_receive,
             'debug': self.debug,
             'timeout': self.timeout,
+            'multiplex': self.multiplex,
+            'tcp_nodelay': self.tcp_nodelay,
+            'keepalive': self.keepalive,
+            'concurrency': self.concurrency,
+            'connect_timeout': self.connect_timeout,
+            'max_message_size': self.max_message_size,
+            'servers': [f"{address}:{port}" for address, port in self.servers],
         }
 
+    def endpoints(self) -> List[Tuple[str, int]]:
+        """
+        All servers: main server first, then other servers without duplicates.
+        """
+        return list(dict.fromkeys([(self.address, self.port), *self.servers]))
+
+    def for_server(self, address: str, port: int) -> 'ClientConfig':
+        """
+        Copy of config for one server.
+        """
+        return replace(self, address=address, port=port, servers=[])
+
+    def server_name(self) -> str:
+        return f"{self.address}:{self.port}"
+
+    @staticmethod
+    def parse_servers(servers: Union[str, List[str], None], default_port: int) -> List[Tuple[str, int]]:
+        """
+        Parse servers list as 'host:port, host' string or list of such strings.
+        """
+        if isinstance(servers, str):
+            servers = servers.split(',')
+
+        result = []
+
+        for server in filter(None, map(str.strip, servers or [])):
+            address, _, port = server.rpartition(':') if ':' in server else (server, '', '')
+            result.append((address, int(port) if port else default_port))
+
+        return result
+
+    def connect(self, sock: socket):
+        """
+        Connect socket to server in `connect_timeout` seconds, then switch socket to calls timeout.
+        """
+        sock.settimeout(min(self.connect_timeout, self.timeout) if self.connect_timeout else self.timeout)
+        sock.connect((self.address, self.port))
+        sock.settimeout(self.timeout)
+
+    def tune_socket(self, sock: socket):
+        sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, int(self.tcp_nodelay))
+        sock.setsockopt(SOL_SOCKET, SO_KEEPALIVE, int(self.keepalive))
+
     @staticmethod
     def ini() -> Ini:
         return Application().get('ui.ini')
@@ -40,7 +100,14 @@ class ClientConfig:
             port=ini.get('network.port', int),
             max_bytes_receive=config['max_bytes_receive'],
             debug=config['debug'],
-            timeout=ini.get('network.timeout', int)
+            timeout=ini.get('network.timeout', int),
+            multiplex=config['multiplex'],
+            tcp_nodelay=config['tcp_nodelay'],
+            keepalive=config['keepalive'],
+            concurrency=config['concurrency'],
+            connect_timeout=config['connect_timeout'],
+            max_message_size=config['max_message_size'],
+            servers=ClientConfig.parse_servers(config['servers'], ini.get('network.port', int)),
         )
 
     @staticmethod
@@ -53,6 +120,13 @@ class ClientConfig:
             max_bytes_receive=conf['max_bytes_receive'],
             debug=conf['debug'],
             timeout=conf['timeout'],
+            multiplex=conf['multiplex'],
+            tcp_nodelay=conf['tcp_nodelay'],
+            keepalive=conf['keepalive'],
+            concurrency=conf['concurrency'],
+            connect_timeout=conf['connect_timeout'],
+            max_message_size=conf['max_message_size'],
+            servers=ClientConfig.parse_servers(conf['servers'], conf['port']),
         )
 
         return client_config
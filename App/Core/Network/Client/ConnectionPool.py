@@ -0,0 +1,269 @@
+import time
+from collections import deque
+from itertools import chain
+from threading import Thread, Condition, Event
+from typing import Dict, Tuple, List, Deque, Optional
+
+from App.Core import Config
+from App.Core.Logger import Log
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.MultiplexClient import MultiplexClient
+from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
+from App.Core.Network.Client.ResponseSink import ResponseSink
+from App.Core.Network.Protocol import RCL
+from App.Core.Network.Protocol.Requests import AbstractRequest
+from App.Core.Network.Tracing import Trace
+
+PoolKey = Tuple[str, int]
+
+
+class ConnectionPool:
+    """
+    Persistent connections keyed by (address, port).
+
+    Idle warm connection is reused first. New connection is opened while the server limit is not reached. Then calls
+    are multiplexed over the least loaded connection (`client.multiplex`) or wait in the queue for a free one.
+
+    Every new connection exchanges capabilities with server by 'ping' call to enable compression. Connections are
+    opened without lock in reserved slots, calls over open connections are not blocked meanwhile.
+
+    Maintenance thread closes connections idle more than `idle_timeout` and checks idle connections by 'ping'.
+    Connection, which does not answer in `connect_timeout`, is closed.
+    """
+
+    def __init__(self, config: Config, rcl: RCL, log: Log):
+        self.__config = config.get('client.pool')
+        self.__rcl = rcl
+        self.__log = log
+
+        self.__max_connections = max(1, int(self.__config['max_connections']))
+        self.__idle_timeout = float(self.__config['idle_timeout'])
+        self.__health_check_interval = float(self.__config['health_check_interval'])
+
+        self.__connections: Dict[PoolKey, List[MultiplexClient]] = {}
+        self.__last_used: Dict[MultiplexClient, float] = {}
+        self.__queues: Dict[PoolKey, Deque[Tuple[AbstractRequest, ResponseDataPromise, ClientConfig, float]]] = {}
+        # Number of connections being opened
+        self.__opening: Dict[PoolKey, int] = {}
+        self.__condition = Condition()
+
+        self.__maintenance: Optional[Thread] = None
+        self.__stopped = Event()
+
+    def enabled(self) -> bool:
+        return bool(self.__config['enabled'])
+
+    @staticmethod
+    def __key(config: ClientConfig) -> PoolKey:
+        return config.address, config.port
+
+    def __alive(self, key: PoolKey) -> List[MultiplexClient]:
+        connections = self.__connections[key] = [x for x in self.__connections.get(key, []) if x.is_running()]
+
+        for connection in set(self.__last_used.keys()) - set(chain(*self.__connections.values())):
+            del self.__last_used[connection]
+
+        return connections
+
+    def __open(
+        self,
+        key: PoolKey,
+        config: ClientConfig,
+        request: AbstractRequest,
+        promise: ResponseDataPromise,
+        started: float
+    ) -> ResponseDataPromise:
+        """
+        Open connection in the reserved slot and send the call over it. Called without lock, connecting and exchange
+        of capabilities take up to `connect_timeout`.
+        """
+        try:
+            connection = MultiplexClient(config, self.__rcl, self.__log, lambda x: self.__on_release(key, x)).connect()
+
+            if self.__rcl.compression().enabled():
+                connection.negotiate()
+        except OSError:
+            with self.__condition:
+                self.__opening[key] -= 1
+
+            # Queued call can take the slot
+            self.__on_release(key, None)
+            raise
+
+        with self.__condition:
+            self.__opening[key] -= 1
+            self.__connections.setdefault(key, []).append(connection)
+
+            result = self.__use(connection, request, promise, started)
+
+        self.__start_maintenance()
+
+        return result
+
+    def __acquire(self, config: ClientConfig) -> Tuple[Optional[MultiplexClient], bool]:
+        """
+        Connection for the call. No connection and True mean that a slot for new connection is reserved, the caller
+        opens it by `__open` then.
+        """
+        key = self.__key(config)
+        connections = self.__alive(key)
+
+        for connection in connections:
+            if not connection.in_flight():
+                return connection, False
+
+        if len(connections) + self.__opening.get(key, 0) < self.__max_connections:
+            self.__opening[key] = self.__opening.get(key, 0) + 1
+            return None, True
+
+        if config.multiplex and connections:
+            return min(connections, key=lambda x: x.in_flight()), False
+
+        return None, False
+
+    def __use(
+        self,
+        connection: MultiplexClient,
+        request: AbstractRequest,
+        promise: ResponseDataPromise,
+        started: float
+    ) -> ResponseDataPromise:
+        self.__last_used[connection] = time.monotonic()
+
+        if trace := promise.trace():
+            trace.add('connect', started)
+
+        return connection.request(request, promise)
+
+    def request(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        trace: Optional[Trace] = None,
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
+        promise = ResponseDataPromise(self.__rcl, trace, sink)
+        started = Trace.now()
+        key = self.__key(config)
+
+        with self.__condition:
+            connection, reserved = self.__acquire(config)
+
+            if connection:
+                return self.__use(connection, request, promise, started)
+
+            if not reserved:
+                self.__queues.setdefault(key, deque()).append((request, promise, config, started))
+
+        if reserved:
+            return self.__open(key, config, request, promise, started)
+
+        promise.on_cancel(lambda: self.__dequeue(key, promise))
+
+        return promise
+
+    def __dequeue(self, key: PoolKey, promise: ResponseDataPromise):
+        """
+        Remove cancelled request waiting for connection.
+        """
+        with self.__condition:
+            queue = self.__queues.get(key) or deque()
+
+            for item in queue:
+                if item[1] is promise:
+                    queue.remove(item)
+                    break
+
+    def __on_release(self, key: PoolKey, connection: Optional[MultiplexClient]):
+        """
+        Send the first queued call over released connection, the next free one or a new one. None connection means
+        that a slot is freed.
+        """
+        with self.__condition:
+            if not (queue := self.__queues.get(key)):
+                return
+
+            request, promise, config, started = queue[0]
+
+            if connection and connection.is_running() and not connection.in_flight():
+                target, reserved = connection, False
+            else:
+                target, reserved = self.__acquire(config)
+
+            if target is None and not reserved:
+                return
+
+            queue.popleft()
+
+            if target:
+                self.__use(target, request, promise, started)
+                return
+
+        # Released connection calls this from its reader thread, which must not wait for a new connection
+        Thread(target=self.__open_queued, args=(key, config, request, promise, started), daemon=True).start()
+
+    def __open_queued(
+        self,
+        key: PoolKey,
+        config: ClientConfig,
+        request: AbstractRequest,
+        promise: ResponseDataPromise,
+        started: float
+    ):
+        try:
+            self.__open(key, config, request, promise, started)
+        except OSError as e:
+            promise.set_error(f"Cannot connect to server. {str(e)}")
+
+    def __start_maintenance(self):
+        if self.__maintenance and self.__maintenance.is_alive():
+            return
+
+        self.__maintenance = Thread(target=self.__maintenance_loop, daemon=True)
+        self.__maintenance.start()
+
+    def __idle_connections(self) -> List[Tuple[MultiplexClient, float]]:
+        """
+        Connections without calls in flight with time since the last call. Health checks are not counted as calls.
+        """
+        with self.__condition:
+            connections = []
+            now = time.monotonic()
+
+            for key in list(self.__connections.keys()):
+                for connection in self.__alive(key):
+                    if not connection.in_flight():
+                        connections.append((connection, now - self.__last_used.get(connection, now)))
+
+            return connections
+
+    def __maintenance_loop(self):
+        interval = max(1.0, min(self.__idle_timeout, self.__health_check_interval) / 2)
+
+        while not self.__stopped.wait(interval):
+            for connection, unused_time in self.__idle_connections():
+                if unused_time > self.__idle_timeout:
+                    connection.close("Idle timeout")
+                    continue
+
+                if connection.idle_time() > self.__health_check_interval:
+                    config = connection.config()
+                    # Ping with capabilities, server keeps compression and encodings of connection
+                    promise = connection.request(self.__rcl.capabilities_request())
+                    # Stalled connection does not answer at all, the check must not wait for it forever
+                    ok, message = promise.with_timeout(config.connect_timeout or config.timeout).wait_result()
+
+                    if not ok:
+                        self.__log.warning(f"Health check failed. {message}", {'object': self})
+                        connection.close("Health check failed")
+
+    def close(self):
+        self.__stopped.set()
+
+        with self.__condition:
+            connections = list(chain(*self.__connections.values()))
+            self.__connections.clear()
+            self.__last_used.clear()
+
+        for connection in connections:
+            connection.close()
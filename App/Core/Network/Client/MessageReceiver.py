@@ -0,0 +1,159 @@
+import time
+from socket import socket
+from typing import Tuple, Optional, TYPE_CHECKING
+from zlib import crc32
+
+from App.Core.Network.Protocol import RCLProtocol
+
+if TYPE_CHECKING:
+    from App.Core.Network.Client.ResponseSink import ResponseSink
+
+
+class MessageReceiver:
+    """
+    Reads RCL messages from socket.
+
+    Message is received into a buffer preallocated by `data_length` header, so large responses (scans) are not copied
+    on every segment. CRC is updated as segments arrive, the message is not hashed again after receiving.
+
+    Receive size adapts to the link: it is doubled while reads fill it (data is waiting in socket buffer) and halved
+    when reads return much less, between `MIN_RECV_SIZE` and `MAX_RECV_SIZE`.
+
+    Data of 'return' message can be written to `ResponseSink` by parts instead of the buffer (see `receive_to`).
+
+    Message longer than `max_message_size` is not received, `ProtocolError` is raised by its header.
+    """
+
+    class ProtocolError(ConnectionError):
+        """
+        Message, which can not be received. The rest of connection stream is not understood after it.
+        """
+
+    # Buffer of message data written to sink
+    SINK_BUFFER_SIZE = 1024 * 256
+
+    MIN_RECV_SIZE = 1024 * 4
+    MAX_RECV_SIZE = 1024 * 1024 * 4
+
+    def __init__(self, sock: socket, recv_size: int, max_message_size: Optional[int] = None):
+        self.__socket = sock
+        self.__recv_size = min(max(recv_size, self.MIN_RECV_SIZE), self.MAX_RECV_SIZE)
+        self.__max_message_size = max_message_size
+        self.__header_time = 0.0
+        self.__checksum = 0
+
+    def recv_size(self) -> int:
+        return self.__recv_size
+
+    def header_time(self) -> float:
+        """
+        `time.perf_counter()` when header of the last message was received.
+        """
+        return self.__header_time
+
+    def __adapt(self, requested: int, received: int):
+        if received == requested and requested == self.__recv_size:
+            self.__recv_size = min(self.__recv_size * 2, self.MAX_RECV_SIZE)
+        elif received < self.__recv_size // 4:
+            self.__recv_size = max(self.__recv_size // 2, self.MIN_RECV_SIZE)
+
+    def __recv_into(self, view: memoryview, start: int, checksum: int, checksum_end: int) -> int:
+        received = start
+
+        while received < len(view):
+            requested = min(len(view) - received, self.__recv_size)
+
+            if not (size := self.__socket.recv_into(view[received:], requested)):
+                raise ConnectionError("Connection closed by server")
+
+            if received < checksum_end:
+                checksum = crc32(view[received:min(received + size, checksum_end)], checksum)
+
+            received += size
+
+            self.__adapt(requested, size)
+
+        return checksum
+
+    def receive(self) -> Tuple[bytearray, bool]:
+        """
+        Receive one message. Returns the message and the result of its CRC check.
+        """
+        return self.receive_data(self.receive_header())
+
+    def receive_header(self) -> bytearray:
+        """
+        Receive header of the next message, then its data by `receive_data` or `receive_to`.
+        """
+        header = bytearray(RCLProtocol.RCL_HEADERS_LENGTH)
+        self.__checksum = self.__recv_into(memoryview(header), 0, 0, len(header))
+        self.__header_time = time.perf_counter()
+
+        return header
+
+    def __data_length(self, header: bytearray) -> int:
+        length = RCLProtocol.get_data_length(header)
+
+        if self.__max_message_size and (size := RCLProtocol.message_length(length)) > self.__max_message_size:
+            raise self.ProtocolError(f"Message len {size} is more than max message size {self.__max_message_size}")
+
+        return length
+
+    def receive_data(self, header: bytearray) -> Tuple[bytearray, bool]:
+        length = RCLProtocol.message_length(self.__data_length(header))
+        checksum_end = length - RCLProtocol.RCL_CHECKSUM_LENGTH
+
+        message = bytearray(length)
+        message[:len(header)] = header
+
+        checksum = self.__recv_into(memoryview(message), len(header), self.__checksum, checksum_end)
+
+        return message, checksum.to_bytes(RCLProtocol.RCL_CHECKSUM_LENGTH, 'big') == message[checksum_end:]
+
+    @staticmethod
+    def sinkable(header: bytearray) -> bool:
+        """
+        True if data of message can be written to sink: 'return' message, compressed or not.
+        """
+        _type = RCLProtocol.get_headers(header)[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]
+
+        return _type & ~RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG == RCLProtocol.RCL_MESSAGE_TYPE_RETURN
+
+    def receive_to(self, header: bytearray, sink: 'ResponseSink') -> Tuple[bytearray, bool]:
+        """
+        Write data of 'return' message to sink while it is received, CRC is checked by parts. Returns the message
+        with data kept by sink (see `ResponseSink.kept`) and the result of CRC check, False also if sink failed.
+        Sink is closed.
+        """
+        length = self.__data_length(header)
+        _type = RCLProtocol.get_headers(header)[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]
+
+        buffer = bytearray(min(self.SINK_BUFFER_SIZE, max(length, 1)))
+        view = memoryview(buffer)
+        checksum = self.__checksum
+        received = 0
+        ok = False
+
+        sink.open(RCLProtocol.is_compressed(_type))
+
+        try:
+            while received < length:
+                part = view[:min(len(buffer), length - received)]
+                checksum = self.__recv_into(part, 0, checksum, len(part))
+                received += len(part)
+
+                sink.write(part)
+
+            expected = bytearray(RCLProtocol.RCL_CHECKSUM_LENGTH)
+            self.__recv_into(memoryview(expected), 0, 0, 0)
+
+            ok = checksum.to_bytes(RCLProtocol.RCL_CHECKSUM_LENGTH, 'big') == expected and not sink.error()
+        finally:
+            sink.close(ok)
+
+        request_id = RCLProtocol.get_request_id(header)
+
+        kept = sink.kept()
+        message = RCLProtocol.create_message(RCLProtocol.RCL_MESSAGE_TYPE_RETURN, kept, len(kept), request_id)
+
+        return bytearray(message), ok
@@ -0,0 +1,323 @@
+import time
+from collections import deque
+from itertools import count
+from socket import socket, AF_INET, SOCK_STREAM, error, timeout
+from threading import Thread, Condition, Lock
+from typing import Optional, Dict, Deque, Tuple, Iterator, List, Callable, Set
+
+from App.Core.Logger import Log
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
+from App.Core.Network.Client.MessageReceiver import MessageReceiver
+from App.Core.Network.Client.SocketWriter import SocketWriter
+from App.Core.Network.Protocol import RCL, RCLProtocol
+from App.Core.Network.Protocol.BufferWriter import Buffer
+from App.Core.Network.Protocol.Requests import AbstractRequest
+from App.Core.Network.Tracing import Trace
+
+
+class MultiplexClient:
+    """
+    Many calls in flight over one persistent connection.
+
+    Every call gets a per-connection request id. Messages of queued calls are sent round-robin one by one, so small
+    calls are not blocked by stream messages of large uploads. Responses are dispatched to promises by request id.
+
+    If server does not repeat request ids, response is dispatched to the only call in flight. So the client can be
+    used as a plain persistent connection with one call at a time. Once server repeated a request id, responses with
+    unknown ids are dropped.
+    """
+
+    def __init__(
+        self,
+        config: ClientConfig,
+        rcl: RCL,
+        log: Log,
+        on_release: Optional[Callable[['MultiplexClient'], None]] = None
+    ):
+        self.__config = config
+        self.__rcl = rcl
+        self.__log = log
+        self.__on_release = on_release
+
+        self.__host = (config.address, config.port)
+
+        self.__socket: Optional[socket] = None
+        self.__receiver: Optional[MessageReceiver] = None
+
+        self.__ids = count(RCLProtocol.RCL_FIRST_REQUEST_ID)
+        self.__promises: Dict[int, ResponseDataPromise] = {}
+        self.__promises_lock = Lock()
+
+        # Cancelled requests, which are sent (at least partly), their responses are skipped
+        self.__cancelled: Set[int] = set()
+
+        # Request id, messages, trace, True if the first message is sent
+        self.__queue: Deque[Tuple[int, Iterator[List[Buffer]], Optional[Trace], bool]] = deque()
+        self.__queue_condition = Condition()
+
+        self.__running = False
+        self.__last_activity = time.monotonic()
+
+        self.__peer_codecs: List[str] = []
+
+        # True once server repeated request id of a call, response with unknown id is not given to call in flight then
+        self.__echoes_ids = False
+
+    def __debug(self, message: str):
+        if self.__config.debug:
+            self.__log.debug(message, {'object': self})
+
+    def connect(self) -> 'MultiplexClient':
+        self.__socket = socket(AF_INET, SOCK_STREAM)
+        self.__config.tune_socket(self.__socket)
+        self.__config.connect(self.__socket)
+
+        self.__receiver = MessageReceiver(
+            self.__socket,
+            self.__config.max_bytes_receive,
+            self.__config.max_message_size
+        )
+        self.__running = True
+
+        Thread(target=self.__read_loop, daemon=True).start()
+        Thread(target=self.__write_loop, daemon=True).start()
+
+        self.__debug(f"Connected to {self.__host[0]}:{self.__host[1]}")
+
+        return self
+
+    def negotiate(self) -> List[str]:
+        """
+        Exchange capabilities with server by 'ping' call. Calls are compressed only by codecs supported by server.
+        Exchange is a part of connecting, stalled server does not block the caller longer than `connect_timeout`.
+        """
+        promise = self.request(self.__rcl.capabilities_request())
+        ok, response = promise.with_timeout(self.__config.connect_timeout or self.__config.timeout).wait_result()
+
+        self.__peer_codecs = self.__rcl.peer_codecs(response) if ok else []
+
+        self.__debug(f"Server compression codecs: {', '.join(self.__peer_codecs) or 'none'}")
+
+        return self.__peer_codecs
+
+    def config(self) -> ClientConfig:
+        return self.__config
+
+    def is_running(self) -> bool:
+        return self.__running
+
+    def in_flight(self) -> int:
+        return len(self.__promises)
+
+    def idle_time(self) -> float:
+        if self.in_flight():
+            return 0.0
+
+        return time.monotonic() - self.__last_activity
+
+    def __release(self):
+        self.__last_activity = time.monotonic()
+
+        if self.__on_release:
+            self.__on_release(self)
+
+    def __next_request_id(self) -> int:
+        return (next(self.__ids) - 1) % RCLProtocol.RCL_MAX_REQUEST_ID + 1
+
+    def request(self, request: AbstractRequest, promise: Optional[ResponseDataPromise] = None) -> ResponseDataPromise:
+        request_id = self.__next_request_id()
+        promise = promise or ResponseDataPromise(self.__rcl)
+
+        if not self.__running:
+            promise.set_error("Connection closed")
+            return promise
+
+        messages = self.__rcl.create_request_messages(request, request_id, self.__peer_codecs)
+
+        with self.__promises_lock:
+            self.__promises[request_id] = promise
+
+        self.__last_activity = time.monotonic()
+
+        with self.__queue_condition:
+            self.__queue.append((request_id, messages, promise.trace(), False))
+            self.__queue_condition.notify()
+
+        promise.on_cancel(lambda: self.__cancel(request_id))
+
+        return promise
+
+    def __cancel(self, request_id: int):
+        """
+        Forget cancelled request. Request, which is not sent yet, is removed from queue. Messages of request being sent
+        are sent to the end, server would wait for the rest of stream otherwise.
+        """
+        with self.__promises_lock:
+            if self.__promises.pop(request_id, None) is None:
+                return
+
+            self.__cancelled.add(request_id)
+
+        with self.__queue_condition:
+            for item in self.__queue:
+                if item[0] == request_id and not item[3]:
+                    self.__queue.remove(item)
+
+                    with self.__promises_lock:
+                        self.__cancelled.discard(request_id)
+
+                    break
+
+        self.__release()
+
+    def __skip(self, request_id: int) -> bool:
+        """
+        True if response is of cancelled request, the request is forgotten then.
+        """
+        with self.__promises_lock:
+            if request_id not in self.__cancelled:
+                return False
+
+            self.__cancelled.discard(request_id)
+
+            return True
+
+    def __pop_promise(self, request_id: int, pop: bool = True) -> Optional[ResponseDataPromise]:
+        """
+        Promise of request. `pop` False leaves promise registered, so lost connection still fails it.
+        """
+        with self.__promises_lock:
+            if promise := self.__promises.get(request_id):
+                self.__echoes_ids = True
+
+                return self.__promises.pop(request_id) if pop else promise
+
+            if not self.__echoes_ids and len(self.__promises) == 1:
+                return self.__promises.popitem()[1] if pop else next(iter(self.__promises.values()))
+
+            return None
+
+    def __fail(self, request_id: int, message: str):
+        if promise := self.__pop_promise(request_id):
+            promise.set_error(message)
+            self.__release()
+
+    def close(self, message: str = "Connection closed"):
+        if not self.__running:
+            return
+
+        self.__running = False
+
+        with self.__queue_condition:
+            self.__queue.clear()
+            self.__queue_condition.notify_all()
+
+        try:
+            self.__socket.close()
+        except error:
+            pass
+
+        with self.__promises_lock:
+            promises = list(self.__promises.values())
+            self.__promises.clear()
+            self.__cancelled.clear()
+
+        for promise in promises:
+            promise.set_error(message)
+
+        self.__release()
+
+    def __write_loop(self):
+        while True:
+            with self.__queue_condition:
+                while self.__running and not self.__queue:
+                    self.__queue_condition.wait()
+
+                if not self.__running:
+                    return
+
+                request_id, messages, trace, _ = self.__queue.popleft()
+
+            started = Trace.now()
+
+            try:
+                message = next(messages, None)
+            except Exception as e:
+                self.__log.error(f"Cannot create message. {str(e)}", {'object': self})
+                self.__fail(request_id, str(e))
+                continue
+
+            if trace:
+                started = trace.add('encode', started)
+
+            if message is None:
+                continue
+
+            try:
+                size = SocketWriter.send(self.__socket, message)
+            except error as e:
+                self.close(f"Cannot send request: {str(e)}")
+                return
+
+            if trace:
+                trace.add('upload', started)
+                trace.sent(size)
+
+            with self.__queue_condition:
+                self.__queue.append((request_id, messages, trace, True))
+
+    def __read_loop(self):
+        while self.__running:
+            try:
+                header = self.__receiver.receive_header()
+                request_id = RCLProtocol.get_request_id(header)
+
+                with self.__promises_lock:
+                    cancelled = request_id in self.__cancelled
+
+                promise = None if cancelled else self.__pop_promise(request_id, False)
+
+                if promise and (sink := promise.sink()) and self.__receiver.sinkable(header):
+                    message, crc_ok = self.__receiver.receive_to(header, sink)
+                else:
+                    message, crc_ok = self.__receiver.receive_data(header)
+            except timeout:
+                if self.in_flight():
+                    self.close("Response timeout")
+                    return
+
+                continue
+            except MessageReceiver.ProtocolError as e:
+                self.close(str(e))
+                return
+            except (error, ConnectionError) as e:
+                self.close(f"Connection lost: {str(e)}")
+                return
+
+            if self.__skip(request_id):
+                continue
+
+            if not (promise := self.__pop_promise(request_id)):
+                self.__log.warning(f"Response for unknown request id {request_id}", {'object': self})
+                continue
+
+            if trace := promise.trace():
+                trace.add('wait', trace.sent_at(), self.__receiver.header_time())
+                trace.add('receive', self.__receiver.header_time())
+
+            # Callbacks of caller run here, their errors must not stop reading of the connection
+            try:
+                if crc_ok:
+                    promise.set_result(message, True)
+                else:
+                    promise.set_error((promise.sink() and promise.sink().error()) or "Crc check failed")
+            except Exception as e:
+                self.__log.error(f"Response callback failed. {str(e)}", {'object': self})
+
+            if promise.malformed():
+                # Responses of the server are not understood, calls in flight fail at once instead of timeout
+                self.close(promise.error())
+                return
+
+            self.__release()
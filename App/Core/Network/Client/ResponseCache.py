@@ -0,0 +1,127 @@
+import json
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple, Set
+
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.RetryPolicy import RetryPolicy
+from App.Core.Network.Protocol.Requests import AbstractRequest, CallRequest
+
+
+class ResponseCache:
+    """
+    Responses of read-only calls (`client.cache`).
+
+    Response is fresh for `ttl` seconds of its call. Then it is stale for `stale_ttl` seconds: it is still returned,
+    but the caller must refresh it in background. Calls with truthy refresh parameter ('update-cache' of printers list)
+    bypass cache and replace the cached response.
+
+    Calls are keyed by servers, command, subcommands and parameters except refresh ones and `version`.
+
+    Versioned responses are held after `stale_ttl` too: the caller sends their version with the next call and gets
+    'not_modified' message instead of the same data.
+    """
+
+    # Parameter of call with version of response held by client
+    VERSION_PARAMETER = 'version'
+
+    def __init__(self, config: dict):
+        self.__enabled = bool(config['enabled'])
+        self.__ttl: Dict[str, float] = dict(config['ttl'])
+        self.__stale_ttl = float(config['stale_ttl'])
+        self.__refresh_parameters: Set[str] = set(config['refresh_parameters'])
+
+        self.__entries: Dict[str, Tuple[float, bytes, Optional[str]]] = {}
+        self.__names: Dict[str, str] = {}
+        self.__refreshing: Set[str] = set()
+        self.__lock = Lock()
+
+    def cacheable(self, request: AbstractRequest) -> bool:
+        return self.__enabled and RetryPolicy.name(request) in self.__ttl
+
+    def refresh(self, request: CallRequest) -> bool:
+        """
+        True if the call asks to refresh data.
+        """
+        return any((request.parameters() or {}).get(x) for x in self.__refresh_parameters)
+
+    def key(self, request: CallRequest, config: ClientConfig) -> str:
+        parameters = {
+            k: v for k, v in (request.parameters() or {}).items()
+            if k not in self.__refresh_parameters and k != self.VERSION_PARAMETER
+        }
+
+        return json.dumps(
+            [config.endpoints(), request.command(), request.subcommands() or [], parameters],
+            sort_keys=True,
+            default=str,
+        )
+
+    def get(self, request: CallRequest, key: str) -> Optional[Tuple[bytes, bool]]:
+        """
+        Cached response and True if it is fresh, False if it is stale.
+        """
+        with self.__lock:
+            if not (entry := self.__entries.get(key)):
+                return None
+
+            stored_at, data, version = entry
+            age = time.monotonic() - stored_at
+            ttl = self.__ttl[RetryPolicy.name(request)]
+
+            if age > ttl + self.__stale_ttl:
+                if not version:
+                    del self.__entries[key]
+                    del self.__names[key]
+
+                return None
+
+            return data, age <= ttl
+
+    def held(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Held response and its version, even expired one. None if response is not versioned.
+        """
+        with self.__lock:
+            if not (entry := self.__entries.get(key)) or not entry[2]:
+                return None
+
+            return entry[1], entry[2]
+
+    def put(self, request: CallRequest, key: str, data: bytes, version: Optional[str] = None) -> None:
+        with self.__lock:
+            self.__entries[key] = (time.monotonic(), bytes(data), version)
+            self.__names[key] = RetryPolicy.name(request)
+
+    def touch(self, key: str) -> None:
+        """
+        Make held response fresh again, server confirmed it is not modified.
+        """
+        with self.__lock:
+            if entry := self.__entries.get(key):
+                self.__entries[key] = (time.monotonic(), *entry[1:])
+
+    def begin_refresh(self, key: str) -> bool:
+        """
+        Mark stale response as refreshing. False if it is refreshed already.
+        """
+        with self.__lock:
+            if key in self.__refreshing:
+                return False
+
+            self.__refreshing.add(key)
+
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self.__lock:
+            self.__refreshing.discard(key)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Remove cached responses of call (e.g. 'printers list') or all responses.
+        """
+        with self.__lock:
+            for key in [k for k, v in self.__names.items() if name is None or v == name]:
+                self.__entries.pop(key, None)
+                self.__names.pop(key, None)
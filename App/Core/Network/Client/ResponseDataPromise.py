@@ -1,68 +1,423 @@
-import time
-from typing import Optional, Callable, Tuple, Union
+import asyncio
+from concurrent.futures import Future, InvalidStateError
+from threading import Event, Lock, Timer
+from typing import Optional, Callable, Tuple, Union, List, Iterable, Any
 
 from App.Core.Network.Protocol import RCL, RCLProtocol
-from App.Core.Network.Protocol.Responses.AbstractResponse import AbstractResponse
+from App.Core.Network.Protocol.Responses import AbstractResponse, ResponseSuccess
+from App.Core.Network.Client.ResponseSink import ResponseSink
+from App.Core.Network.Tracing.Trace import Trace
+
+
+class RequestError(Exception):
+    """
+    Error of failed promise in futures (see `ResponseDataPromise.future`). `transport` is True if server is not
+    reached.
+    """
+
+    def __init__(self, message: Optional[str], transport: bool = True):
+        super().__init__(message)
+
+        self.transport = transport
 
 
 class ResponseDataPromise:
+    """
+    Result of request: response or error message.
+
+    Promise is settled once, later results are ignored. Promises are combined by `chain`, `with_timeout`, `gather`
+    and `any`, converted to `concurrent.futures.Future` by `future` and awaited in coroutines. Cancelling a promise
+    stops its request: transport of the request registers `on_cancel` callbacks.
+    """
+
     STATUS_WAIT = 1
     STATUS_SUCCESS = 2
     STATUS_ERROR = 3
 
     DEFAULT_ERROR_MESSAGE = "<No error message>"
+    CANCELLED_MESSAGE = "Request cancelled"
+    MALFORMED_MESSAGE = "Cannot parse response"
 
-    def __init__(self, rcl: RCL):
+    def __init__(self, rcl: RCL, trace: Optional[Trace] = None, sink: Optional[ResponseSink] = None):
         self.__rcl = rcl
+        self.__trace = trace
+        self.__sink = sink
         self.__status = self.STATUS_WAIT
         self.__data: bytes = b""
+        self.__crc_checked = False
+        self.__response: Optional[AbstractResponse] = None
         self.__error: Optional[str] = None
-        self.__on_success: Optional[Callable[[AbstractResponse], None]] = None
-        self.__on_error: Optional[Callable[[Optional[str]], None]] = None
+        self.__transport_error = False
+        self.__error_type: Optional[int] = None
+        self.__cancelled = False
+        self.__malformed = False
+        self.__on_success: List[Callable[[AbstractResponse], None]] = []
+        self.__on_error: List[Callable[[Optional[str]], None]] = []
+        self.__on_cancel: List[Callable[[], Any]] = []
+        self.__done = Event()
+        self.__lock = Lock()
 
     def wait_result(self) -> Tuple[bool, Union[Optional[str], AbstractResponse]]:
-        while self.__status == self.STATUS_WAIT:
-            time.sleep(0.05)
-            continue
+        self.__done.wait()
 
         if self.__status == self.STATUS_SUCCESS:
-            return True, self.__rcl.parse_response(self.__data)
+            return True, self.__response
 
         if self.__status == self.STATUS_ERROR:
             return False, self.__error
 
-    def set_result(self, data: bytes):
+    def set_result(self, data: bytes, crc_checked: bool = False) -> bool:
+        """
+        Set response message. `crc_checked` if CRC of message is checked by receiver.
+
+        Message is parsed once, data of response is decoded on the first `data()` call of any callback. Message, which
+        is not parsed, fails the promise (see `malformed`), returns False then.
+        """
+        if self.__status != self.STATUS_WAIT:
+            return True
+
         self.__data = data
+        self.__crc_checked = crc_checked
+
+        started = Trace.now()
+        reason = self.MALFORMED_MESSAGE
+
+        try:
+            response = self.__parse()
+        except Exception as e:
+            # Broken compressed data
+            response = None
+            reason = f"{self.MALFORMED_MESSAGE}. {str(e)}"
+
+        if self.__trace:
+            self.__trace.add('decode', started)
+            self.__trace.received(len(data))
 
-        response = self.__rcl.parse_response(data)
+        if response is None:
+            self.__malformed = True
+            self.set_error(reason)
+            return False
 
         if (response.type() & 0xF0) >= RCLProtocol.RCL_MESSAGE_GROUP_CLIENT_ERRORS:
-            self.set_error(response.data() or self.DEFAULT_ERROR_MESSAGE)
-            return
+            try:
+                message = response.data()
+            except Exception:
+                message = None
+
+            self.set_error(message or self.DEFAULT_ERROR_MESSAGE, False, response.type())
+            return True
+
+        self.__succeed(response, data)
+
+        return True
+
+    def resolve(self, response: AbstractResponse, data: bytes = b"") -> None:
+        """
+        Set parsed response. `data` is the response message, if there is one.
+        """
+        self.__succeed(response, data)
+
+    def __succeed(self, response: AbstractResponse, data: bytes) -> bool:
+        with self.__lock:
+            if self.__status != self.STATUS_WAIT:
+                return False
+
+            self.__data = data
+            self.__response = response
+            self.__status = ResponseDataPromise.STATUS_SUCCESS
+            callbacks = list(self.__on_success)
+
+        self.__notify(callbacks, response)
+
+        return True
+
+    def set_error(self, message: str, transport: bool = True, error_type: Optional[int] = None) -> None:
+        """
+        Fail promise. `transport` is False if error is returned by server, True if server is not reached.
+        `error_type` is the message type of error returned by server.
+        """
+        self.__fail(message, transport, False, error_type)
+
+    def __fail(self, message: str, transport: bool, cancelled: bool = False, error_type: Optional[int] = None) -> bool:
+        with self.__lock:
+            if self.__status != self.STATUS_WAIT:
+                return False
 
-        if self.__on_success:
-            self.__on_success(response)
+            self.__error = message
+            self.__transport_error = transport
+            self.__error_type = error_type
+            self.__cancelled = cancelled
+            self.__status = ResponseDataPromise.STATUS_ERROR
+            callbacks = list(self.__on_error)
 
-        self.__status = ResponseDataPromise.STATUS_SUCCESS
+        self.__notify(callbacks, message)
 
-    def set_error(self, message: str) -> None:
-        self.__error = message
+        return True
 
-        if self.__on_error:
-            self.__on_error(message)
+    def __notify(self, callbacks: List[Callable[[Any], None]], value: Any):
+        """
+        Call every callback and release waiters, even if some callback raises. The first error is raised then.
+        """
+        errors = []
 
-        self.__status = ResponseDataPromise.STATUS_ERROR
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                errors.append(e)
+
+        self.__done.set()
+
+        if errors:
+            raise errors[0]
+
+    def cancel(self, message: str = CANCELLED_MESSAGE) -> bool:
+        """
+        Fail waiting promise with `message` (not a transport error, request is not retried) and stop its request.
+        Returns False if promise is already settled.
+        """
+        if not self.__fail(message, False, True):
+            return False
+
+        with self.__lock:
+            callbacks = list(self.__on_cancel)
+            self.__on_cancel.clear()
+
+        for callback in callbacks:
+            callback()
+
+        return True
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        """
+        Add callback stopping the request, when promise is cancelled. Called at once if promise is cancelled already.
+        """
+        with self.__lock:
+            if not self.__cancelled:
+                self.__on_cancel.append(callback)
+                return self
+
+        callback()
+
+        return self
+
+    def cancelled(self) -> bool:
+        return self.__cancelled
+
+    def malformed(self) -> bool:
+        """
+        True if response message is received, but not parsed.
+        """
+        return self.__malformed
 
     def then(self, callback: Callable[[AbstractResponse], None]):
-        self.__on_success = callback
+        """
+        Add success callback. Callbacks are called in order of adding.
+        """
+        # Result can be set by other thread before callback is added
+        with self.__lock:
+            self.__on_success.append(callback)
+            done = self.__status == self.STATUS_SUCCESS
+
+        if done:
+            callback(self.__response)
 
         return self
 
     def catch(self, callback: Callable[[Optional[str]], None]):
-        self.__on_error = callback
+        with self.__lock:
+            self.__on_error.append(callback)
+            done = self.__status == self.STATUS_ERROR
+
+        if done:
+            callback(self.__error)
+
+        return self
+
+    def __follow(self, source: 'ResponseDataPromise') -> 'ResponseDataPromise':
+        """
+        Settle promise with the result of source.
+        """
+        source.then(
+            lambda response: self.resolve(response, source.data())
+        ).catch(
+            lambda message: self.set_error(message, source.is_transport_error(), source.error_type())
+        )
 
         return self
 
+    def share(self) -> 'ResponseDataPromise':
+        """
+        Promise of the same result. Cancelling it does not cancel this promise, which can have other consumers.
+        """
+        return ResponseDataPromise(self.__rcl, sink=self.__sink).__follow(self)
+
+    def chain(self, callback: Callable[[AbstractResponse], Any]) -> 'ResponseDataPromise':
+        """
+        Promise of the next step. `callback` gets response and returns promise of the next request or response data.
+        Errors of this promise and of callback fail the next promise, cancelling the next promise cancels both.
+        """
+        following = ResponseDataPromise(self.__rcl)
+
+        def step(response: AbstractResponse):
+            try:
+                result = callback(response)
+            except Exception as e:
+                following.set_error(str(e) or e.__class__.__name__, False)
+                return
+
+            if isinstance(result, ResponseDataPromise):
+                following.on_cancel(result.cancel).__follow(result)
+            else:
+                following.resolve(ResponseSuccess(result))
+
+        following.on_cancel(self.cancel)
+
+        self.then(step).catch(
+            lambda message: following.set_error(message, self.is_transport_error(), self.error_type())
+        )
+
+        return following
+
+    def with_timeout(self, seconds: float) -> 'ResponseDataPromise':
+        """
+        Promise of the same result, which fails if there is no result in `seconds`. Request is cancelled then.
+        """
+        limited = ResponseDataPromise(self.__rcl, sink=self.__sink)
+
+        def expire():
+            limited.set_error(f"Server did not respond in {seconds} s.", False)
+            self.cancel()
+
+        timer = Timer(seconds, expire)
+        timer.daemon = True
+
+        limited.on_cancel(self.cancel).__follow(self)
+        limited.then(lambda _: timer.cancel()).catch(lambda _: timer.cancel())
+
+        if limited.status() == self.STATUS_WAIT:
+            timer.start()
+
+        return limited
+
+    @staticmethod
+    def gather(promises: Iterable['ResponseDataPromise']) -> 'ResponseDataPromise':
+        """
+        Promise of all results. Data of its response is the list of responses in order of promises. Fails with the
+        first error, other requests go on. Cancelling it cancels all promises.
+        """
+        promises = list(promises)
+        joined = ResponseDataPromise(promises[0].__rcl if promises else None)
+        responses: List[Optional[AbstractResponse]] = [None] * len(promises)
+        left = [len(promises)]
+        lock = Lock()
+
+        def done(index: int, response: AbstractResponse):
+            with lock:
+                responses[index] = response
+                left[0] -= 1
+                last = not left[0]
+
+            if last:
+                joined.resolve(ResponseSuccess(responses))
+
+        for i, promise in enumerate(promises):
+            joined.on_cancel(promise.cancel)
+
+            promise.then(
+                lambda response, index=i: done(index, response)
+            ).catch(
+                lambda message, failed=promise: joined.set_error(message, failed.is_transport_error())
+            )
+
+        if not promises:
+            joined.resolve(ResponseSuccess([]))
+
+        return joined
+
+    @staticmethod
+    def any(promises: Iterable['ResponseDataPromise']) -> 'ResponseDataPromise':
+        """
+        Promise of the first successful response, other promises are cancelled then. Fails if all promises fail,
+        error message joins their errors. Cancelling it cancels all promises.
+        """
+        promises = list(promises)
+        first = ResponseDataPromise(promises[0].__rcl if promises else None)
+        errors: List[str] = []
+        lock = Lock()
+
+        def won(winner: ResponseDataPromise, response: AbstractResponse):
+            if not first.__succeed(response, winner.data()):
+                return
+
+            for promise in promises:
+                if promise is not winner:
+                    promise.cancel()
+
+        def failed(message: Optional[str]):
+            with lock:
+                errors.append(message or ResponseDataPromise.DEFAULT_ERROR_MESSAGE)
+                last = len(errors) == len(promises)
+
+            if last:
+                first.set_error('; '.join(errors), all(x.is_transport_error() for x in promises))
+
+        for i, promise in enumerate(promises):
+            first.on_cancel(promise.cancel)
+            promise.then(lambda response, winner=promise: won(winner, response)).catch(failed)
+
+        if not promises:
+            first.set_error("No requests to wait for", False)
+
+        return first
+
+    def future(self) -> Future:
+        """
+        Future of response. Failed promise raises `RequestError`, cancelled promise cancels the future and cancelling
+        the future cancels the promise.
+        """
+        future = Future()
+
+        def succeed(response: AbstractResponse):
+            try:
+                future.set_result(response)
+            except InvalidStateError:
+                pass
+
+        def fail(message: Optional[str]):
+            if self.__cancelled:
+                future.cancel()
+                return
+
+            try:
+                future.set_exception(RequestError(message, self.__transport_error))
+            except InvalidStateError:
+                pass
+
+        future.add_done_callback(lambda x: x.cancelled() and self.cancel())
+
+        self.then(succeed).catch(fail)
+
+        return future
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future()).__await__()
+
+    def __parse(self) -> AbstractResponse:
+        response = self.__rcl.parse_response(self.__data, self.__crc_checked)
+
+        # Payload is written to sink, response has sink target instead
+        if self.__sink and self.__sink.written() and response.type() == RCLProtocol.RCL_MESSAGE_TYPE_RETURN:
+            return ResponseSuccess(self.__sink.target(), self.__sink.version())
+
+        return response
+
+    def sink(self) -> Optional[ResponseSink]:
+        return self.__sink
+
+    def trace(self) -> Optional[Trace]:
+        return self.__trace
+
     def status(self) -> int:
         return self.__status
 
@@ -71,3 +426,12 @@ class ResponseDataPromise:
 
     def error(self) -> str:
         return self.__error
+
+    def is_transport_error(self) -> bool:
+        return self.__status == self.STATUS_ERROR and self.__transport_error
+
+    def error_type(self) -> Optional[int]:
+        """
+        Message type of error returned by server (`RCLProtocol.RCL_MESSAGE_TYPE_BLOB_NOT_FOUND` etc.), None otherwise.
+        """
+        return self.__error_type
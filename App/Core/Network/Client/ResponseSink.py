@@ -0,0 +1,169 @@
+import os
+from typing import Union, BinaryIO, Optional
+
+from App.Core.Network.Protocol.BufferWriter import Buffer
+from App.Core.Network.Protocol.Compression import Compression
+from App.Core.Network.Protocol.Resolvers import ResponseMessageSuccessResolver
+
+
+class ResponseSink:
+    """
+    Destination of response payload: file path or writable binary stream.
+
+    Bytes and str payloads of 'return' message are decompressed and written while they are received, so memory of the
+    client does not grow with response size (scans). The call response has the sink target (path or stream) as data
+    instead of payload then. Lists, maps and bools are small, they are kept and returned as usual (see `kept`).
+    File of failed response is removed.
+    """
+
+    # Max size of decompressed part written at once
+    CHUNK_SIZE = 1024 * 1024
+
+    WRITTEN_TYPE_CODES = [
+        ResponseMessageSuccessResolver.TYPE_CODE_BYTES,
+        ResponseMessageSuccessResolver.TYPE_CODE_STR,
+    ]
+
+    def __init__(self, target: Union[str, BinaryIO]):
+        self.__target = target
+        self.__file: Optional[BinaryIO] = None
+
+        self.__compressed = False
+        self.__decompressor = None
+        self.__head = bytearray()
+        self.__head_done = False
+        self.__written = False
+        self.__version: Optional[str] = None
+        self.__size = 0
+        self.__error: Optional[str] = None
+
+    def target(self) -> Union[str, BinaryIO]:
+        return self.__target
+
+    def version(self) -> Optional[str]:
+        return self.__version
+
+    def size(self) -> int:
+        """
+        Written payload bytes.
+        """
+        return self.__size
+
+    def written(self) -> bool:
+        """
+        True if payload of the last message is written to target.
+        """
+        return self.__written
+
+    def kept(self) -> bytes:
+        """
+        Decompressed message data, which is not written to target (the whole data if payload is not bytes or str).
+        """
+        return b"" if self.__written else bytes(self.__head)
+
+    def error(self) -> Optional[str]:
+        """
+        Why payload was not written (bad compressed data, disk errors), None if it is written.
+        """
+        return self.__error
+
+    def open(self, compressed: bool) -> None:
+        """
+        Start writing payload of message. `compressed` if message has compressed flag.
+        """
+        self.__file = open(self.__target, 'wb') if isinstance(self.__target, str) else self.__target
+
+        self.__compressed = compressed
+        self.__decompressor = None
+        self.__head = bytearray()
+        self.__head_done = False
+        self.__written = False
+        self.__version = None
+        self.__size = 0
+        self.__error = None
+
+    def write(self, data: Buffer) -> None:
+        """
+        Write next part of message data. Parts after a failed one are skipped, see `error`.
+        """
+        if self.__error:
+            return
+
+        try:
+            self.__decode(data)
+        except Exception as e:
+            self.__error = f"Cannot write response to {self.__target}. {e}"
+
+    def __decode(self, data: Buffer):
+        if not self.__compressed:
+            self.__write(data)
+            return
+
+        if self.__decompressor is None:
+            if not len(data):
+                return
+
+            self.__decompressor = Compression.decompressor(data[0])
+            data = data[Compression.CODEC_LEN:]
+
+        for chunk in Compression.decompress_chunks(self.__decompressor, data, self.CHUNK_SIZE):
+            self.__write(chunk)
+
+    def __write(self, data: Buffer):
+        if not self.__head_done:
+            self.__head += data
+
+            if (data := self.__split_head()) is None:
+                return
+
+        if not self.__written:
+            self.__head += data
+            return
+
+        if len(data):
+            self.__file.write(data)
+            self.__size += len(data)
+
+    def __split_head(self) -> Optional[bytes]:
+        """
+        Read version and type code before payload (see `ResponseMessageSuccessResolver`). Returns the rest of data
+        after them, None while they are not received. Data of not written types stays in head.
+        """
+        head = self.__head
+        start = 0
+
+        if head[:1] == bytes([ResponseMessageSuccessResolver.TYPE_CODE_VERSIONED]):
+            if len(head) < 2 or len(head) < 2 + head[1]:
+                return None
+
+            start = 2 + head[1]
+            self.__version = bytes(head[2:start]).decode("utf-8")
+
+        if len(head) <= start:
+            return None
+
+        self.__head_done = True
+
+        if head[start] not in self.WRITTEN_TYPE_CODES:
+            return b""
+
+        self.__written = True
+        self.__head = bytearray()
+
+        return bytes(head[start + 1:])
+
+    def close(self, ok: bool) -> None:
+        """
+        Finish writing. File opened by path is closed, and removed if response failed or payload is kept.
+        """
+        if not self.__file:
+            return
+
+        if not isinstance(self.__target, str):
+            self.__file.flush()
+            return
+
+        self.__file.close()
+
+        if (not ok or not self.__written) and os.path.exists(self.__target):
+            os.remove(self.__target)
@@ -0,0 +1,44 @@
+import random
+from typing import Optional, List
+
+from App.Core.Network.Protocol.Requests import AbstractRequest, CallRequest
+
+
+class RetryPolicy:
+    """
+    Retries of idempotent calls with exponential backoff and full jitter, deadlines of calls.
+
+    Calls are named by command and subcommands joined with space, e.g. 'printers list'.
+    """
+
+    def __init__(self, config: dict):
+        self.__attempts = max(1, int(config['attempts']))
+        self.__base_delay = float(config['base_delay'])
+        self.__max_delay = float(config['max_delay'])
+        self.__idempotent: List[str] = list(config['idempotent'])
+        self.__deadlines: dict = dict(config['deadlines'])
+
+    @staticmethod
+    def name(request: AbstractRequest) -> Optional[str]:
+        if not isinstance(request, CallRequest):
+            return None
+
+        return ' '.join([request.command(), *(request.subcommands() or [])])
+
+    def idempotent(self, request: AbstractRequest) -> bool:
+        return self.name(request) in self.__idempotent
+
+    def attempts(self, request: AbstractRequest) -> int:
+        return self.__attempts if self.idempotent(request) else 1
+
+    def deadline(self, request: AbstractRequest) -> Optional[float]:
+        """
+        Seconds for the whole call with all retries. None if call is limited by socket timeout only.
+        """
+        return self.__deadlines.get(self.name(request))
+
+    def delay(self, attempt: int) -> float:
+        """
+        Seconds to wait before the next attempt, `attempt` is a number of failed attempts.
+        """
+        return random.uniform(0, min(self.__max_delay, self.__base_delay * (2 ** (attempt - 1))))
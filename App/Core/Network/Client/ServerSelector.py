@@ -0,0 +1,77 @@
+import time
+from threading import Lock
+from typing import Dict, List, Tuple, Optional, Callable
+
+Server = Tuple[str, int]
+
+
+class ServerSelector:
+    """
+    Ranks servers of the site by 'ping' latency.
+
+    Latency is smoothed by exponential moving average. Servers not probed yet keep configured order after probed
+    ones, unreachable servers go last. Probes are repeated every `probe_interval` seconds.
+    """
+
+    # Weight of the last probe in moving average
+    SMOOTHING = 0.3
+
+    def __init__(self, probe_interval: float):
+        self.__probe_interval = probe_interval
+
+        self.__latencies: Dict[Server, Optional[float]] = {}
+        self.__probed_at: Dict[Tuple[Server, ...], float] = {}
+        self.__lock = Lock()
+
+    def observe(self, server: Server, latency: Optional[float]) -> None:
+        """
+        Add probe result. None if server did not respond.
+        """
+        with self.__lock:
+            previous = self.__latencies.get(server)
+
+            if latency is None or previous is None:
+                self.__latencies[server] = latency
+            else:
+                self.__latencies[server] = previous + (latency - previous) * self.SMOOTHING
+
+    def latency(self, server: Server) -> Optional[float]:
+        return self.__latencies.get(server)
+
+    def rank(self, servers: List[Server], available: Callable[[Server], bool]) -> List[Server]:
+        """
+        Order servers from the best one. `available` tells if server is not known to be down (circuit breaker).
+        """
+        def key(item: Tuple[int, Server]):
+            index, server = item
+            latency = self.__latencies.get(server, -1)
+
+            if not available(server) or latency is None:
+                return 2, 0.0, index
+
+            if latency < 0:
+                return 1, 0.0, index
+
+            return 0, latency, index
+
+        with self.__lock:
+            return [server for _, server in sorted(enumerate(servers), key=key)]
+
+    def need_probe(self, servers: List[Server]) -> bool:
+        """
+        True once per `probe_interval` for the servers list, the caller must probe servers then.
+        """
+        key = tuple(servers)
+        now = time.monotonic()
+
+        with self.__lock:
+            if now - self.__probed_at.get(key, -self.__probe_interval) < self.__probe_interval:
+                return False
+
+            self.__probed_at[key] = now
+
+            return True
+
+    def probed(self, servers: List[Server]) -> None:
+        with self.__lock:
+            self.__probed_at[tuple(servers)] = time.monotonic()
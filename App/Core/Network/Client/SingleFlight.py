@@ -0,0 +1,56 @@
+import json
+from threading import Lock
+from typing import Dict, Callable
+
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
+from App.Core.Network.Protocol.Requests import CallRequest
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls. While a call is in flight, identical calls share its promise instead of
+    sending a new request. Every call gets own promise of the shared result, cancelling it does not cancel the
+    request of other calls.
+
+    Counts calls and coalesced calls by call names.
+    """
+
+    def __init__(self):
+        self.__flights: Dict[str, ResponseDataPromise] = {}
+        self.__stats: Dict[str, Dict[str, int]] = {}
+        self.__lock = Lock()
+
+    @staticmethod
+    def key(request: CallRequest, config: ClientConfig) -> str:
+        return json.dumps(
+            [config.endpoints(), request.command(), request.subcommands() or [], request.parameters() or {}],
+            sort_keys=True,
+            default=str,
+        )
+
+    def call(self, name: str, key: str, send: Callable[[], ResponseDataPromise]) -> ResponseDataPromise:
+        with self.__lock:
+            stats = self.__stats.setdefault(name, {'calls': 0, 'coalesced': 0})
+            stats['calls'] += 1
+
+            if promise := self.__flights.get(key):
+                stats['coalesced'] += 1
+                return promise.share()
+
+        promise = send()
+
+        with self.__lock:
+            # Identical call could start while this one was being sent, the later one just is not shared
+            self.__flights.setdefault(key, promise)
+
+        def land(_):
+            with self.__lock:
+                if self.__flights.get(key) is promise:
+                    del self.__flights[key]
+
+        return promise.then(land).catch(land).share()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.__lock:
+            return {k: dict(v) for k, v in self.__stats.items()}
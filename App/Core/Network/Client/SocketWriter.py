@@ -0,0 +1,48 @@
+from collections import deque
+from socket import socket
+from typing import Union, List
+
+from App.Core.Network.Protocol.BufferWriter import Buffer
+
+
+class SocketWriter:
+    """
+    Sends messages created as lists of buffers.
+
+    Uses scatter-gather `sendmsg` where it is available (not on Windows), so buffers are not joined before sending.
+    Otherwise, sends buffers one by one.
+    """
+
+    # Lower than IOV_MAX on supported platforms
+    MAX_BUFFERS = 512
+
+    SCATTER_GATHER = hasattr(socket, 'sendmsg')
+
+    @staticmethod
+    def send(sock: socket, message: Union[bytes, List[Buffer]]) -> int:
+        """
+        Send message, returns its size in bytes.
+        """
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            sock.sendall(message)
+            return memoryview(message).nbytes
+
+        if not SocketWriter.SCATTER_GATHER:
+            for buffer in message:
+                sock.sendall(buffer)
+            return sum(memoryview(buffer).nbytes for buffer in message)
+
+        buffers = deque(memoryview(buffer).cast('B') for buffer in message if len(buffer))
+        size = sum(len(buffer) for buffer in buffers)
+
+        while buffers:
+            sent = sock.sendmsg([buffers[i] for i in range(min(len(buffers), SocketWriter.MAX_BUFFERS))])
+
+            while sent:
+                if sent >= len(buffers[0]):
+                    sent -= len(buffers.popleft())
+                else:
+                    buffers[0] = buffers[0][sent:]
+                    sent = 0
+
+        return size
@@ -0,0 +1,138 @@
+import random
+from socket import socket, AF_INET, SOCK_STREAM, error, SHUT_RDWR
+from threading import Thread, Event
+from typing import Optional, List, Callable
+
+from App.Core.Logger import Log
+from App.Core.Network.Client.ClientConfig import ClientConfig
+from App.Core.Network.Client.MessageReceiver import MessageReceiver
+from App.Core.Network.Client.SocketWriter import SocketWriter
+from App.Core.Network.Protocol import RCL, RCLProtocol, CallRequest
+
+
+class Subscription(Thread):
+    """
+    Long-lived connection receiving 'event' messages of server topics ('printers', 'jobs').
+
+    Lost connection is opened again with backoff until `close`. `on_connect` is called after every subscribing,
+    changes made while the client was disconnected are not pushed, so the caller reloads the state then.
+    Subscribing ends if server answers with error (server without subscriptions).
+    """
+
+    SUBSCRIBE_COMMAND = 'subscribe'
+
+    TOPIC_PRINTERS = 'printers'
+    TOPIC_JOBS = 'jobs'
+
+    TOPICS = [TOPIC_PRINTERS, TOPIC_JOBS]
+
+    def __init__(
+        self,
+        config: ClientConfig,
+        rcl: RCL,
+        log: Log,
+        topics: List[str],
+        on_event: Callable[[dict], None],
+        on_connect: Optional[Callable[[], None]] = None,
+        reconnect_delay: float = 1,
+        max_reconnect_delay: float = 30
+    ):
+        super().__init__(daemon=True)
+
+        self.__config = config
+        self.__rcl = rcl
+        self.__log = log
+        self.__topics = topics
+        self.__on_event = on_event
+        self.__on_connect = on_connect
+        self.__reconnect_delay = reconnect_delay
+        self.__max_reconnect_delay = max_reconnect_delay
+
+        self.__socket: Optional[socket] = None
+        self.__closed = Event()
+        self.__connected = False
+
+    def connected(self) -> bool:
+        return self.__connected
+
+    def close(self):
+        self.__closed.set()
+
+        if sock := self.__socket:
+            try:
+                sock.shutdown(SHUT_RDWR)
+            except error:
+                pass
+
+            sock.close()
+
+    def __subscribe(self) -> bool:
+        self.__socket = socket(AF_INET, SOCK_STREAM)
+        self.__config.tune_socket(self.__socket)
+        self.__config.connect(self.__socket)
+
+        request = CallRequest(self.SUBSCRIBE_COMMAND, [], {'topics': self.__topics})
+
+        for message in self.__rcl.create_request_messages(request):
+            SocketWriter.send(self.__socket, message)
+
+        receiver = MessageReceiver(self.__socket, self.__config.max_bytes_receive, self.__config.max_message_size)
+        message, crc_ok = receiver.receive()
+
+        if not crc_ok or not (response := self.__rcl.parse_response(message, True)):
+            raise ConnectionError("Crc check failed")
+
+        if response.type() != RCLProtocol.RCL_MESSAGE_TYPE_RETURN:
+            self.__log.warning(f"Server {self.__config.server_name()} refused subscription. {response.data()}")
+            return False
+
+        # Events can be rare, connection is idle between them
+        self.__socket.settimeout(None)
+        self.__connected = True
+
+        if self.__on_connect:
+            self.__on_connect()
+
+        while not self.__closed.is_set():
+            message, crc_ok = receiver.receive()
+
+            if not crc_ok:
+                raise ConnectionError("Crc check failed")
+
+            event = self.__rcl.parse_response(message, True)
+
+            if not event or event.type() != RCLProtocol.RCL_MESSAGE_TYPE_EVENT:
+                continue
+
+            try:
+                self.__on_event(event.data() or {})
+            except Exception as e:
+                self.__log.error(f"Event handler failed. {e}", {'object': self})
+
+        return False
+
+    def run(self):
+        attempt = 0
+
+        while not self.__closed.is_set():
+            try:
+                if not self.__subscribe():
+                    break
+            except (error, ConnectionError) as e:
+                # Backoff starts again after connection, which was subscribed
+                if self.__connected:
+                    attempt = 0
+
+                if not self.__closed.is_set():
+                    self.__log.debug(f"Subscription to {self.__config.server_name()} lost. {e}", {'object': self})
+            finally:
+                self.__connected = False
+
+                if self.__socket:
+                    self.__socket.close()
+
+            attempt += 1
+
+            # Full jitter backoff, clients do not reconnect all at once after server restart
+            delay = min(self.__max_reconnect_delay, self.__reconnect_delay * 2 ** (attempt - 1))
+            self.__closed.wait(random.uniform(0, delay))
@@ -1,11 +1,16 @@
 from socket import socket, AF_INET, SOCK_STREAM, error
-from threading import Thread
-from typing import Optional
+from threading import Thread, Event
+from typing import Optional, Union, Iterable, List
 
 from App.Core.Logger import Log
 from App.Core.Network.Client import ClientConfig
 from App.Core.Network.Client.ResponseDataPromise import ResponseDataPromise
-from App.Core.Network.Protocol import RCL, RCLProtocol
+from App.Core.Network.Client.ResponseSink import ResponseSink
+from App.Core.Network.Client.MessageReceiver import MessageReceiver
+from App.Core.Network.Client.SocketWriter import SocketWriter
+from App.Core.Network.Protocol.BufferWriter import Buffer
+from App.Core.Network.Protocol import RCL
+from App.Core.Network.Tracing import Trace
 
 
 class TcpClient(Thread):
@@ -18,56 +23,50 @@ class TcpClient(Thread):
         self.__rcl = rcl
         self.__config = config
         self.__host = (self.__config.address, self.__config.port)
-        self.__recv_size = self.__config.max_bytes_receive
 
         self.__running = True
-        self.__received_data = b""
-        self.__receive_len = 0
         self.__error_message = ""
         self.__promise: Optional[ResponseDataPromise] = None
+        self.__trace: Optional[Trace] = None
 
         self.__socket: Optional[socket] = None
 
-        self.__request = b""
-        self.__ready_to_send = False
-
-        self.__accepted = False
+        self.__request: Iterable[Union[bytes, List[Buffer]]] = []
+        self.__ready_to_send = Event()
 
     def __try_connection(self):
         self.__socket = socket(AF_INET, SOCK_STREAM)
-        self.__socket.settimeout(self.__config.timeout)
-        self.__socket.connect(self.__host)
+        self.__config.tune_socket(self.__socket)
+        self.__config.connect(self.__socket)
 
     def terminate(self):
-        self.__socket.close()
         self.__running = False
+        self.__ready_to_send.set()
 
-    def __recv_segment(self) -> bytes:
-        return self.__socket.recv(self.__recv_size)
-
-    def __determinate_len(self):
-        start_index = RCLProtocol.RCL_HEADER_INDEX_DATA_LENGTH
-        end_index = start_index + RCLProtocol.RCL_HEADER_LEN_DATA_LENGTH
-
-        _len = int.from_bytes(self.__received_data[start_index:end_index], 'big')
+        if self.__socket:
+            self.__socket.close()
 
-        self.__receive_len = RCLProtocol.RCL_HEADERS_LENGTH + _len + 4
+    def __accept(self):
+        receiver = MessageReceiver(self.__socket, self.__config.max_bytes_receive, self.__config.max_message_size)
+        header = receiver.receive_header()
 
-    def __try_accept(self):
-        try:
-            if segment := self.__recv_segment():
-                self.__received_data += segment
-
-                self.__determinate_len()
+        if (sink := self.__promise.sink()) and receiver.sinkable(header):
+            message, crc_ok = receiver.receive_to(header, sink)
+        else:
+            message, crc_ok = receiver.receive_data(header)
 
-                while len(self.__received_data) < self.__receive_len:
-                    self.__received_data += self.__recv_segment()
+        if self.__trace:
+            self.__trace.add('wait', self.__trace.sent_at(), receiver.header_time())
+            self.__trace.add('receive', receiver.header_time())
 
-                self.__accepted = True
-                self.__promise.set_result(self.__received_data)
+        if not crc_ok:
+            self.__fail((sink and sink.error()) or "Crc check failed")
+            return
 
-        except error as e:
-            self.__error_message = str(e)
+        try:
+            self.__promise.set_result(message, True)
+        except Exception as e:
+            self.__log.error(f"Response callback failed. {str(e)}", {'object': self})
 
     def get_error(self) -> Optional[str]:
         if self.__error_message:
@@ -75,37 +74,81 @@ class TcpClient(Thread):
 
         return None
 
-    def send(self, data: bytes) -> ResponseDataPromise:
-        self.__request = data
-        self.__ready_to_send = True
+    def send(
+        self,
+        data: Union[bytes, Iterable[Union[bytes, List[Buffer]]]],
+        trace: Optional[Trace] = None,
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
+        """
+        Send request messages. Response payload is written to `sink` if it is set.
+        """
+        self.__request = [data] if isinstance(data, bytes) else data
+        self.__trace = trace
+        self.__promise = ResponseDataPromise(self.__rcl, trace, sink)
+
+        # Cancelled request closes its connection
+        self.__promise.on_cancel(self.terminate)
 
-        self.__promise = ResponseDataPromise(self.__rcl)
+        self.__ready_to_send.set()
 
         return self.__promise
 
+    def __send_request(self):
+        if not (trace := self.__trace):
+            for message in self.__request:
+                SocketWriter.send(self.__socket, message)
+            return
+
+        messages = iter(self.__request)
+        started = trace.now()
+
+        # Messages are created lazily, creating time is measured separately from sending time
+        for message in messages:
+            started = trace.add('encode', started)
+            size = SocketWriter.send(self.__socket, message)
+            started = trace.add('upload', started)
+            trace.sent(size)
+
+        trace.add('encode', started)
+
+    def __fail(self, message: str):
+        self.__error_message = message
+
+        self.__log.error(message, {'object': self})
+
+        if self.__promise:
+            self.__promise.set_error(message)
+
     def run(self):
+        started = Trace.now()
+
         try:
             self.__try_connection()
         except error as e:
-            message = f"Cannot connect to server: {str(e)}"
+            self.__error_message = f"Cannot connect to server: {str(e)}"
 
-            self.__log.error(message, {'object': self})
+        connected = Trace.now()
 
-            self.terminate()
+        # Sleep until the request is passed, an idle client does not use CPU
+        self.__ready_to_send.wait()
 
-            if self.__promise:
-                self.__promise.set_error(message)
+        if not self.__running:
+            return
 
-        while self.__running:
-            if not self.__ready_to_send:
-                continue
-
-            self.__ready_to_send = False
-
-            self.__socket.sendall(self.__request)
+        if self.__error_message:
+            self.__fail(self.__error_message)
+            self.terminate()
+            return
 
-            while not self.__accepted:
-                self.__try_accept()
-                continue
+        if self.__trace:
+            self.__trace.add('connect', started, connected)
 
+        try:
+            self.__send_request()
+            self.__accept()
+        except (error, ConnectionError) as e:
+            if self.__running:
+                self.__fail(f"Request failed: {str(e)}")
+        finally:
             self.terminate()
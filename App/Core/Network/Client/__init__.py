@@ -1,9 +1,36 @@
 from .TcpClient import TcpClient
-from .ResponseDataPromise import ResponseDataPromise
+from .ResponseDataPromise import ResponseDataPromise, RequestError
 from .ClientConfig import ClientConfig
+from .SocketWriter import SocketWriter
+from .MessageReceiver import MessageReceiver
+from .MultiplexClient import MultiplexClient
+from .ConnectionPool import ConnectionPool
+from .AsyncClient import AsyncClient
+from .AsyncBridge import AsyncBridge
+from .CircuitBreaker import CircuitBreaker
+from .RetryPolicy import RetryPolicy
+from .ServerSelector import ServerSelector
+from .ResponseCache import ResponseCache
+from .SingleFlight import SingleFlight
+from .Subscription import Subscription
+from .ResponseSink import ResponseSink
 
 __all__ = [
     'TcpClient',
     'ResponseDataPromise',
+    'RequestError',
     'ClientConfig',
+    'SocketWriter',
+    'MessageReceiver',
+    'MultiplexClient',
+    'ConnectionPool',
+    'AsyncClient',
+    'AsyncBridge',
+    'CircuitBreaker',
+    'RetryPolicy',
+    'ServerSelector',
+    'ResponseCache',
+    'SingleFlight',
+    'Subscription',
+    'ResponseSink',
 ]
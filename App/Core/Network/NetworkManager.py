@@ -1,28 +1,530 @@
+import time
+from threading import Lock, Thread
+from typing import Dict, Tuple, Optional, List, Callable
+
 from App.Core.Network import TcpClient
-from App.Core.Network.Client import ResponseDataPromise, ClientConfig
-from App.Core.Utils.ExecLater import ExecLater
-from App.Core.Network.Protocol.Requests import AbstractRequest
+from App.Core.Network.Client import ResponseDataPromise, ClientConfig, ConnectionPool, AsyncClient, AsyncBridge, \
+    CircuitBreaker, RetryPolicy, ServerSelector, ResponseCache, SingleFlight, Subscription, ResponseSink
+from App.Core.Network.Protocol.Requests import AbstractRequest, CallRequest
 from App.Core import Config, Platform
 from App.Core.Logger import Log
-from App.Core.Network.Protocol import RCL
+from App.Core.Network.Protocol import RCL, RCLProtocol
+from App.Core.Network.Protocol.Responses import AbstractResponse
+from App.Core.Network.Tracing import Tracer, Trace, Capture
 
 if Platform.system_is('Windows'):
     import msvcrt
 
 
+# Topic, callback of items, callback of reconnecting
+Listener = Tuple[str, Callable[[dict, str], None], Optional[Callable[[str], None]]]
+
+
 class NetworkManager:
-    def __init__(self, log: Log, config: Config, rcl: RCL, platform: Platform):
+    # Cached call refreshed by 'printers' events
+    PRINTERS_LIST_CALL = 'printers list'
+
+    def __init__(self, log: Log, config: Config, rcl: RCL, platform: Platform, tracer: Tracer, capture: Capture):
         self.__logger = log
         self.__config = config
         self.__protocol = rcl
         self.__platform = platform
+        self.__tracer = tracer
+        self.__capture = capture
+
+        self.__pool = ConnectionPool(config, rcl, log)
+
+        self.__async_clients: Dict[Tuple[str, int], AsyncClient] = {}
+        self.__async_lock = Lock()
+
+        self.__retry = RetryPolicy(config.get('client.retry'))
+        self.__breaker_config = config.get('client.circuit_breaker')
+        self.__breakers: Dict[Tuple[str, int], CircuitBreaker] = {}
+        self.__breakers_lock = Lock()
+
+        self.__selector = ServerSelector(float(config.get('client.servers_probe_interval')))
+
+        self.__cache = ResponseCache(config.get('client.cache'))
+        self.__flights = SingleFlight()
+
+        self.__subscriptions_config = config.get('client.subscriptions')
+        self.__subscriptions: Dict[Tuple[str, int], Subscription] = {}
+        self.__listeners: Dict[Tuple[str, int], List[Listener]] = {}
+        self.__subscriptions_lock = Lock()
 
     def __debug(self, message: str):
         self.__logger.debug(message, {'object': self})
 
+    def async_client(self, config: ClientConfig) -> AsyncClient:
+        """
+        asyncio client of the server. Calls of one client share its concurrency limit.
+        """
+        key = (config.address, config.port)
+
+        with self.__async_lock:
+            if key not in self.__async_clients:
+                self.__async_clients[key] = AsyncClient(config, self.__protocol, self.__logger)
+
+            return self.__async_clients[key]
+
+    async def request_async(self, request: AbstractRequest, config: ClientConfig) -> AbstractResponse:
+        return await self.async_client(config).request(request)
+
+    def request_in_loop(self, request: AbstractRequest, config: ClientConfig) -> ResponseDataPromise:
+        """
+        Send request with asyncio client on the background loop. For callers without running event loop (Qt UI).
+        """
+        return AsyncBridge.promise(self.async_client(config).request_raw(request), self.__protocol)
+
+    def circuit_breaker(self, config: ClientConfig) -> CircuitBreaker:
+        key = (config.address, config.port)
+
+        with self.__breakers_lock:
+            if key not in self.__breakers:
+                self.__breakers[key] = CircuitBreaker(
+                    int(self.__breaker_config['failures']),
+                    float(self.__breaker_config['reset_timeout'])
+                )
+
+            return self.__breakers[key]
+
+    def servers(self, config: ClientConfig) -> List[ClientConfig]:
+        """
+        Configs of all servers from the best one. Servers are probed in background once per probe interval.
+        """
+        if len(endpoints := config.endpoints()) == 1:
+            return [config]
+
+        if self.__selector.need_probe(endpoints):
+            Thread(target=self.probe, args=(config,), daemon=True).start()
+
+        def available(server: Tuple[str, int]) -> bool:
+            return self.circuit_breaker(config.for_server(*server)).state() != CircuitBreaker.STATE_OPEN
+
+        ranked = self.__selector.rank(endpoints, available)
+
+        return [config.for_server(*x) for x in ranked]
+
+    def probe(self, config: ClientConfig) -> Dict[str, Optional[float]]:
+        """
+        Ping all servers in parallel. Returns latency in seconds per server, None if server did not respond in
+        `connect_timeout`. Results update servers ranking and circuit breakers.
+        """
+        latencies: Dict[str, Optional[float]] = {}
+
+        def pong(server: ClientConfig, started: float):
+            latencies[server.server_name()] = time.perf_counter() - started
+
+        self.__selector.probed(config.endpoints())
+
+        servers = [config.for_server(*x) for x in config.endpoints()]
+        timeout = config.connect_timeout or config.timeout
+        pings = []
+
+        # Servers are pinged at once, slow server does not delay the others
+        for server in servers:
+            started = time.perf_counter()
+            # Pooled connection of server keeps its capabilities
+            ping = self.__send(self.__protocol.capabilities_request(), server, None).with_timeout(timeout)
+            pings.append(ping.then(lambda _, s=server, t=started: pong(s, t)))
+
+        for ping in pings:
+            ping.wait_result()
+
+        for server in servers:
+            latency = latencies.setdefault(server.server_name(), None)
+            breaker = self.circuit_breaker(server)
+
+            self.__selector.observe((server.address, server.port), latency)
+
+            if latency is None:
+                breaker.failure()
+            else:
+                breaker.success()
+
+        return latencies
+
+    def broadcast(self, request: AbstractRequest, config: ClientConfig) -> Dict[str, ResponseDataPromise]:
+        """
+        Send request to every server. Promises by server names ('address:port').
+        """
+        return {
+            server.server_name(): self.request(request, server)
+            for server in (config.for_server(*x) for x in config.endpoints())
+        }
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Remove cached responses of call (e.g. 'printers list') or all cached responses.
+        """
+        self.__cache.invalidate(name)
+
+    def listen(
+        self,
+        config: ClientConfig,
+        topic: str,
+        callback: Callable[[dict, str], None],
+        on_reconnect: Optional[Callable[[str], None]] = None
+    ) -> Callable[[], None]:
+        """
+        Call `callback(item, server)` on every changed item of topic ('printers', 'jobs') pushed by servers of config.
+        `on_reconnect(server)` is called when lost subscription to server is connected again, server pushes states
+        it knows then. Callbacks run on subscription thread. Returns function removing the listener.
+
+        Servers are subscribed while they have listeners. Printers events refresh cached printers list.
+        """
+        if not self.__subscriptions_config['enabled']:
+            return lambda: None
+
+        servers = [config.for_server(*x) for x in config.endpoints()]
+        listener = (topic, callback, on_reconnect)
+
+        with self.__subscriptions_lock:
+            for server in servers:
+                key = (server.address, server.port)
+
+                self.__listeners.setdefault(key, []).append(listener)
+
+                if key not in self.__subscriptions:
+                    self.__subscriptions[key] = self.__subscribe(server)
+
+        def remove():
+            with self.__subscriptions_lock:
+                for _server in servers:
+                    _key = (_server.address, _server.port)
+
+                    if listener in (listeners := self.__listeners.get(_key, [])):
+                        listeners.remove(listener)
+
+                    if not listeners and (subscription := self.__subscriptions.pop(_key, None)):
+                        self.__listeners.pop(_key, None)
+                        subscription.close()
+
+        return remove
+
+    def __subscribe(self, server: ClientConfig) -> Subscription:
+        key = (server.address, server.port)
+
+        def on_event(event: dict):
+            if event.get(Subscription.TOPIC_PRINTERS):
+                self.__cache.invalidate(self.PRINTERS_LIST_CALL)
+
+            with self.__subscriptions_lock:
+                listeners = list(self.__listeners.get(key, []))
+
+            for topic, callback, _ in listeners:
+                for item in event.get(topic) or []:
+                    callback(item, server.server_name())
+
+        connects = [0]
+
+        def on_connect():
+            # Printers could change while connection was lost
+            self.__cache.invalidate(self.PRINTERS_LIST_CALL)
+
+            connects[0] += 1
+
+            if connects[0] == 1:
+                return
+
+            with self.__subscriptions_lock:
+                listeners = list(self.__listeners.get(key, []))
+
+            for _, _, on_reconnect in listeners:
+                try:
+                    if on_reconnect:
+                        on_reconnect(server.server_name())
+                except Exception as e:
+                    self.__logger.error(f"Reconnect handler failed. {e}", {'object': self})
+
+        subscription = Subscription(
+            server,
+            self.__protocol,
+            self.__logger,
+            Subscription.TOPICS,
+            on_event,
+            on_connect,
+            float(self.__subscriptions_config['reconnect_delay']),
+            float(self.__subscriptions_config['max_reconnect_delay']),
+        )
+
+        subscription.start()
+
+        return subscription
+
+    def request(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        deadline: Optional[float] = None,
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
+        """
+        Send request. Responses of read-only calls are cached (`client.cache`): fresh response is returned without
+        call, stale response is returned at once and refreshed in background. Versioned responses are refreshed by
+        conditional call, server answers 'not_modified' if data is the same.
+
+        Response payload of call with `sink` is written to the file or stream of sink while it is received, response
+        data is the sink target then. Such calls are neither cached nor coalesced.
+        """
+        if sink:
+            return self.__call(request, config, deadline, sink)
+
+        if not self.__cache.cacheable(request):
+            return self.__flight(request, config, deadline)
+
+        key = self.__cache.key(request, config)
 
-    def request(self, request: AbstractRequest, config: ClientConfig) -> ResponseDataPromise:
+        if self.__cache.refresh(request):
+            return self.__cached_call(request, config, deadline, key)
+
+        if cached := self.__cache.get(request, key):
+            data, fresh = cached
+
+            if not fresh and self.__cache.begin_refresh(key):
+                self.__cached_call(request, config, deadline, key).then(
+                    lambda _: self.__cache.end_refresh(key)
+                ).catch(
+                    lambda _: self.__cache.end_refresh(key)
+                )
+
+            promise = ResponseDataPromise(self.__protocol)
+            promise.set_result(data, True)
+
+            return promise
+
+        return self.__cached_call(request, config, deadline, key)
+
+    def __cached_call(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        deadline: Optional[float],
+        key: str
+    ) -> ResponseDataPromise:
+        call = request
+
+        if held := self.__cache.held(key):
+            call = CallRequest(
+                request.command(),
+                list(request.subcommands() or []),
+                {**(request.parameters() or {}), ResponseCache.VERSION_PARAMETER: held[1]}
+            )
+
+        sent = self.__flight(call, config, deadline)
+        promise = ResponseDataPromise(self.__protocol)
+
+        def on_success(response: AbstractResponse):
+            if held and response.type() == RCLProtocol.RCL_MESSAGE_TYPE_NOT_MODIFIED:
+                self.__cache.touch(key)
+                promise.set_result(held[0], True)
+                return
+
+            if response.type() == RCLProtocol.RCL_MESSAGE_TYPE_RETURN:
+                self.__cache.put(request, key, sent.data(), response.version())
+
+            promise.set_result(sent.data(), True)
+
+        sent.then(on_success).catch(lambda message: promise.set_error(message, sent.is_transport_error()))
+        promise.on_cancel(sent.cancel)
+
+        return promise
+
+    def coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Idempotent calls and calls coalesced with identical call in flight, by call names.
+        """
+        return self.__flights.stats()
+
+    def __flight(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        deadline: Optional[float] = None
+    ) -> ResponseDataPromise:
+        """
+        Identical idempotent calls in flight share one request.
+        """
+        if not self.__retry.idempotent(request):
+            return self.__call(request, config, deadline)
+
+        return self.__flights.call(
+            RetryPolicy.name(request),
+            SingleFlight.key(request, config),
+            lambda: self.__call(request, config, deadline)
+        )
+
+    def __call(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        deadline: Optional[float] = None,
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
+        """
+        Send request to the best server of config. Idempotent calls are retried on connection errors with backoff on
+        the next server until `deadline` seconds pass, default deadline is set per call in `client.retry.deadlines`.
+        Calls to servers, which are down, fail at once. Cancelling the promise or passing the deadline cancels the
+        request in flight, cancelled call is not retried.
+        """
+        servers = self.servers(config)
+        promise = ResponseDataPromise(self.__protocol, sink=sink)
+        trace = self.__tracer.start(RetryPolicy.name(request) or 'stream')
+        settled = Lock()
+        current: List[ResponseDataPromise] = []
+
+        def settle(callback, ok: bool):
+            # Deadline timer and attempts race to resolve the promise, the first one wins
+            if not settled.acquire(blocking=False):
+                return
+
+            # Trace is finished before callbacks of promise run, so their time is not counted. Tracing must not leave
+            # the promise unsettled
+            try:
+                if trace:
+                    self.__tracer.finish(trace, ok)
+            except Exception as e:
+                self.__logger.error(f"Cannot finish trace. {e}", {'object': self})
+
+            callback()
+
+        def stop():
+            # Request in flight is not needed anymore
+            for result in list(current):
+                result.cancel()
+
+        def expire():
+            settle(lambda: promise.set_error(f"Server did not respond in {deadline} s.", False), False)
+            stop()
+
+        def cancel():
+            settle(lambda: None, False)
+            stop()
+
+        def pick(start: int) -> Optional[Tuple[int, CircuitBreaker]]:
+            # The first server from `start`, which breaker lets the call through
+            for index in [*range(start, len(servers)), *range(0, start)]:
+                if (breaker := self.circuit_breaker(servers[index])).allow():
+                    return index, breaker
+
+            return None
+
+        if not (target := pick(0)):
+            retry_after = min(self.circuit_breaker(x).retry_after() for x in servers)
+            names = ', '.join(x.server_name() for x in servers)
+            message = f"Server {names} is unavailable. Retry in {retry_after:.0f} s."
+            settle(lambda: promise.set_error(message), False)
+            return promise
+
+        deadline = self.__retry.deadline(request) if deadline is None else deadline
+        expires_at = time.monotonic() + deadline if deadline else None
+        attempts = self.__retry.attempts(request)
+
+        if attempts > 1:
+            attempts = max(attempts, len(servers))
+
+        def attempt(number: int, index: int, breaker: CircuitBreaker):
+            if promise.status() != ResponseDataPromise.STATUS_WAIT:
+                # Half-open breaker let this call through as its trial
+                breaker.release()
+                return
+
+            if trace:
+                trace.attempts = number
+
+            result = self.__send(request, servers[index], trace, sink)
+            current[:] = [result]
+
+            # Deadline or caller could stop the call while it was connecting
+            if promise.status() != ResponseDataPromise.STATUS_WAIT:
+                result.cancel()
+
+            def on_success(response: AbstractResponse):
+                breaker.success()
+                # Response is parsed already, its data is decoded once for all consumers
+                settle(lambda: promise.resolve(response, result.data()), True)
+
+            def on_error(message: Optional[str]):
+                if result.cancelled():
+                    # Stopped by deadline or caller, the call says nothing about the server
+                    breaker.release()
+                    return
+
+                if not result.is_transport_error():
+                    breaker.success()
+                    settle(lambda: promise.set_error(message, False, result.error_type()), False)
+                    return
+
+                breaker.failure()
+
+                delay = self.__retry.delay(number)
+
+                if number >= attempts or (expires_at and time.monotonic() + delay >= expires_at):
+                    settle(lambda: promise.set_error(message), False)
+                    return
+
+                if not (following := pick((index + 1) % len(servers))):
+                    settle(lambda: promise.set_error(message), False)
+                    return
+
+                self.__logger.debug(
+                    f"Retry {RetryPolicy.name(request)} on {servers[following[0]].server_name()} in {delay:.2f} s: "
+                    f"{message}"
+                )
+
+                AsyncBridge.call_later(
+                    delay,
+                    lambda: Thread(target=attempt, args=(number + 1, *following), daemon=True).start()
+                )
+
+            result.then(on_success).catch(on_error)
+
+        if deadline:
+            AsyncBridge.call_later(deadline, expire)
+
+        promise.on_cancel(cancel)
+
+        attempt(1, *target)
+
+        return promise
+
+    def __send(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        trace: Optional[Trace],
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
+        """
+        Send request to the server of config. Request and response messages are written to capture log if capture
+        is enabled (`client.capture`).
+        """
+        if not self.__capture.enabled():
+            return self.__transmit(request, config, trace, sink)
+
+        call_id = self.__capture.request(request)
+        started = Trace.now()
+        result = self.__transmit(request, config, trace, sink)
+
+        result.then(
+            lambda _: self.__capture.response(call_id, result.data(), Trace.now() - started)
+        ).catch(
+            lambda message: self.__capture.error(call_id, message, Trace.now() - started)
+        )
+
+        return result
+
+    def __transmit(
+        self,
+        request: AbstractRequest,
+        config: ClientConfig,
+        trace: Optional[Trace],
+        sink: Optional[ResponseSink] = None
+    ) -> ResponseDataPromise:
         try:
+            if self.__pool.enabled() or config.multiplex:
+                return self.__pool.request(request, config, trace, sink)
+
             client = TcpClient(config, self.__protocol, self.__logger)
 
             client.start()
@@ -30,20 +532,24 @@ class NetworkManager:
             if config.debug:
                 self.__debug(f"Client started")
 
-            _data = self.__protocol.create_request(request)
+            messages = self.__protocol.create_request_messages(request)
 
-            self.__logger.debug(f"Sending request len: {len(_data)} bytes")
+            self.__logger.debug(f"Sending request. Max packet size: {self.__protocol.max_packet_size()} bytes")
 
-            return client.send(_data)
+            return client.send(messages, trace, sink)
         except KeyboardInterrupt:
             if config.debug:
                 self.__logger.debug(f"Client stopped.")
-        except (ConnectionRefusedError, TimeoutError) as e:
-            self.__logger.error(f'Cannot connect to server. {str(e)}')
 
             promise = ResponseDataPromise(self.__protocol)
+            promise.set_error('Request cancelled', False)
 
-            ExecLater(10, lambda: promise.set_error('Cannot connect to server.')).start()
+            return promise
+        except OSError as e:
+            self.__logger.error(f'Cannot connect to server. {str(e)}')
+
+            promise = ResponseDataPromise(self.__protocol)
+            promise.set_error('Cannot connect to server.')
 
             return promise
 
@@ -0,0 +1,489 @@
+import json
+import struct
+from typing import Any, Dict, List, Tuple, Optional, FrozenSet, Callable
+
+Writer = Callable[[bytearray, Any], None]
+Reader = Callable[[bytes, int], Tuple[Any, int]]
+
+
+class BinaryValueCodec:
+    """
+    Compact binary encoding of response values.
+
+    Value is a tag byte and tag data:
+
+      +------+--------------+----------------------------------------------------------------+
+      | Tag  | Name         | Data                                                           |
+      +------+--------------+----------------------------------------------------------------+
+      | 0x00 | null         |                                                                |
+      | 0x01 | false        |                                                                |
+      | 0x02 | true         |                                                                |
+      | 0x03 | int          | Zigzag varint.                                                 |
+      | 0x04 | float        | 8 bytes double.                                                |
+      | 0x05 | str          | Varint len, utf-8 data.                                        |
+      | 0x06 | bytes        | Varint len, data.                                              |
+      | 0x07 | array        | Varint count, values.                                          |
+      | 0x08 | typed array  | Item tag, varint count, items data without tags.               |
+      | 0x09 | map          | Varint count, pairs of key (len-prefixed str) and value.       |
+      | 0x0A | object       | Varint object code, fields data in schema order.               |
+      | 0x0B | object array | Varint object code, varint count, objects fields data.         |
+      | 0x0C | json         | Varint len, JSON data (fallback for values out of this format) |
+      +------+--------------+----------------------------------------------------------------+
+
+    Objects are declared in `objects` section of proto file. Map with exactly the fields of an object is encoded as
+    the object: field names and value tags are not sent, field types are taken from schema. Nullable field data is
+    preceded by a presence byte. Object codes are indexes of objects sorted by name, so both sides must have the same
+    `objects` section. Maps which do not match the object types are written as tagged maps.
+    """
+
+    TAG_NULL = 0x00
+    TAG_FALSE = 0x01
+    TAG_TRUE = 0x02
+    TAG_INT = 0x03
+    TAG_FLOAT = 0x04
+    TAG_STR = 0x05
+    TAG_BYTES = 0x06
+    TAG_ARRAY = 0x07
+    TAG_TYPED_ARRAY = 0x08
+    TAG_MAP = 0x09
+    TAG_OBJECT = 0x0A
+    TAG_OBJECT_ARRAY = 0x0B
+    TAG_JSON = 0x0C
+
+    FLOAT_STRUCT = struct.Struct('>d')
+
+    # Tags of typed arrays items
+    TYPED_TAGS = {
+        int: TAG_INT,
+        float: TAG_FLOAT,
+        str: TAG_STR,
+        bytes: TAG_BYTES,
+    }
+
+    SCHEMA_TYPES = {
+        'int': int,
+        'float': float,
+        'bool': bool,
+        'str': str,
+    }
+
+    class MismatchError(Exception):
+        pass
+
+    def __init__(self, types: dict):
+        self.__codes: Dict[str, int] = {}
+        self.__objects: Dict[int, Tuple[str, List[Tuple[str, dict]]]] = {}
+        self.__fields: Dict[FrozenSet[str], int] = {}
+
+        self.__writers: Dict[int, Writer] = {}
+        self.__readers: Dict[int, Reader] = {}
+
+        for code, (name, fields) in enumerate(sorted(types.items())):
+            self.__codes[name] = code
+            self.__objects[code] = (name, list(fields.items()))
+            self.__fields[frozenset(fields.keys())] = code
+
+        for code in self.__objects:
+            self.__compile_fields(code)
+
+    @staticmethod
+    def __write_varint(out: bytearray, value: int):
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        out.append(value)
+
+    @staticmethod
+    def __read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+        value = 0
+        shift = 0
+
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+
+            if byte < 0x80:
+                return value, pos
+
+            shift += 7
+
+    @staticmethod
+    def __write_int(out: bytearray, value: int):
+        BinaryValueCodec.__write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+    @staticmethod
+    def __read_int(data: bytes, pos: int) -> Tuple[int, int]:
+        value, pos = BinaryValueCodec.__read_varint(data, pos)
+
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+
+    @staticmethod
+    def __write_str(out: bytearray, value: str):
+        BinaryValueCodec.__write_bytes(out, value.encode('utf-8'))
+
+    @staticmethod
+    def __write_bytes(out: bytearray, value: bytes):
+        if len(value) < 0x80:
+            out.append(len(value))
+        else:
+            BinaryValueCodec.__write_varint(out, len(value))
+
+        out += value
+
+    @staticmethod
+    def __read_bytes(data: bytes, pos: int) -> Tuple[bytes, int]:
+        _len, pos = BinaryValueCodec.__read_varint(data, pos)
+
+        return data[pos:pos + _len], pos + _len
+
+    def __write_scalar(self, out: bytearray, tag: int, value: Any):
+        if tag == self.TAG_INT:
+            self.__write_int(out, value)
+        elif tag == self.TAG_FLOAT:
+            out += self.FLOAT_STRUCT.pack(value)
+        elif tag == self.TAG_STR:
+            self.__write_str(out, value)
+        else:
+            self.__write_bytes(out, value)
+
+    def __read_scalar(self, data: bytes, pos: int, tag: int) -> Tuple[Any, int]:
+        if tag == self.TAG_INT:
+            return self.__read_int(data, pos)
+
+        if tag == self.TAG_FLOAT:
+            return self.FLOAT_STRUCT.unpack_from(data, pos)[0], pos + self.FLOAT_STRUCT.size
+
+        value, pos = self.__read_bytes(data, pos)
+
+        return (str(value, 'utf-8') if tag == self.TAG_STR else bytes(value)), pos
+
+    def __compile_scalar(self, schema_type: type) -> Tuple[Writer, Reader]:
+        if schema_type is bool:
+            def write_bool(out: bytearray, value: Any):
+                if type(value) is not bool:
+                    raise self.MismatchError()
+
+                out.append(value)
+
+            return write_bool, lambda data, pos: (data[pos] == 1, pos + 1)
+
+        tag = self.TYPED_TAGS[schema_type]
+
+        def write(out: bytearray, value: Any):
+            if type(value) is not schema_type:
+                raise self.MismatchError()
+
+            self.__write_scalar(out, tag, value)
+
+        if schema_type is str:
+            def read_str(data: bytes, pos: int) -> Tuple[str, int]:
+                # Short strings have one byte length
+                if (_len := data[pos]) < 0x80:
+                    return str(data[pos + 1:pos + 1 + _len], 'utf-8'), pos + 1 + _len
+
+                return self.__read_scalar(data, pos, tag)
+
+            return write, read_str
+
+        return write, lambda data, pos: self.__read_scalar(data, pos, tag)
+
+    def __compile_type(self, _type: dict) -> Tuple[Writer, Reader]:
+        """
+        Writer and reader of value without tag by schema type.
+        """
+        typename = _type['type']
+
+        if schema_type := self.SCHEMA_TYPES.get(typename):
+            write, read = self.__compile_scalar(schema_type)
+        elif typename in ('array', 'map'):
+            write, read = self.__compile_container(typename, _type.get('value_type'))
+        else:
+            write, read = self.__compile_object(typename)
+
+        if not _type['nullable']:
+            return write, read
+
+        def write_nullable(out: bytearray, value: Any):
+            out.append(value is not None)
+
+            if value is not None:
+                write(out, value)
+
+        def read_nullable(data: bytes, pos: int) -> Tuple[Any, int]:
+            return read(data, pos + 1) if data[pos] else (None, pos + 1)
+
+        return write_nullable, read_nullable
+
+    def __compile_container(self, typename: str, value_type: Optional[dict]) -> Tuple[Writer, Reader]:
+        write_item, read_item = self.__compile_type(value_type) if value_type else (self.__write_value, self.__read_value)
+
+        if typename == 'array':
+            def write_array(out: bytearray, value: Any):
+                if type(value) is not list:
+                    raise self.MismatchError()
+
+                self.__write_varint(out, len(value))
+
+                for item in value:
+                    write_item(out, item)
+
+            def read_array(data: bytes, pos: int) -> Tuple[list, int]:
+                count, pos = self.__read_varint(data, pos)
+                items = []
+
+                for _ in range(count):
+                    item, pos = read_item(data, pos)
+                    items.append(item)
+
+                return items, pos
+
+            return write_array, read_array
+
+        def write_map(out: bytearray, value: Any):
+            if type(value) is not dict:
+                raise self.MismatchError()
+
+            self.__write_varint(out, len(value))
+
+            for key, item in value.items():
+                if type(key) is not str:
+                    raise self.MismatchError()
+
+                self.__write_str(out, key)
+                write_item(out, item)
+
+        def read_map(data: bytes, pos: int) -> Tuple[dict, int]:
+            count, pos = self.__read_varint(data, pos)
+            items = {}
+
+            for _ in range(count):
+                key, pos = self.__read_bytes(data, pos)
+                items[str(key, 'utf-8')], pos = read_item(data, pos)
+
+            return items, pos
+
+        return write_map, read_map
+
+    def __compile_object(self, typename: str) -> Tuple[Writer, Reader]:
+        if typename not in self.__codes:
+            raise Exception(f"Undefined object '{typename}'")
+
+        code = self.__codes[typename]
+
+        # Nested objects are compiled on first use, so objects can reference each other
+        def write(out: bytearray, value: Any):
+            if type(value) is not dict or self.__object_code(value) != code:
+                raise self.MismatchError()
+
+            self.__writers[code](out, value)
+
+        return write, lambda data, pos: self.__readers[code](data, pos)
+
+    def __compile_fields(self, code: int):
+        names = []
+        writers = []
+        readers = []
+
+        for name, _type in self.__objects[code][1]:
+            write, read = self.__compile_type(_type)
+            names.append(name)
+            writers.append(write)
+            readers.append(read)
+
+        fields = list(zip(names, writers))
+        readers = list(zip(names, readers))
+
+        def write_fields(out: bytearray, value: dict):
+            for field, write_field in fields:
+                write_field(out, value[field])
+
+        def read_fields(data: bytes, pos: int) -> Tuple[dict, int]:
+            value = {}
+
+            for field, read_field in readers:
+                value[field], pos = read_field(data, pos)
+
+            return value, pos
+
+        self.__writers[code] = write_fields
+        self.__readers[code] = read_fields
+
+    def __object_code(self, value: dict) -> Optional[int]:
+        return self.__fields.get(frozenset(value.keys())) if self.__fields else None
+
+    def __write_object(self, out: bytearray, value: dict) -> bool:
+        if (code := self.__object_code(value)) is None:
+            return False
+
+        data = bytearray()
+
+        try:
+            self.__writers[code](data, value)
+        except self.MismatchError:
+            return False
+
+        out.append(self.TAG_OBJECT)
+        self.__write_varint(out, code)
+        out += data
+
+        return True
+
+    def __write_object_array(self, out: bytearray, value: list) -> bool:
+        if type(value[0]) is not dict or (code := self.__object_code(value[0])) is None:
+            return False
+
+        data = bytearray()
+
+        try:
+            for item in value:
+                if type(item) is not dict or self.__object_code(item) != code:
+                    return False
+
+                self.__writers[code](data, item)
+        except self.MismatchError:
+            return False
+
+        out.append(self.TAG_OBJECT_ARRAY)
+        self.__write_varint(out, code)
+        self.__write_varint(out, len(value))
+        out += data
+
+        return True
+
+    def __write_typed_array(self, out: bytearray, value: list) -> bool:
+        _type = type(value[0])
+
+        if (tag := self.TYPED_TAGS.get(_type)) is None or any(type(x) is not _type for x in value):
+            return False
+
+        out.append(self.TAG_TYPED_ARRAY)
+        out.append(tag)
+        self.__write_varint(out, len(value))
+
+        for item in value:
+            self.__write_scalar(out, tag, item)
+
+        return True
+
+    def __write_value(self, out: bytearray, value: Any):
+        _type = type(value)
+
+        if value is None:
+            out.append(self.TAG_NULL)
+        elif _type is bool:
+            out.append(self.TAG_TRUE if value else self.TAG_FALSE)
+        elif _type in self.TYPED_TAGS:
+            out.append(tag := self.TYPED_TAGS[_type])
+            self.__write_scalar(out, tag, value)
+        elif _type is list:
+            if value and (self.__write_object_array(out, value) or self.__write_typed_array(out, value)):
+                return
+
+            out.append(self.TAG_ARRAY)
+            self.__write_varint(out, len(value))
+
+            for item in value:
+                self.__write_value(out, item)
+        elif _type is dict and all(type(x) is str for x in value.keys()):
+            if self.__write_object(out, value):
+                return
+
+            out.append(self.TAG_MAP)
+            self.__write_varint(out, len(value))
+
+            for key, item in value.items():
+                self.__write_str(out, key)
+                self.__write_value(out, item)
+        else:
+            out.append(self.TAG_JSON)
+            self.__write_str(out, json.dumps(value))
+
+    def __read_value(self, data: bytes, pos: int) -> Tuple[Any, int]:
+        tag = data[pos]
+        pos += 1
+
+        if tag == self.TAG_NULL:
+            return None, pos
+
+        if tag == self.TAG_FALSE or tag == self.TAG_TRUE:
+            return tag == self.TAG_TRUE, pos
+
+        if tag in (self.TAG_INT, self.TAG_FLOAT, self.TAG_STR, self.TAG_BYTES):
+            return self.__read_scalar(data, pos, tag)
+
+        if tag == self.TAG_ARRAY:
+            count, pos = self.__read_varint(data, pos)
+            items = []
+
+            for _ in range(count):
+                item, pos = self.__read_value(data, pos)
+                items.append(item)
+
+            return items, pos
+
+        if tag == self.TAG_TYPED_ARRAY:
+            item_tag = data[pos]
+            count, pos = self.__read_varint(data, pos + 1)
+            items = []
+
+            for _ in range(count):
+                item, pos = self.__read_scalar(data, pos, item_tag)
+                items.append(item)
+
+            return items, pos
+
+        if tag == self.TAG_MAP:
+            count, pos = self.__read_varint(data, pos)
+            items = {}
+
+            for _ in range(count):
+                key, pos = self.__read_bytes(data, pos)
+                items[str(key, 'utf-8')], pos = self.__read_value(data, pos)
+
+            return items, pos
+
+        if tag == self.TAG_OBJECT:
+            code, pos = self.__read_varint(data, pos)
+
+            return self.__readers[self.__check_code(code)](data, pos)
+
+        if tag == self.TAG_OBJECT_ARRAY:
+            code, pos = self.__read_varint(data, pos)
+            count, pos = self.__read_varint(data, pos)
+            items = []
+
+            for _ in range(count):
+                item, pos = self.__readers[self.__check_code(code)](data, pos)
+                items.append(item)
+
+            return items, pos
+
+        if tag == self.TAG_JSON:
+            value, pos = self.__read_bytes(data, pos)
+
+            return json.loads(str(value, 'utf-8')), pos
+
+        raise Exception(f"Unknown binary value tag {tag}")
+
+    def __check_code(self, code: int) -> int:
+        if code not in self.__objects:
+            raise Exception(f"Unknown object code {code}. Proto files of client and server are different")
+
+        return code
+
+    def encode(self, value: Any) -> bytes:
+        out = bytearray()
+
+        self.__write_value(out, value)
+
+        return bytes(out)
+
+    def decode(self, data: bytes) -> Any:
+        value, pos = self.__read_value(memoryview(data), 0)
+
+        if pos != len(data):
+            raise Exception(f"Binary value has {len(data) - pos} trailing bytes")
+
+        return value
@@ -0,0 +1,55 @@
+from typing import List, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class BufferWriter:
+    """
+    Message data builder without repeated concatenation.
+
+    Small values are packed into one growing bytearray. Buffers bigger than `REFERENCE_THRESHOLD` are not copied,
+    they are kept by reference as separate segments. Result can be sent as a list of buffers (scatter-gather) or
+    joined once into bytes.
+    """
+
+    REFERENCE_THRESHOLD = 1024 * 4
+
+    def __init__(self):
+        self.__segments: List[Buffer] = []
+        self.__current = bytearray()
+        self.__length = 0
+
+    def write(self, data: Buffer) -> 'BufferWriter':
+        _len = len(data)
+
+        if _len >= self.REFERENCE_THRESHOLD:
+            self.__flush()
+            self.__segments.append(data)
+        else:
+            self.__current += data
+
+        self.__length += _len
+
+        return self
+
+    def write_int(self, value: int, _len: int) -> 'BufferWriter':
+        self.__current += value.to_bytes(_len, 'big')
+        self.__length += _len
+
+        return self
+
+    def __flush(self):
+        if self.__current:
+            self.__segments.append(self.__current)
+            self.__current = bytearray()
+
+    def buffers(self) -> List[Buffer]:
+        self.__flush()
+
+        return self.__segments
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.buffers())
+
+    def __len__(self) -> int:
+        return self.__length
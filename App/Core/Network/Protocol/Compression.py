@@ -0,0 +1,107 @@
+import lzma
+import zlib
+from typing import Optional, List, Iterable, Iterator, Union
+
+from .BufferWriter import Buffer
+
+
+class Compression:
+    """
+    Message data codecs (stdlib only).
+
+    Compressed message has RCL_MESSAGE_COMPRESSED_FLAG in message type and data struct:
+
+      [CODEC 1 byte][COMPRESSED DATA]
+    """
+
+    CODEC_ZLIB = 0x01
+    CODEC_LZMA = 0x02
+
+    CODECS = {
+        'zlib': CODEC_ZLIB,
+        'lzma': CODEC_LZMA,
+    }
+
+    CODECS_NAMES = dict(map(lambda x: (x[1], x[0]), CODECS.items()))
+
+    CODEC_LEN = 1
+
+    def __init__(self, config: dict):
+        self.__enabled = bool(config['enabled'])
+        self.__threshold = int(config['threshold'])
+        self.__zlib_level = int(config['zlib_level'])
+        self.__lzma_preset = int(config['lzma_preset'])
+
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def threshold(self) -> int:
+        return self.__threshold
+
+    def codecs(self) -> List[str]:
+        """
+        Codecs supported by this side. Empty if compression is disabled.
+        """
+        return list(self.CODECS.keys()) if self.__enabled else []
+
+    def select(self, policy: Optional[str], peer_codecs: Iterable[str]) -> Optional[str]:
+        """
+        Codec of command policy if both sides support it.
+        """
+        if not (self.__enabled and policy):
+            return None
+
+        return policy if policy in peer_codecs and policy in self.CODECS else None
+
+    def compress(self, codec: str, buffers: List[Buffer]) -> bytes:
+        if codec == 'zlib':
+            compressor = zlib.compressobj(self.__zlib_level)
+        elif codec == 'lzma':
+            compressor = lzma.LZMACompressor(preset=self.__lzma_preset)
+        else:
+            raise Exception(f"Unknown compression codec '{codec}'")
+
+        return b"".join([*map(compressor.compress, buffers), compressor.flush()])
+
+    @staticmethod
+    def decompressor(code: int) -> Union['zlib._Decompress', lzma.LZMADecompressor]:
+        """
+        Incremental decompressor of codec, see `decompress_chunks`.
+        """
+        if code == Compression.CODEC_ZLIB:
+            return zlib.decompressobj()
+
+        if code == Compression.CODEC_LZMA:
+            return lzma.LZMADecompressor()
+
+        raise Exception(f"Unknown compression codec {code}")
+
+    @staticmethod
+    def decompress_chunks(decompressor, data: Buffer, chunk_size: int) -> Iterator[bytes]:
+        """
+        Decompress next part of data by chunks up to `chunk_size` bytes, a small part of highly compressed data does
+        not expand in memory at once.
+        """
+        yield decompressor.decompress(data, chunk_size)
+
+        if isinstance(decompressor, lzma.LZMADecompressor):
+            while not decompressor.needs_input and not decompressor.eof:
+                yield decompressor.decompress(b"", chunk_size)
+        else:
+            while decompressor.unconsumed_tail:
+                yield decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+
+    @staticmethod
+    def decompress(code: int, data: Buffer, max_length: Optional[int] = None) -> bytes:
+        """
+        Decompress data. If result is longer than `max_length`, it is cut to `max_length + 1` bytes.
+        """
+        limit = -1 if max_length is None else max_length + 1
+
+        if code == Compression.CODEC_ZLIB:
+            return zlib.decompressobj().decompress(data, max(limit, 0))
+
+        if code == Compression.CODEC_LZMA:
+            return lzma.LZMADecompressor().decompress(data, limit)
+
+        raise Exception(f"Unknown compression codec {code}")
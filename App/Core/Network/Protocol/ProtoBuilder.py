@@ -1,12 +1,31 @@
-from typing import Union, Any, List
+from typing import Union, Any, List, Optional, Callable, Dict, Tuple
+
+from .RCLProtocol import RCLProtocol
+from .Streams import StreamParameter
+
+
+Encoder = Callable[[dict], dict]
+Decoder = Callable[[dict], dict]
 
 
 class ProtoBuilder:
+    """
+    Encodes call parameters to codes by proto schema and back.
+
+    Encoder and decoder functions are compiled for every command and subcommand once, so a call does not walk
+    schema dicts. Calls with several subcommands use generic `prepare_command`/`from_codes` implementation.
+    """
+
     def __init__(self, commands: dict, codes: dict, types: dict):
         self.__commands = commands
         self.__codes = codes
         self.__types = types
 
+        self.__encoders: Dict[Tuple[str, ...], Encoder] = {}
+        self.__decoders: Dict[Tuple[int, ...], Decoder] = {}
+
+        self.__compile()
+
     @staticmethod
     def __determinate_int_len(data: int) -> int:
         if data == 0:
@@ -64,16 +83,27 @@ class ProtoBuilder:
 
         return negative + value.to_bytes(ProtoBuilder.__determinate_int_len(value), 'big')
 
+    @staticmethod
+    def __encode_int_fast(value: int) -> bytes:
+        """
+        Minimal bytes count. Decoded value is the same as for `__encode_int`.
+        """
+        if value < 0:
+            return ProtoBuilder.__encode_int(value)
+
+        return value.to_bytes((value.bit_length() + 7) // 8 or 1, 'big')
+
     @staticmethod
     def __encode_list(value: List[Union[str, int, float, bool]]) -> bytes:
-        data = b""
+        data = bytearray()
 
         for item in value:
             val = ProtoBuilder.__encode_value(item)
 
-            data += len(val).to_bytes(1, 'big') + val
+            data += len(val).to_bytes(1, 'big')
+            data += val
 
-        return data
+        return bytes(data)
 
     @staticmethod
     def __decode_list(value: bytes, _type: type) -> List[Union[str, int, float, bool]]:
@@ -144,6 +174,14 @@ class ProtoBuilder:
         if value is None and parameters_data['required']:
             raise Exception(f"Missing required parameter {name}")
 
+        if _val_type is StreamParameter:
+            if _type is not bytes:
+                raise Exception(f"Parameter {name} must be type {_type.__name__}. Only bytes can be streamed")
+
+            code = parameters_data['code'] | RCLProtocol.RCL_STREAM_PARAMETER_FLAG
+
+            return {code: value.stream_id().to_bytes(4, 'big')}
+
         if _val_type is list:
             if _number_type is str:
                 if len(value) < 1 and number == "+":
@@ -168,6 +206,227 @@ class ProtoBuilder:
 
         return {parameters_data['code']: self.__encode_value(value)}
 
+    @staticmethod
+    def __compile_value_encoder(_type: type) -> Callable[[Any], bytes]:
+        if _type is bytes:
+            return lambda x: x
+
+        if _type is str:
+            return lambda x: x.encode('utf-8')
+
+        if _type is int:
+            return ProtoBuilder.__encode_int_fast
+
+        if _type is bool:
+            return lambda x: b"\x01" if x else b"\x00"
+
+        if _type is float:
+            return ProtoBuilder.__encode_float
+
+        raise Exception(f"Cannot encode data")
+
+    @staticmethod
+    def __compile_value_decoder(_type: type, is_list: bool) -> Callable[[bytes], Any]:
+        if is_list:
+            return lambda x: ProtoBuilder.__decode_list(x, _type)
+
+        if _type is bytes:
+            return lambda x: x
+
+        if _type is str:
+            return lambda x: x.decode('utf-8')
+
+        if _type is int:
+            return ProtoBuilder.__decode_int
+
+        if _type is float:
+            return ProtoBuilder.__decode_float
+
+        if _type is bool:
+            return lambda x: x != b"\x00"
+
+        raise Exception(f"Cannot decode data")
+
+    @staticmethod
+    def __compile_parameter_encoder(name: str, data: dict) -> Callable[[Any], Tuple[int, bytes]]:
+        _type = data['type']
+        code = data['code']
+        number = data['number']
+        variants = data.get('variants')
+        encode_value = ProtoBuilder.__compile_value_encoder(_type)
+
+        # Variants are encoded once
+        variants_codes = {x: ProtoBuilder.__encode_int(i) for x, i in variants.items()} if variants else None
+
+        def encode(value: Any) -> Tuple[int, bytes]:
+            _val_type = type(value)
+
+            if _val_type is _type:
+                if variants_codes is None:
+                    return code, encode_value(value)
+
+                if value not in variants_codes:
+                    raise Exception(f"Parameter '{name}' must be one of '{', '.join(variants_codes)}'")
+
+                return code, variants_codes[value]
+
+            if _val_type is StreamParameter:
+                if _type is not bytes:
+                    raise Exception(f"Parameter {name} must be type {_type.__name__}. Only bytes can be streamed")
+
+                return code | RCLProtocol.RCL_STREAM_PARAMETER_FLAG, value.stream_id().to_bytes(4, 'big')
+
+            if _val_type is list:
+                if number == "+" and len(value) < 1:
+                    raise Exception(f"Missing required parameter {name}")
+
+                if type(number) is int and len(value) != number:
+                    raise Exception(f"Len of parameters must be equal to {str(number)}")
+
+                for i, val in enumerate(value):
+                    if type(val) is not _type:
+                        raise Exception(f"Parameter {i} in {name} must be type {_type.__name__}")
+
+                return code, ProtoBuilder.__encode_list(value)
+
+            raise Exception(f"Parameter {name} must be type {_type.__name__}")
+
+        return encode
+
+    @staticmethod
+    def __compile_encoder(command_code: int, subcommands_codes: List[int], parameters_data: dict) -> Encoder:
+        encoders = {name: ProtoBuilder.__compile_parameter_encoder(name, x) for name, x in parameters_data.items()}
+
+        def encode(parameters: dict) -> dict:
+            parameters_codes = {}
+
+            for name, value in parameters.items():
+                if not (encoder := encoders.get(name)):
+                    raise Exception(f"Cannot find parameter {name}")
+
+                code, value = encoder(value)
+                parameters_codes[code] = value
+
+            return {
+                "command": command_code,
+                "subcommands": list(subcommands_codes),
+                "parameters": parameters_codes,
+            }
+
+        return encode
+
+    @staticmethod
+    def __compile_decoder(
+        command_name: str,
+        subcommands_names: List[str],
+        parameters_codes_data: dict,
+        parameters_data: dict,
+        defaults: dict
+    ) -> Decoder:
+        decoders = {}
+
+        for code, code_data in parameters_codes_data.items():
+            data = parameters_data[code_data['name']]
+
+            if variants := code_data.get('variants'):
+                decoder = (lambda _variants: lambda x: _variants.get(x[0]))(variants)
+            else:
+                decoder = ProtoBuilder.__compile_value_decoder(data['type'], bool(data['number']))
+
+            decoders[code] = (code_data['name'], decoder)
+            decoders[code | RCLProtocol.RCL_STREAM_PARAMETER_FLAG] = (
+                code_data['name'],
+                lambda x: StreamParameter(int.from_bytes(x, 'big'))
+            )
+
+        def decode(parameters: dict) -> dict:
+            values = {}
+
+            for code, value in parameters.items():
+                if not (parameter := decoders.get(code)):
+                    code &= ~RCLProtocol.RCL_STREAM_PARAMETER_FLAG
+                    raise Exception(f"Unknown subcommand parameter code '{code}'")
+
+                values[parameter[0]] = parameter[1](value)
+
+            for name, value in defaults.items():
+                if name not in values:
+                    values[name] = value
+
+            return {
+                "command": command_name,
+                "subcommands": list(subcommands_names),
+                "parameters": values,
+            }
+
+        return decode
+
+    def __compile(self):
+        for command_code, command_codes_data in self.__codes.items():
+            name = command_codes_data['name']
+            command_data = self.__commands[name]
+            parameters_codes = command_codes_data.get('parameters') or {}
+            parameters = command_data.get('parameters') or {}
+            defaults = command_data.get('defaults') or {}
+
+            self.__encoders[(name,)] = self.__compile_encoder(command_code, [], parameters)
+            self.__decoders[(command_code,)] = self.__compile_decoder(name, [], parameters_codes, parameters, defaults)
+
+            for subcommand_code, subcommand_codes_data in (command_codes_data.get('subcommands') or {}).items():
+                subcommand = subcommand_codes_data['name']
+                subcommand_data = command_data['subcommands'][subcommand]
+
+                self.__encoders[(name, subcommand)] = self.__compile_encoder(
+                    command_code,
+                    [subcommand_code],
+                    subcommand_data.get('parameters') or {}
+                )
+
+                # Subcommand without parameters accepts parameters of command (same as `from_codes`)
+                if subcommand_codes_data.get('parameters'):
+                    decoder = self.__compile_decoder(
+                        name,
+                        [subcommand],
+                        subcommand_codes_data['parameters'],
+                        subcommand_data['parameters'],
+                        subcommand_data.get('defaults') or {},
+                    )
+                else:
+                    decoder = self.__compile_decoder(name, [subcommand], parameters_codes, parameters, defaults)
+
+                self.__decoders[(command_code, subcommand_code)] = decoder
+
+    def encode(self, command: str, subcommands: Optional[list], parameters: Optional[dict]) -> dict:
+        """
+        Same as `prepare_command` with compiled encoder of command.
+        """
+        if encoder := self.__encoders.get((command, *(subcommands or []))):
+            return encoder(parameters or {})
+
+        return self.prepare_command(command, subcommands, parameters)
+
+    def decode(self, command: int, subcommands: List[bytes], parameters: dict) -> dict:
+        """
+        Same as `from_codes` with compiled decoder of command.
+        """
+        if len(subcommands) < 2:
+            if decoder := self.__decoders.get((command, *map(lambda x: int.from_bytes(x, 'big'), subcommands))):
+                return decoder(parameters)
+
+        return self.from_codes(command, subcommands, parameters)
+
+    def types(self) -> dict:
+        """
+        Objects from `objects` section of proto file.
+        """
+        return self.__types
+
+    def compression(self, command: str) -> Optional[str]:
+        """
+        Compression codec of command messages and responses from `proto.yaml`.
+        """
+        return (self.__commands.get(command) or {}).get('compression')
+
     def prepare_command(self, command: str, subcommands: list, parameters: dict) -> dict:
         command_data = self.__commands.get(command)
         subcommands_data = command_data.get('subcommands')
@@ -240,6 +499,9 @@ class ProtoBuilder:
             defaults = command_data.get("defaults")
 
         for parameter, value in parameters.items():
+            streamed = bool(parameter & RCLProtocol.RCL_STREAM_PARAMETER_FLAG)
+            parameter &= ~RCLProtocol.RCL_STREAM_PARAMETER_FLAG
+
             parameter_code_data = parameters_codes_data.get(parameter)
 
             if not parameter_code_data:
@@ -249,6 +511,10 @@ class ProtoBuilder:
 
             parameter_data = parameters_data.get(name)
 
+            if streamed:
+                parameters_values.update({name: StreamParameter(int.from_bytes(value, 'big'))})
+                continue
+
             if variants := parameter_code_data.get("variants"):
                 value = variants.get(value[0])
             else:
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import pickle
+from typing import Tuple, Optional
+
+from App.Core import Config, Filesystem
+from App.Core.Logger import Log
+from config import RCL_PROTOCOL_VERSION
+
+from .ProtoFileResolver import ProtoFileResolver
+
+
+class ProtoCompiler:
+    """
+    Compiles proto file into parsed schema (commands, codes, types) and caches it on disk.
+
+    Cache file is keyed by proto file hash and RCL_PROTOCOL_VERSION, so changed proto file is compiled again and
+    YAML parsing with validation is skipped on every next start.
+    """
+
+    # Increase on changes of schema struct
+    FORMAT_VERSION = 1
+
+    def __init__(self, config: Config, log: Log):
+        self.__config = config
+        self.__log = log
+
+        self.__rcl_config = config.get('rcl')
+        self.__proto_file_path = self.__rcl_config['proto_file_path']
+        self.__cache_path = self.__rcl_config.get('compiled_path')
+
+    def __cache_file(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()[:16]
+
+        return os.path.join(self.__cache_path, f"proto-{digest}-v{RCL_PROTOCOL_VERSION}.{self.FORMAT_VERSION}.pickle")
+
+    def __load(self, path: str) -> Optional[Tuple[dict, dict, dict]]:
+        if not Filesystem.exists_file(path):
+            return None
+
+        try:
+            return pickle.loads(Filesystem.read_file(path, True))
+        except Exception as e:
+            self.__log.warning(f"Cannot load compiled proto file {path}: {str(e)}", {'object': self})
+
+        return None
+
+    def __save(self, path: str, schema: Tuple[dict, dict, dict]):
+        try:
+            os.makedirs(self.__cache_path, exist_ok=True)
+
+            Filesystem.write_file(tmp := f"{path}.{os.getpid()}.tmp", pickle.dumps(schema, pickle.HIGHEST_PROTOCOL))
+            Filesystem.move(tmp, path)
+        except OSError as e:
+            self.__log.warning(f"Cannot save compiled proto file {path}: {str(e)}", {'object': self})
+
+    def compile(self) -> Tuple[dict, dict, dict]:
+        if not self.__cache_path:
+            return ProtoFileResolver(self.__config).parse()
+
+        path = self.__cache_file(Filesystem.read_file(self.__proto_file_path, True))
+
+        if schema := self.__load(path):
+            return schema
+
+        schema = ProtoFileResolver(self.__config).parse()
+
+        self.__save(path, schema)
+
+        return schema
@@ -29,6 +29,8 @@ class ProtoFileResolver(YamlDataFile):
         'map': [False, True, True],
     }
 
+    COMPRESSION_POLICIES = ['zlib', 'lzma', 'none']
+
     def __init__(self, config: Config):
         self.__config = config.get('rcl')
 
@@ -212,6 +214,12 @@ class ProtoFileResolver(YamlDataFile):
 
         return parameters
 
+    def __parse_compression(self, name: str, command_data: dict) -> Optional[str]:
+        if (policy := command_data.get('compression', 'none')) not in self.COMPRESSION_POLICIES:
+            raise Exception(f"Compression of command '{name}' must be one of '{', '.join(self.COMPRESSION_POLICIES)}'")
+
+        return None if policy == 'none' else policy
+
     def parse(self):
         for i, (obj_name, obj_data) in enumerate((self.data().get('objects') or {}).items()):
             self.__types[obj_name] = self.__parse_object_fields(obj_data)
@@ -233,6 +241,7 @@ class ProtoFileResolver(YamlDataFile):
                 "subcommands": subcommands_data,
                 "parameters": parameters_data,
                 "defaults": defaults,
+                "compression": self.__parse_compression(name, command_data),
             }
 
             self.__codes[i] = {
@@ -1,50 +1,167 @@
-from typing import Optional, Tuple, Union
+from itertools import count, chain
+from typing import Optional, Tuple, Union, Iterator, List, Iterable
 
 from App.Core.Logger import Log
 from App.Core import Config
 
 from .RCLProtocol import RCLProtocol
-from .ProtoFileResolver import ProtoFileResolver
+from .BufferWriter import BufferWriter, Buffer
+from .Compression import Compression
+from .BinaryValueCodec import BinaryValueCodec
+from .ProtoCompiler import ProtoCompiler
 from .ProtoBuilder import ProtoBuilder
 
-from .Resolvers import InternalErrorMessageResolver, ResponseMessageSuccessResolver, CallMessageResolver
+from .Resolvers import (
+    InternalErrorMessageResolver,
+    NotModifiedMessageResolver,
+    ResponseMessageSuccessResolver,
+    CallMessageResolver,
+    StreamMessageResolver,
+)
 
-from .Requests import AbstractRequest, CallRequest
+from .Requests import AbstractRequest, CallRequest, StreamRequest
 
-from .Responses import AbstractResponse, ResponseSuccess, ResponseInternalError
+from .Streams import FileStream, StreamParameter
+
+from .Responses import (
+    AbstractResponse,
+    ResponseSuccess,
+    ResponseInternalError,
+    ResponseNotModified,
+    ResponseNotFound,
+    ResponseBlobNotFound,
+    ResponseEvent,
+)
 
 
 class RCL:
     RESOLVERS = {
         RCLProtocol.RCL_MESSAGE_TYPE_CALL: CallMessageResolver(),
+        RCLProtocol.RCL_MESSAGE_TYPE_STREAM: StreamMessageResolver(),
         RCLProtocol.RCL_MESSAGE_TYPE_RETURN: ResponseMessageSuccessResolver(),
+        RCLProtocol.RCL_MESSAGE_TYPE_NOT_MODIFIED: NotModifiedMessageResolver(),
+        RCLProtocol.RCL_MESSAGE_TYPE_EVENT: ResponseMessageSuccessResolver(),
+        RCLProtocol.RCL_MESSAGE_TYPE_NOT_FOUND: InternalErrorMessageResolver(),
+        RCLProtocol.RCL_MESSAGE_TYPE_BLOB_NOT_FOUND: InternalErrorMessageResolver(),
         RCLProtocol.RCL_MESSAGE_TYPE_INTERNAL_ERROR: InternalErrorMessageResolver(),
     }
 
     REQUESTS = {
         RCLProtocol.RCL_MESSAGE_TYPE_CALL: CallRequest,
+        RCLProtocol.RCL_MESSAGE_TYPE_STREAM: StreamRequest,
     }
 
+    ENCODING_BINARY = 'binary'
+
+    # Response encodings supported besides JSON
+    ENCODINGS = [ENCODING_BINARY]
+
     RESPONSES = {
         RCLProtocol.RCL_MESSAGE_TYPE_RETURN: ResponseSuccess,
+        RCLProtocol.RCL_MESSAGE_TYPE_NOT_MODIFIED: ResponseNotModified,
+        RCLProtocol.RCL_MESSAGE_TYPE_EVENT: ResponseEvent,
+        RCLProtocol.RCL_MESSAGE_TYPE_NOT_FOUND: ResponseNotFound,
+        RCLProtocol.RCL_MESSAGE_TYPE_BLOB_NOT_FOUND: ResponseBlobNotFound,
         RCLProtocol.RCL_MESSAGE_TYPE_INTERNAL_ERROR: ResponseInternalError,
     }
 
     def __init__(self, logger: Log, config: Config):
         self.__logger = logger
-        self.__proto_file_resolver = ProtoFileResolver(config)
-        self.__proto_file_builder = ProtoBuilder(*self.__proto_file_resolver.parse())
+        self.__proto_file_builder = ProtoBuilder(*ProtoCompiler(config, logger).compile())
+
+        self.__max_packet_size = int(config.get('rcl.max_packet_size'))
+        self.__max_data_len = RCLProtocol.max_data_length(self.__max_packet_size)
+        self.__stream_chunk_size = self.__max_data_len - StreamMessageResolver.HEADER_LEN
+
+        if self.__stream_chunk_size <= 0:
+            raise Exception(f"Max packet size {self.__max_packet_size} is too small")
+
+        self.__streams_ids = count(1)
+
+        self.__compression = Compression(config.get('rcl.compression'))
+
+        # Response and event resolver with binary codec of proto objects
+        success = ResponseMessageSuccessResolver(BinaryValueCodec(self.__proto_file_builder.types()))
+
+        self.__resolvers = {
+            **RCL.RESOLVERS,
+            RCLProtocol.RCL_MESSAGE_TYPE_RETURN: success,
+            RCLProtocol.RCL_MESSAGE_TYPE_EVENT: success,
+        }
+
+        RCLProtocol.set_headers_validation(bool(config.get('rcl.validate_headers')))
+
+    def __compress(self, data: BufferWriter, _type: int, codec: str) -> Tuple[BufferWriter, int]:
+        compressed = self.__compression.compress(codec, data.buffers())
+
+        # Incompressible data (JPEG, PDF) is sent as is
+        if len(compressed) + Compression.CODEC_LEN >= len(data):
+            return data, _type
 
-        self.__max_data_len = config.get('rcl.max_packet_size') - RCLProtocol.RCL_HEADERS_LENGTH - 4
+        writer = BufferWriter().write_int(Compression.CODECS[codec], Compression.CODEC_LEN).write(compressed)
 
-    def __create(self, data: bytes, _type: int, _len: int) -> Optional[bytes]:
+        return writer, _type | RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG
+
+    def __create(
+        self,
+        data: BufferWriter,
+        _type: int,
+        request_id: int,
+        codec: Optional[str] = None
+    ) -> Optional[List[Buffer]]:
         if not RCLProtocol.check_message_type(_type):
             self.__logger.error(f"Message type '{_type}' not found.", {"object": self})
             return None
 
-        return RCLProtocol.create_message(_type, data, _len)
+        if codec and len(data) >= self.__compression.threshold():
+            data, _type = self.__compress(data, _type, codec)
+
+        return RCLProtocol.create_message_buffers(_type, data.buffers(), len(data), request_id)
+
+    def __must_be_streamed(self, value) -> bool:
+        if isinstance(value, FileStream):
+            return True
+
+        return type(value) is bytes and len(value) > self.__stream_chunk_size
+
+    def __create_stream_messages(
+        self,
+        stream: StreamParameter,
+        request_id: int,
+        codec: Optional[str]
+    ) -> Iterator[List[Buffer]]:
+        chunks = stream.chunks(self.__stream_chunk_size)
+
+        if (chunk := next(chunks, None)) is None:
+            chunk = b""
 
-    def __parse(self, data: bytes) -> Optional[Tuple[dict, bytes]]:
+        while (following := next(chunks, None)) is not None:
+            yield self.__create_request_buffers(StreamRequest(stream.stream_id(), chunk), request_id, codec)
+            chunk = following
+
+        yield self.__create_request_buffers(StreamRequest(stream.stream_id(), chunk, True), request_id, codec)
+
+    def __create_request_buffers(self, request: AbstractRequest, request_id: int, codec: Optional[str]) -> List[Buffer]:
+        resolver = self.__resolvers[request.type()]
+
+        if request.type() == RCLProtocol.RCL_MESSAGE_TYPE_CALL:
+            data = self.__proto_file_builder.encode(**request.data())
+        else:
+            data = request.data()
+
+        data = resolver.write(data, BufferWriter())
+
+        if len(data) > self.__max_data_len:
+            raise Exception(f"Message data len {len(data)} is more than max packet data len {self.__max_data_len}")
+
+        return self.__create(data, request.type(), request_id, codec)
+
+    def __parse(
+        self,
+        data: bytes,
+        max_data_len: Optional[int] = None,
+        crc_checked: bool = False
+    ) -> Optional[Tuple[dict, bytes]]:
         obj = {"object": self}
 
         if not RCLProtocol.check_rcl_protocol(data[:3]):
@@ -57,53 +174,197 @@ class RCL:
             self.__logger.error(f"Protocol version {version} required")
             return None
 
-        if not RCLProtocol.check_crc(data, headers[RCLProtocol.RCL_HEADER_DATA_LENGTH]):
+        if not crc_checked and not RCLProtocol.check_crc(data, headers[RCLProtocol.RCL_HEADER_DATA_LENGTH]):
             self.__logger.error(f"Crc check failed")
             return None
 
-        return headers, RCLProtocol.get_message(data, headers[RCLProtocol.RCL_HEADER_DATA_LENGTH])
-
-    def create_request(self, request: AbstractRequest) -> bytes:
-        resolver = RCL.RESOLVERS[request.type()]
+        message = RCLProtocol.get_message(data, headers[RCLProtocol.RCL_HEADER_DATA_LENGTH])
+
+        if RCLProtocol.is_compressed(_type := headers[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]):
+            headers[RCLProtocol.RCL_HEADER_MESSAGE_TYPE] = _type & ~RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG
+
+            message = Compression.decompress(message[0], message[Compression.CODEC_LEN:], max_data_len)
+
+        return headers, message
+
+    def max_packet_size(self) -> int:
+        return self.__max_packet_size
+
+    def stream_chunk_size(self) -> int:
+        return self.__stream_chunk_size
+
+    def compression(self) -> Compression:
+        return self.__compression
+
+    def codec(self, command: str, peer_codecs: Iterable[str]) -> Optional[str]:
+        """
+        Compression codec of command messages (`compression` in `proto.yaml`) if the other side supports it.
+        """
+        return self.__compression.select(self.__proto_file_builder.compression(command), peer_codecs)
+
+    def capabilities_request(self) -> CallRequest:
+        """
+        'ping' call with codecs and response encodings supported by client.
+        """
+        return CallRequest('ping', parameters={
+            'compression': self.__compression.codecs(),
+            'encodings': self.ENCODINGS,
+        })
+
+    def capabilities(self, request: CallRequest) -> dict:
+        """
+        Capabilities for 'ping' response on server side: codecs and response encodings supported by both sides.
+        """
+        parameters = request.parameters() or {}
+        codecs = parameters.get('compression') or []
+        encodings = parameters.get('encodings') or []
+
+        return {
+            'compression': [x for x in self.__compression.codecs() if x in codecs],
+            'encodings': [x for x in self.ENCODINGS if x in encodings],
+        }
+
+    @staticmethod
+    def binary(capabilities: dict) -> bool:
+        """
+        Responses to the client can be encoded by binary codec (see `capabilities`). Old clients get JSON.
+        """
+        return RCL.ENCODING_BINARY in (capabilities.get('encodings') or [])
+
+    def peer_codecs(self, response: AbstractResponse) -> List[str]:
+        """
+        Codecs from 'ping' response of server. Old servers do not return capabilities.
+        """
+        data = response.data() if isinstance(response.data(), dict) else {}
+
+        return [x for x in self.__compression.codecs() if x in (data.get('compression') or [])]
+
+    def create_request_buffers(
+        self,
+        request: AbstractRequest,
+        request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID,
+        peer_codecs: Iterable[str] = ()
+    ) -> List[Buffer]:
+        """
+        Create request message as list of buffers. Parameters data is not copied into the message.
+        """
+        codec = None
 
         if request.type() == RCLProtocol.RCL_MESSAGE_TYPE_CALL:
-            data = self.__proto_file_builder.prepare_command(**request.data())
-        else:
-            data = request.data()
+            codec = self.codec(request.command(), peer_codecs)
 
-        data = resolver.create(data)
+        return self.__create_request_buffers(request, request_id, codec)
 
-        return self.__create(data, request.type(), len(data))
+    def create_request(self, request: AbstractRequest, request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID) -> bytes:
+        return b"".join(self.create_request_buffers(request, request_id))
 
-    def parse_request(self, data: bytes) -> AbstractRequest:
-        headers, data = self.__parse(data)
+    def create_request_messages(
+        self,
+        request: AbstractRequest,
+        request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID,
+        peer_codecs: Iterable[str] = ()
+    ) -> Iterator[List[Buffer]]:
+        """
+        Create call message and stream messages for its large `bytes` parameters. Stream messages are created lazily,
+        so only one chunk of the parameter is kept in memory. Messages are compressed by command codec if it is
+        in `peer_codecs`.
+        """
+        if request.type() != RCLProtocol.RCL_MESSAGE_TYPE_CALL:
+            return iter([self.create_request_buffers(request, request_id)])
 
-        _type = headers[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]
+        request: CallRequest
 
-        if _type == RCLProtocol.RCL_MESSAGE_TYPE_CALL:
-            return self.REQUESTS[_type](**self.__proto_file_builder.from_codes(**RCL.RESOLVERS[_type].parse(data)))
+        codec = self.codec(request.command(), peer_codecs)
+
+        streams: List[StreamParameter] = []
+        parameters = dict(request.parameters() or {})
 
-        return self.REQUESTS[_type](RCL.RESOLVERS[_type].parse(data))
+        for name, value in parameters.items():
+            if self.__must_be_streamed(value):
+                streams.append(stream := StreamParameter(next(self.__streams_ids), value))
+                parameters[name] = stream
 
-    def create_response(self, response: AbstractResponse) -> bytes:
-        resolver = RCL.RESOLVERS[response.type()]
+        call = CallRequest(request.command(), request.subcommands(), parameters)
+        call = self.__create_request_buffers(call, request_id, codec)
 
-        data = resolver.create(response.data())
+        return chain([call], *map(lambda x: self.__create_stream_messages(x, request_id, codec), streams))
 
-        return self.__create(data, response.type(), len(data))
+    def parse_request(self, data: bytes) -> Optional[AbstractRequest]:
+        if not (parameters := self.__parse(data, self.__max_data_len)):
+            return None
+
+        headers, data = parameters
 
-    def parse_response(self, data: bytes) -> Optional[AbstractResponse]:
-        if not (parameters := self.__parse(data)):
+        if len(data) > self.__max_data_len:
+            self.__logger.error(f"Message data len {len(data)} is more than max packet data len", {"object": self})
+            return None
+
+        _type = headers[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]
+
+        if _type == RCLProtocol.RCL_MESSAGE_TYPE_CALL:
+            return self.REQUESTS[_type](**self.__proto_file_builder.decode(**self.__resolvers[_type].parse(data)))
+
+        return self.REQUESTS[_type](**self.__resolvers[_type].parse(data))
+
+    def create_response_buffers(
+        self,
+        response: AbstractResponse,
+        request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID,
+        codec: Optional[str] = None,
+        binary: bool = False
+    ) -> List[Buffer]:
+        """
+        Create response message. `codec` is the codec of called command for client (see `codec`). If `binary`, lists
+        and maps are encoded by binary codec (see `binary`).
+        """
+        if response.type() == RCLProtocol.RCL_MESSAGE_TYPE_RETURN:
+            data = self.__resolvers[response.type()].write(response.data(), BufferWriter(), binary, response.version())
+        elif response.type() == RCLProtocol.RCL_MESSAGE_TYPE_EVENT:
+            data = self.__resolvers[response.type()].write(response.data(), BufferWriter(), binary)
+        else:
+            data = self.__resolvers[response.type()].write(response.data(), BufferWriter())
+
+        return self.__create(data, response.type(), request_id, codec)
+
+    def create_response(
+        self,
+        response: AbstractResponse,
+        request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID,
+        codec: Optional[str] = None,
+        binary: bool = False
+    ) -> bytes:
+        return b"".join(self.create_response_buffers(response, request_id, codec, binary))
+
+    def parse_response(self, data: bytes, crc_checked: bool = False) -> Optional[AbstractResponse]:
+        """
+        Parse response message. `crc_checked` skips CRC check of message checked while receiving.
+
+        Headers are parsed and data is decompressed here. Data is kept as view of message and decoded to str, bytes
+        or JSON on the first `data()` call of response.
+        """
+        if not (parameters := self.__parse(memoryview(data), crc_checked=crc_checked)):
             return None
 
         headers, data = parameters
 
         _type = headers[RCLProtocol.RCL_HEADER_MESSAGE_TYPE]
+        resolver = self.__resolvers[_type]
+
+        if _type == RCLProtocol.RCL_MESSAGE_TYPE_RETURN:
+            data, version = resolver.split_version(data)
+
+            return ResponseSuccess.lazy(lambda: resolver.decode(data), version)
 
-        return self.RESPONSES[_type](RCL.RESOLVERS[_type].parse(data))
+        return self.RESPONSES[_type].lazy(lambda: resolver.parse(data))
 
     def call_request(self, command: str, subcommand: Optional[list] = None, parameters: Optional[dict] = None) -> bytes:
         return self.create_request(CallRequest(command, subcommand, parameters))
 
-    def response_success(self, data: Union[str, list, dict, bytes, None] = None) -> bytes:
-        return self.create_response(ResponseSuccess(data))
+    def response_success(
+        self,
+        data: Union[str, list, dict, bytes, None] = None,
+        request_id: int = RCLProtocol.RCL_FIRST_REQUEST_ID,
+        codec: Optional[str] = None,
+        binary: bool = False
+    ) -> bytes:
+        return self.create_response(ResponseSuccess(data), request_id, codec, binary)
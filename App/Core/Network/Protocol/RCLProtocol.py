@@ -1,6 +1,6 @@
-from datetime import datetime, timezone
+import struct
 from zlib import crc32
-from typing import Union, Optional
+from typing import Union, Optional, List
 from config import RCL_PROTOCOL_VERSION
 
 
@@ -12,6 +12,12 @@ class RCLProtocol:
 
       [HEADERS][DATA][CRC32]
 
+    Message size is limited by `rcl.max_packet_size`. Large `bytes` parameters of call message are replaced by
+    stream id (parameter code is marked by RCL_STREAM_PARAMETER_FLAG) and sent after the call by 'stream' messages.
+
+    Data of compressed message is `[CODEC][COMPRESSED DATA]`, its message type is marked by RCL_MESSAGE_COMPRESSED_FLAG.
+    Compression is used only with codecs announced by the other side in 'ping' call (see `Compression`).
+
     Headers struct:
 
       I - integer
@@ -24,7 +30,7 @@ class RCLProtocol:
       +-----------+-----+------+------------------+----------------------------------+
       | [3]       | 1   | B    | protocol_version | Protocol version number.         |
       +-----------+-----+------+------------------+----------------------------------+
-      | [4-7]     | 4   | B    | request_id       | Request ID.                      |
+      | [4-7]     | 4   | B    | request_id       | Request ID (per connection).     |
       +-----------+-----+------+------------------+----------------------------------+
       | [8]       | 1   | I    | message_type     | Message type.                    |
       +-----------+-----+------+------------------+----------------------------------+
@@ -68,6 +74,26 @@ class RCLProtocol:
 
     RCL_HEADERS_STRUCT_LEN = len(RCL_HEADERS_STRUCT_LIST)
 
+    RCL_HEADERS_STRUCT = struct.Struct('>3sBIBI')
+    """ Precompiled headers codec. Fields order is the same as in RCL_HEADERS_STRUCT_DICT """
+
+    RCL_HEADER_DATA_LENGTH_STRUCT = struct.Struct('>I')
+    RCL_HEADER_REQUEST_ID_STRUCT = struct.Struct('>I')
+
+    # Request ids are monotonically increasing per connection. Responses repeat request id of the call
+    RCL_FIRST_REQUEST_ID = 1
+    RCL_MAX_REQUEST_ID = 0xFFFFFFFF
+
+    RCL_PROTOCOL_START_BYTES_RAW = RCL_PROTOCOL_START_BYTES.to_bytes(RCL_HEADER_LEN_START_BYTES, 'big')
+
+    RCL_CHECKSUM_LENGTH = 4
+
+    # Parameter code flag of streamed parameter
+    RCL_STREAM_PARAMETER_FLAG = 0x80
+
+    # Message type flag of compressed message data. Message types in each group are limited by 0x20
+    RCL_MESSAGE_COMPRESSED_FLAG = 0x20
+
     # Null value
     RCL_NULL = 0x00
 
@@ -82,26 +108,48 @@ class RCLProtocol:
     RCL_MESSAGE_GROUP_SERVER_ERRORS = 0xC0
     # Request (0x00 <= x < 0x40)
     RCL_MESSAGE_TYPE_CALL = RCL_MESSAGE_GROUP_REQUEST | 0
+    RCL_MESSAGE_TYPE_STREAM = RCL_MESSAGE_GROUP_REQUEST | 1
     # Response ok types (0x40 <= x < 0x80)
     RCL_MESSAGE_TYPE_RETURN = RCL_MESSAGE_GROUP_RESPONSE_OK | 0
+    # Response data is not changed since version sent by client. Data of message is the version
+    RCL_MESSAGE_TYPE_NOT_MODIFIED = RCL_MESSAGE_GROUP_RESPONSE_OK | 1
+    # State changes pushed by server to 'subscribe' call. Request id of message is the id of the call
+    RCL_MESSAGE_TYPE_EVENT = RCL_MESSAGE_GROUP_RESPONSE_OK | 2
     # Client errors (0x80 <= x < 0xC0)
     RCL_MESSAGE_TYPE_NOT_FOUND = RCL_MESSAGE_GROUP_CLIENT_ERRORS | 0
     RCL_MESSAGE_TYPE_NOT_VALID_SIGNATURE = RCL_MESSAGE_GROUP_CLIENT_ERRORS | 1
     RCL_MESSAGE_TYPE_NO_REQUIRED_PARAMETERS = RCL_MESSAGE_GROUP_CLIENT_ERRORS | 2
+    # File of call is sent by hash, but server does not hold it (evicted). Client uploads the file then
+    RCL_MESSAGE_TYPE_BLOB_NOT_FOUND = RCL_MESSAGE_GROUP_CLIENT_ERRORS | 3
     # Server errors (0xC0 <= x <= 0xFF)
     RCL_MESSAGE_TYPE_INTERNAL_ERROR = RCL_MESSAGE_GROUP_SERVER_ERRORS | 0
 
     RCL_MESSAGES_NAMES = {
         RCL_MESSAGE_TYPE_CALL: "call",
+        RCL_MESSAGE_TYPE_STREAM: "stream",
         RCL_MESSAGE_TYPE_RETURN: "return",
+        RCL_MESSAGE_TYPE_NOT_MODIFIED: "not_modified",
+        RCL_MESSAGE_TYPE_EVENT: "event",
         RCL_MESSAGE_TYPE_NOT_FOUND: "method_not_found",
         RCL_MESSAGE_TYPE_NOT_VALID_SIGNATURE: "not_valid_signature",
         RCL_MESSAGE_TYPE_NO_REQUIRED_PARAMETERS: "no_required_parameters",
+        RCL_MESSAGE_TYPE_BLOB_NOT_FOUND: "blob_not_found",
         RCL_MESSAGE_TYPE_INTERNAL_ERROR: "internal_error",
     }
 
     RCL_MESSAGES_TYPES = dict(map(lambda x: (x[1], x[0]), RCL_MESSAGES_NAMES.items()))
 
+    # Encode and decode headers field by field with validation of each parameter (slow, for debug only)
+    __validate_headers = False
+
+    @staticmethod
+    def set_headers_validation(enable: bool):
+        RCLProtocol.__validate_headers = enable
+
+    @staticmethod
+    def headers_validation() -> bool:
+        return RCLProtocol.__validate_headers
+
     @staticmethod
     def get_message_type_name(_type: int) -> Optional[str]:
         return RCLProtocol.RCL_MESSAGES_NAMES.get(_type)
@@ -110,10 +158,6 @@ class RCLProtocol:
     def get_message_type_by_name(name: str) -> Optional[int]:
         return RCLProtocol.RCL_MESSAGES_TYPES.get(name)
 
-    @staticmethod
-    def __current_time() -> int:
-        return int(str(datetime.now(timezone.utc).timestamp())[:10])
-
     @staticmethod
     def __raise_error(error_text: str):
         raise Exception(f"RCL Error: {error_text}")
@@ -186,6 +230,28 @@ class RCLProtocol:
         if p_len != _len:
             RCLProtocol.__raise_error(f"Len of parameter '{name}' is {str(p_len)}. Must be {str(_len)}")
 
+    @staticmethod
+    def __unpack_header(data: Union[bytes, bytearray, memoryview]) -> dict:
+        start_bytes, version, request_id, message_type, data_length = RCLProtocol.RCL_HEADERS_STRUCT.unpack_from(data)
+
+        return {
+            RCLProtocol.RCL_HEADER_START_BYTES: start_bytes,
+            RCLProtocol.RCL_HEADER_PROTOCOL_VERSION: version,
+            RCLProtocol.RCL_HEADER_REQUEST_ID: request_id,
+            RCLProtocol.RCL_HEADER_MESSAGE_TYPE: message_type,
+            RCLProtocol.RCL_HEADER_DATA_LENGTH: data_length,
+        }
+
+    @staticmethod
+    def __pack_header(request_id: int, message_type: int, _len: int) -> bytes:
+        return RCLProtocol.RCL_HEADERS_STRUCT.pack(
+            RCLProtocol.RCL_PROTOCOL_START_BYTES_RAW,
+            RCL_PROTOCOL_VERSION,
+            request_id,
+            message_type,
+            _len,
+        )
+
     @staticmethod
     def __decode_header(header: bytes) -> dict:
         buffer = bytearray(header)
@@ -224,27 +290,63 @@ class RCLProtocol:
         return bytes(header)
 
     @staticmethod
-    def create_message(message_type: int, data: bytes, _len: int) -> bytes:
-        data = RCLProtocol.__encode_header({
+    def encode_header(request_id: int, message_type: int, _len: int) -> bytes:
+        if not RCLProtocol.__validate_headers:
+            return RCLProtocol.__pack_header(request_id, message_type, _len)
+
+        return RCLProtocol.__encode_header({
             RCLProtocol.RCL_HEADER_START_BYTES: RCLProtocol.RCL_PROTOCOL_START_BYTES,
             RCLProtocol.RCL_HEADER_PROTOCOL_VERSION: RCL_PROTOCOL_VERSION,
-            RCLProtocol.RCL_HEADER_REQUEST_ID: RCLProtocol.__current_time(),
+            RCLProtocol.RCL_HEADER_REQUEST_ID: request_id,
             RCLProtocol.RCL_HEADER_MESSAGE_TYPE: message_type,
             RCLProtocol.RCL_HEADER_DATA_LENGTH: _len,
-        }) + data
+        })
+
+    @staticmethod
+    def create_message_buffers(
+        message_type: int,
+        buffers: List[Union[bytes, bytearray, memoryview]],
+        _len: int,
+        request_id: int = RCL_FIRST_REQUEST_ID
+    ) -> List[Union[bytes, bytearray, memoryview]]:
+        """
+        Create message as list of buffers: [HEADERS][DATA BUFFERS...][CRC32]. Data buffers are not copied,
+        checksum is calculated incrementally.
+        """
+        header = RCLProtocol.encode_header(request_id, message_type, _len)
 
-        return data + RCLProtocol.__checksum(data)
+        checksum = crc32(header)
+
+        for buffer in buffers:
+            checksum = crc32(buffer, checksum)
+
+        return [header, *buffers, checksum.to_bytes(RCLProtocol.RCL_CHECKSUM_LENGTH, 'big')]
+
+    @staticmethod
+    def create_message(message_type: int, data: bytes, _len: int, request_id: int = RCL_FIRST_REQUEST_ID) -> bytes:
+        return b"".join(RCLProtocol.create_message_buffers(message_type, [data], _len, request_id))
 
     @staticmethod
     def check_rcl_protocol(data: bytes) -> bool:
-        if data == RCLProtocol.RCL_PROTOCOL_START_BYTES.to_bytes(3, 'big'):
+        if data == RCLProtocol.RCL_PROTOCOL_START_BYTES_RAW:
             return True
 
         return False
 
     @staticmethod
-    def get_headers(data: bytes) -> dict:
-        return RCLProtocol.__decode_header(data[:RCLProtocol.RCL_HEADERS_LENGTH])
+    def get_headers(data: Union[bytes, bytearray, memoryview]) -> dict:
+        if RCLProtocol.__validate_headers:
+            return RCLProtocol.__decode_header(data[:RCLProtocol.RCL_HEADERS_LENGTH])
+
+        return RCLProtocol.__unpack_header(data)
+
+    @staticmethod
+    def get_request_id(data: Union[bytes, bytearray, memoryview]) -> int:
+        return RCLProtocol.RCL_HEADER_REQUEST_ID_STRUCT.unpack_from(data, RCLProtocol.RCL_HEADER_INDEX_REQUEST_ID)[0]
+
+    @staticmethod
+    def get_data_length(data: Union[bytes, bytearray, memoryview]) -> int:
+        return RCLProtocol.RCL_HEADER_DATA_LENGTH_STRUCT.unpack_from(data, RCLProtocol.RCL_HEADER_INDEX_DATA_LENGTH)[0]
 
     @staticmethod
     def check_protocol_version(version: int) -> bool:
@@ -254,12 +356,24 @@ class RCLProtocol:
     def get_message(data: bytes, _len: int) -> bytes:
         return data[RCLProtocol.RCL_HEADERS_LENGTH:RCLProtocol.RCL_HEADERS_LENGTH + _len]
 
+    @staticmethod
+    def max_data_length(max_packet_size: int) -> int:
+        return max_packet_size - RCLProtocol.RCL_HEADERS_LENGTH - RCLProtocol.RCL_CHECKSUM_LENGTH
+
+    @staticmethod
+    def message_length(_len: int) -> int:
+        return RCLProtocol.RCL_HEADERS_LENGTH + _len + RCLProtocol.RCL_CHECKSUM_LENGTH
+
     @staticmethod
     def check_crc(data: bytes, _len: int) -> bool:
-        data = data[:RCLProtocol.RCL_HEADERS_LENGTH + _len + 4]
+        data = data[:RCLProtocol.message_length(_len)]
 
         return data[-4:] == RCLProtocol.__checksum(data[:-4])
 
     @staticmethod
     def check_message_type(_type: int) -> bool:
-        return bool(RCLProtocol.RCL_MESSAGES_NAMES.get(_type))
+        return bool(RCLProtocol.RCL_MESSAGES_NAMES.get(_type & ~RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG))
+
+    @staticmethod
+    def is_compressed(_type: int) -> bool:
+        return bool(_type & RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG)
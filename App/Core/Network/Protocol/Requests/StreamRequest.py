@@ -0,0 +1,22 @@
+from typing import Union
+
+from .AbstractRequest import AbstractRequest
+from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
+
+
+class StreamRequest(AbstractRequest):
+    def __init__(self, stream_id: int, chunk: Union[bytes, memoryview], last: bool = False):
+        super().__init__({"stream_id": stream_id, "chunk": chunk, "last": last})
+
+    def stream_id(self) -> int:
+        return self._data["stream_id"]
+
+    def chunk(self) -> Union[bytes, memoryview]:
+        return self._data["chunk"]
+
+    def last(self) -> bool:
+        return self._data["last"]
+
+    @staticmethod
+    def type() -> int:
+        return RCLProtocol.RCL_MESSAGE_TYPE_STREAM
@@ -1,7 +1,9 @@
 from .AbstractRequest import AbstractRequest
 from .CallRequest import CallRequest
+from .StreamRequest import StreamRequest
 
 __all__ = [
     'AbstractRequest',
     'CallRequest',
+    'StreamRequest',
 ]
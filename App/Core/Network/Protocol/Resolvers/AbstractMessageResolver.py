@@ -1,12 +1,17 @@
 from abc import ABC, abstractmethod
 from typing import Union
 
+from App.Core.Network.Protocol.BufferWriter import BufferWriter
+
 
 class AbstractMessageResolver(ABC):
     @abstractmethod
     def create(self, data: Union[dict, list, str, bytes, None]) -> bytes:
         pass
 
+    def write(self, data: Union[dict, list, str, bytes, None], writer: BufferWriter) -> BufferWriter:
+        return writer.write(self.create(data))
+
     @abstractmethod
     def parse(self, data: bytes) -> Union[dict, list, str, bytes, None]:
         pass
@@ -1,4 +1,7 @@
+import struct
+
 from .AbstractMessageResolver import AbstractMessageResolver
+from App.Core.Network.Protocol.BufferWriter import BufferWriter
 
 
 class CallMessageResolver(AbstractMessageResolver):
@@ -46,6 +49,9 @@ class CallMessageResolver(AbstractMessageResolver):
     PARAMETER_BLOCK_SIZE_START = 1
     PARAMETER_BLOCK_SIZE_LEN = 4
 
+    # Parameter code and data size
+    PARAMETER_HEADER_STRUCT = struct.Struct('>BI')
+
     def __get_subcommands_size(self, data: bytes) -> int:
         return int(data[self.SUBCOMMANDS_BLOCK_START_BYTE])
 
@@ -75,39 +81,33 @@ class CallMessageResolver(AbstractMessageResolver):
 
         params = {}
         start_block = self.__get_start_pos_parameters_block(data) + 1
+        unpack_from = self.PARAMETER_HEADER_STRUCT.unpack_from
+        header_size = self.PARAMETER_HEADER_STRUCT.size
 
         for i in range(size):
-            parameter = data[start_block]
-
-            start_data_pos = start_block + self.PARAMETER_BLOCK_SIZE_START + self.PARAMETER_BLOCK_SIZE_LEN
+            parameter, param_size = unpack_from(data, start_block)
 
-            param_size = int.from_bytes(data[start_block + self.PARAMETER_BLOCK_SIZE_START:start_data_pos])
-            start_block = start_data_pos
+            start_block += header_size
             params[parameter] = data[start_block:start_block + param_size]
             start_block += param_size
 
         return params
 
-    def create(self, params: dict) -> bytes:
-        data = b""
-
-        data += params["command"].to_bytes(1, byteorder='big')
-
+    def write(self, params: dict, writer: BufferWriter) -> BufferWriter:
         subcommands = params.get("subcommands") or []
-
-        data += len(subcommands).to_bytes(1, byteorder='big')
-
-        for subcommand in subcommands:
-            data += subcommand.to_bytes(1, byteorder='big')
-
         parameters = params.get("parameters") or {}
 
-        data += len(parameters.keys()).to_bytes(1, byteorder='big')
+        writer.write(bytes([params["command"], len(subcommands), *subcommands, len(parameters)]))
+
+        pack = self.PARAMETER_HEADER_STRUCT.pack
 
         for key, val in parameters.items():
-            data += key.to_bytes(1, byteorder='big') + len(val).to_bytes(4, byteorder='big') + val
+            writer.write(pack(key, len(val))).write(val)
+
+        return writer
 
-        return data
+    def create(self, params: dict) -> bytes:
+        return self.write(params, BufferWriter()).getvalue()
 
     def parse(self, data: bytes) -> dict:
         return {
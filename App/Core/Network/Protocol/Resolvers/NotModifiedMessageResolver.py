@@ -0,0 +1,17 @@
+from typing import Union
+
+from App.Core.Network.Protocol.Resolvers.AbstractMessageResolver import AbstractMessageResolver
+
+
+class NotModifiedMessageResolver(AbstractMessageResolver):
+    def create(self, data: [str, None]) -> bytes:
+        if data is None:
+            return b""
+
+        return data.encode("utf-8")
+
+    def parse(self, data: bytes) -> Union[str, None]:
+        if data == b"":
+            return None
+
+        return str(data, "utf-8")
@@ -1,6 +1,8 @@
-from typing import Union
+from typing import Union, Optional, Tuple
 import json
 from .AbstractMessageResolver import AbstractMessageResolver
+from App.Core.Network.Protocol.BufferWriter import BufferWriter, Buffer
+from App.Core.Network.Protocol.BinaryValueCodec import BinaryValueCodec
 
 
 class ResponseMessageSuccessResolver(AbstractMessageResolver):
@@ -8,6 +10,13 @@ class ResponseMessageSuccessResolver(AbstractMessageResolver):
     TYPE_CODE_JSON = 0x02
     TYPE_CODE_BYTES = 0x03
     TYPE_CODE_BOOL = 0x04
+    TYPE_CODE_BINARY = 0x05
+
+    # `[TYPE_CODE_VERSIONED][VERSION LEN (1)][VERSION][TYPE CODE][DATA]`
+    TYPE_CODE_VERSIONED = 0x06
+
+    def __init__(self, codec: Optional[BinaryValueCodec] = None):
+        self.__codec = codec
 
     @staticmethod
     def __get_type_code(data: Union[str, list, dict, bytes, bool, None]):
@@ -16,7 +25,7 @@ class ResponseMessageSuccessResolver(AbstractMessageResolver):
         if _type is str:
             return ResponseMessageSuccessResolver.TYPE_CODE_STR
 
-        if _type is list or _type is dict:
+        if _type is list or _type is dict or _type is int or _type is float:
             return ResponseMessageSuccessResolver.TYPE_CODE_JSON
 
         if _type is bytes:
@@ -40,29 +49,85 @@ class ResponseMessageSuccessResolver(AbstractMessageResolver):
         if _type is self.TYPE_CODE_BOOL:
             return b"\x01" if data else b"\x00"
 
-    def __decode_data(self, data: bytes, _type: int) -> Union[str, list, dict, bytes, bool]:
+        if _type is self.TYPE_CODE_BINARY:
+            return self.__codec.encode(data)
+
+    def __decode_data(self, data: Buffer, _type: int) -> Union[str, list, dict, bytes, bool]:
         if _type == self.TYPE_CODE_STR:
-            return data.decode("utf-8")
+            return str(data, "utf-8")
 
         if _type == self.TYPE_CODE_JSON:
-            return json.loads(data.decode("utf-8"))
+            return json.loads(str(data, "utf-8"))
 
         if _type is self.TYPE_CODE_BYTES:
-            return data
+            return bytes(data)
 
         if _type is self.TYPE_CODE_BOOL:
             return False if b"\x00" == data else True
 
-    def parse(self, data: bytes) -> Union[dict, list, str, bytes, None]:
-        if data == b'':
+        if _type is self.TYPE_CODE_BINARY:
+            if not self.__codec:
+                raise Exception("Binary response cannot be decoded without proto objects")
+
+            return self.__codec.decode(data)
+
+    def parse(self, data: Buffer) -> Union[dict, list, str, bytes, None]:
+        return self.parse_versioned(data)[0]
+
+    def parse_versioned(self, data: Buffer) -> Tuple[Union[dict, list, str, bytes, None], Optional[str]]:
+        """
+        Parse response data and its version.
+        """
+        data, version = self.split_version(data)
+
+        return self.decode(data), version
+
+    @classmethod
+    def split_version(cls, data: Buffer) -> Tuple[Buffer, Optional[str]]:
+        """
+        Version of response data and the data after it, which is decoded by `decode`.
+        """
+        if data[:1] != bytes([cls.TYPE_CODE_VERSIONED]):
+            return data, None
+
+        end = 2 + data[1]
+
+        return data[end:], bytes(data[2:end]).decode("utf-8")
+
+    def decode(self, data: Buffer) -> Union[dict, list, str, bytes, None]:
+        """
+        Decode response data without version: `[TYPE CODE][DATA]`.
+        """
+        if not len(data):
             return None
 
         return self.__decode_data(data[1:], data[0])
 
-    def create(self, data: Union[dict, list, str, bytes, None]) -> bytes:
-        if not data:
-            return b''
+    def write(
+        self,
+        data: Union[dict, list, str, bytes, None],
+        writer: BufferWriter,
+        binary: bool = False,
+        version: Optional[str] = None
+    ) -> BufferWriter:
+        """
+        Write response data. If `binary`, lists and maps are written by binary codec instead of JSON. `version` of
+        data (up to 255 bytes) is written before data. Only None is written as empty data, empty and false values
+        keep their type.
+        """
+        if version:
+            encoded = version.encode("utf-8")
+            writer.write_int(self.TYPE_CODE_VERSIONED, 1).write_int(len(encoded), 1).write(encoded)
+
+        if data is None:
+            return writer
 
         _type = self.__get_type_code(data)
 
-        return _type.to_bytes(1, 'big') + self.__encode_data(data, _type)
+        if binary and self.__codec and _type == self.TYPE_CODE_JSON:
+            _type = self.TYPE_CODE_BINARY
+
+        return writer.write_int(_type, 1).write(self.__encode_data(data, _type))
+
+    def create(self, data: Union[dict, list, str, bytes, None]) -> bytes:
+        return self.write(data, BufferWriter()).getvalue()
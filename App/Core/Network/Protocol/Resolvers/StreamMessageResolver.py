@@ -0,0 +1,37 @@
+from .AbstractMessageResolver import AbstractMessageResolver
+from App.Core.Network.Protocol.BufferWriter import BufferWriter
+
+
+class StreamMessageResolver(AbstractMessageResolver):
+    """
+    Stream type message. Carries one chunk of streamed parameter declared in the call message.
+
+    Encoding:
+
+        [0xXXXXXXXX][0xXX][Data...] - 4 bytes is a stream id, 1 byte is a flags block, rest bytes are a chunk data.
+
+    Flags:
+
+        0x01 - Last chunk of the stream.
+    """
+
+    STREAM_ID_LEN = 4
+    FLAGS_LEN = 1
+    HEADER_LEN = STREAM_ID_LEN + FLAGS_LEN
+
+    FLAG_LAST = 0x01
+
+    def write(self, data: dict, writer: BufferWriter) -> BufferWriter:
+        flags = self.FLAG_LAST if data["last"] else 0x00
+
+        return writer.write_int(data["stream_id"], self.STREAM_ID_LEN).write_int(flags, self.FLAGS_LEN).write(data["chunk"])
+
+    def create(self, data: dict) -> bytes:
+        return self.write(data, BufferWriter()).getvalue()
+
+    def parse(self, data: bytes) -> dict:
+        return {
+            "stream_id": int.from_bytes(data[:self.STREAM_ID_LEN], 'big'),
+            "chunk": data[self.HEADER_LEN:],
+            "last": bool(data[self.STREAM_ID_LEN] & self.FLAG_LAST),
+        }
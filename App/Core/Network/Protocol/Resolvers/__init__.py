@@ -1,11 +1,15 @@
 from .CallMessageResolver import CallMessageResolver
 from .InternalErrorMessageResolver import InternalErrorMessageResolver
+from .NotModifiedMessageResolver import NotModifiedMessageResolver
 from .AbstractMessageResolver import AbstractMessageResolver
 from .ResponseMessageSuccessResolver import ResponseMessageSuccessResolver
+from .StreamMessageResolver import StreamMessageResolver
 
 __all__ = [
     "CallMessageResolver",
     "InternalErrorMessageResolver",
+    "NotModifiedMessageResolver",
     "AbstractMessageResolver",
     "ResponseMessageSuccessResolver",
+    "StreamMessageResolver",
 ]
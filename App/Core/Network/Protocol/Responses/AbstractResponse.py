@@ -1,12 +1,34 @@
 from abc import ABC, abstractmethod
-from typing import Union
+from threading import Lock
+from typing import Union, Optional, Callable
+
+Data = Union[str, dict, list, bytes, None]
 
 
 class AbstractResponse(ABC):
-    def __init__(self, data: Union[str, dict, list, bytes, None]):
+    def __init__(self, data: Data):
         self._data = data
+        self.__decode: Optional[Callable[[], Data]] = None
+        self.__lock: Optional[Lock] = None
+
+    @classmethod
+    def lazy(cls, decode: Callable[[], Data], *args) -> 'AbstractResponse':
+        """
+        Response, which data is decoded by `decode` on the first `data()` call. `args` follow data in constructor.
+        """
+        response = cls(None, *args)
+        response.__decode = decode
+        response.__lock = Lock()
+
+        return response
+
+    def data(self) -> Data:
+        if self.__decode:
+            with self.__lock:
+                if decode := self.__decode:
+                    self._data = decode()
+                    self.__decode = None
 
-    def data(self) -> Union[str, dict, list, bytes, None]:
         return self._data
 
     @staticmethod
@@ -0,0 +1,16 @@
+from .AbstractResponse import AbstractResponse
+from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
+
+
+class ResponseBlobNotFound(AbstractResponse):
+    """
+    Error of call with `file-hash` of file, which server does not hold (evicted blob). Client uploads the file then.
+    Data is the error message.
+    """
+
+    def __init__(self, data: [str, None] = None) -> None:
+        super().__init__(data)
+
+    @staticmethod
+    def type() -> int:
+        return RCLProtocol.RCL_MESSAGE_TYPE_BLOB_NOT_FOUND
@@ -0,0 +1,15 @@
+from .AbstractResponse import AbstractResponse
+from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
+
+
+class ResponseEvent(AbstractResponse):
+    """
+    State changes pushed to subscribed client: changed items by topics, e.g. `{'jobs': [{'job': 'HP-12', ...}]}`.
+    """
+
+    def __init__(self, data: dict) -> None:
+        super().__init__(data)
+
+    @staticmethod
+    def type() -> int:
+        return RCLProtocol.RCL_MESSAGE_TYPE_EVENT
@@ -0,0 +1,15 @@
+from .AbstractResponse import AbstractResponse
+from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
+
+
+class ResponseNotFound(AbstractResponse):
+    """
+    Error of call to command, which server does not have. Data is the error message.
+    """
+
+    def __init__(self, data: [str, None] = None) -> None:
+        super().__init__(data)
+
+    @staticmethod
+    def type() -> int:
+        return RCLProtocol.RCL_MESSAGE_TYPE_NOT_FOUND
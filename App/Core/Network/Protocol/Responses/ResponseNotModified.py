@@ -0,0 +1,18 @@
+from .AbstractResponse import AbstractResponse
+from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
+
+
+class ResponseNotModified(AbstractResponse):
+    """
+    Answer to call with `version` parameter, if data of server has the same version. Data is the version.
+    """
+
+    def __init__(self, data: [str, None] = None) -> None:
+        super().__init__(data)
+
+    def version(self) -> str:
+        return self.data()
+
+    @staticmethod
+    def type() -> int:
+        return RCLProtocol.RCL_MESSAGE_TYPE_NOT_MODIFIED
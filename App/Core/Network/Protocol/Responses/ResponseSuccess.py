@@ -1,13 +1,21 @@
-from typing import Union
+from typing import Union, Optional
 
 from .AbstractResponse import AbstractResponse
 from App.Core.Network.Protocol.RCLProtocol import RCLProtocol
 
 
 class ResponseSuccess(AbstractResponse):
-    def __init__(self, data: Union[str, bytes, list, dict]) -> None:
+    def __init__(self, data: Union[str, bytes, list, dict], version: Optional[str] = None) -> None:
         super().__init__(data)
 
+        self.__version = version
+
+    def version(self) -> Optional[str]:
+        """
+        Version of data. Client sends it in `version` parameter of next call to get `ResponseNotModified`.
+        """
+        return self.__version
+
     @staticmethod
     def type() -> int:
         return RCLProtocol.RCL_MESSAGE_TYPE_RETURN
@@ -1,9 +1,17 @@
 from .ResponseSuccess import ResponseSuccess
 from .AbstractResponse import AbstractResponse
 from .ResponseInternalError import ResponseInternalError
+from .ResponseNotModified import ResponseNotModified
+from .ResponseNotFound import ResponseNotFound
+from .ResponseBlobNotFound import ResponseBlobNotFound
+from .ResponseEvent import ResponseEvent
 
 __all__ = [
     "ResponseSuccess",
     "ResponseInternalError",
+    "ResponseNotModified",
+    "ResponseNotFound",
+    "ResponseBlobNotFound",
+    "ResponseEvent",
     "AbstractResponse",
 ]
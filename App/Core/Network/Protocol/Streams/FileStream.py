@@ -0,0 +1,46 @@
+import hashlib
+import os
+from typing import Iterator
+
+from App.Core.Filesystem import Filesystem
+
+
+class FileStream:
+    """
+    Reference to a file used as `bytes` parameter value.
+
+    File content is not loaded into memory. It is read by chunks only when the message is sent.
+    """
+
+    DIGEST_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: str):
+        self.__path = path
+
+    def path(self) -> str:
+        return self.__path
+
+    def size(self) -> int:
+        return os.path.getsize(self.__path)
+
+    def read(self) -> bytes:
+        return Filesystem.read_file(self.__path, True)
+
+    def chunks(self, size: int) -> Iterator[bytes]:
+        with open(self.__path, 'rb') as file:
+            while chunk := file.read(size):
+                yield chunk
+
+    def digest(self) -> str:
+        """
+        SHA-256 of file content (hex).
+        """
+        digest = hashlib.sha256()
+
+        for chunk in self.chunks(self.DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def __repr__(self) -> str:
+        return f"FileStream('{self.__path}')"
@@ -0,0 +1,80 @@
+import tempfile
+from typing import Dict, BinaryIO, Optional
+
+from App.Core.Filesystem import Filesystem
+from App.Core.Network.Protocol.Requests import CallRequest, StreamRequest
+
+from .FileStream import FileStream
+from .StreamParameter import StreamParameter
+
+
+class StreamAssembler:
+    """
+    Receiver part of streamed parameters.
+
+    Call message declares stream ids for large parameters, stream messages are written to temporary files as they
+    come, so memory usage depends only on the stream message size.
+    """
+
+    def __init__(self):
+        self.__files: Dict[int, BinaryIO] = {}
+        self.__paths: Dict[int, str] = {}
+
+    def expect(self, request: CallRequest) -> int:
+        count = 0
+
+        for value in (request.parameters() or {}).values():
+            if not isinstance(value, StreamParameter):
+                continue
+
+            file = tempfile.NamedTemporaryFile('wb', prefix='rcl_stream_', dir=Filesystem.get_tmp_path(), delete=False)
+
+            self.__files[value.stream_id()] = file
+            self.__paths[value.stream_id()] = file.name
+
+            count += 1
+
+        return count
+
+    def feed(self, request: StreamRequest) -> bool:
+        if not (file := self.__files.get(stream_id := request.stream_id())):
+            raise Exception(f"Unknown stream '{stream_id}'")
+
+        file.write(request.chunk())
+
+        if request.last():
+            file.close()
+            self.__files.pop(stream_id)
+
+        return request.last()
+
+    def pending(self) -> bool:
+        return len(self.__files) > 0
+
+    def resolve(self, request: CallRequest) -> CallRequest:
+        parameters = request.parameters() or {}
+
+        for name, value in parameters.items():
+            if not isinstance(value, StreamParameter):
+                continue
+
+            if (path := self.__paths.pop(value.stream_id(), None)) is None:
+                raise Exception(f"Stream '{value.stream_id()}' not received")
+
+            parameters[name] = FileStream(path)
+
+        return request
+
+    def path(self, stream_id: int) -> Optional[str]:
+        return self.__paths.get(stream_id)
+
+    def abort(self):
+        for file in self.__files.values():
+            file.close()
+
+        for path in self.__paths.values():
+            if Filesystem.exists(path):
+                Filesystem.delete(path)
+
+        self.__files.clear()
+        self.__paths.clear()
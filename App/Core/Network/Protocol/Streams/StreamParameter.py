@@ -0,0 +1,32 @@
+from typing import Union, Optional, Iterator
+
+from .FileStream import FileStream
+
+
+class StreamParameter:
+    """
+    Placeholder of `bytes` parameter which data is transferred by stream messages after the call message.
+    """
+
+    def __init__(self, stream_id: int, source: Union[bytes, FileStream, None] = None):
+        self.__stream_id = stream_id
+        self.__source = source
+
+    def stream_id(self) -> int:
+        return self.__stream_id
+
+    def source(self) -> Union[bytes, FileStream, None]:
+        return self.__source
+
+    def chunks(self, size: int) -> Iterator[bytes]:
+        if isinstance(self.__source, FileStream):
+            yield from self.__source.chunks(size)
+            return
+
+        data = memoryview(self.__source or b"")
+
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+
+    def __repr__(self) -> str:
+        return f"StreamParameter({self.__stream_id})"
@@ -0,0 +1,9 @@
+from .FileStream import FileStream
+from .StreamParameter import StreamParameter
+from .StreamAssembler import StreamAssembler
+
+__all__ = [
+    'FileStream',
+    'StreamParameter',
+    'StreamAssembler',
+]
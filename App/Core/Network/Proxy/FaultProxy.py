@@ -0,0 +1,249 @@
+import asyncio
+import random
+import struct
+from dataclasses import dataclass, field
+from socket import IPPROTO_TCP, TCP_NODELAY, SOL_SOCKET, SO_LINGER
+from typing import Optional, Tuple, Set, Dict, Iterator
+
+from App.Core.Logger import Log
+
+
+@dataclass
+class Faults:
+    """
+    Network conditions of proxy. Zero values disable faults.
+    """
+    # Seconds added to delivery of every chunk in both directions, plus random up to `jitter`
+    latency: float = 0
+    jitter: float = 0
+    # Bytes per second of every direction
+    bandwidth: int = 0
+    # Max bytes sent at once, the other side receives data in small parts
+    fragment: int = 0
+    # Connection is reset (RST) after this number of bytes in both directions, or on a chunk with `reset_rate`
+    # probability
+    reset_after: int = 0
+    reset_rate: float = 0
+    # Connection stops forwarding once for `stall` seconds after this number of bytes. With `stall_rate` it stalls on
+    # a chunk after these bytes with this probability
+    stall_after: int = 0
+    stall_rate: float = 0
+    stall: float = 0
+    # Byte of responses stream at this offset is inverted, once per connection (CRC failure)
+    corrupt_at: int = -1
+
+
+@dataclass(eq=False)
+class Link:
+    """
+    State of one proxied connection.
+    """
+    client: asyncio.StreamWriter
+    server: asyncio.StreamWriter
+    bytes: int = 0
+    bytes_down: int = 0
+    stalled: bool = False
+    reset: bool = False
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+
+
+class FaultProxy:
+    """
+    asyncio TCP proxy to a server, which injects latency, bandwidth caps, fragmentation, connection resets, stalls
+    and corrupted bytes (see `Faults`). Faults can be changed while proxy is running, they apply to the next chunks.
+
+    Every direction reads ahead at most `QUEUE_SIZE` chunks, slow delivery stops reading, so memory of proxy does not
+    depend on traffic.
+    """
+
+    READ_SIZE = 64 * 1024
+    QUEUE_SIZE = 16
+
+    def __init__(self, target: Tuple[str, int], faults: Faults, log: Log, seed: Optional[int] = None):
+        self.__target = target
+        self.__faults = faults
+        self.__log = log
+        self.__random = random.Random(seed)
+
+        self.__server: Optional[asyncio.AbstractServer] = None
+        self.__links: Set[Link] = set()
+        self.__stats: Dict[str, int] = {'connections': 0, 'resets': 0, 'stalls': 0, 'corrupted': 0}
+
+    def faults(self) -> Faults:
+        return self.__faults
+
+    def set_faults(self, faults: Faults) -> None:
+        self.__faults = faults
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.__stats)
+
+    async def start(self, address: str = '127.0.0.1', port: int = 0) -> int:
+        """
+        Start listening. Returns port of proxy, random free port if `port` is 0.
+        """
+        self.__server = await asyncio.start_server(self.__handle, address, port)
+
+        return self.__server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self.__server:
+            self.__server.close()
+            await self.__server.wait_closed()
+
+        for link in list(self.__links):
+            self.__abort(link)
+
+    async def __handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.__target)
+        except OSError as e:
+            self.__log.warning(f"Proxy cannot connect to {self.__target[0]}:{self.__target[1]}. {e}")
+            client_writer.close()
+            return
+
+        for writer in (client_writer, server_writer):
+            writer.get_extra_info('socket').setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+        link = Link(client_writer, server_writer)
+
+        self.__links.add(link)
+        self.__stats['connections'] += 1
+
+        link.tasks = {
+            asyncio.create_task(self.__pump(link, client_reader, server_writer, False)),
+            asyncio.create_task(self.__pump(link, server_reader, client_writer, True)),
+        }
+
+        try:
+            pending = link.tasks
+
+            # Half-closed connection is kept until the other direction is closed too, broken one is closed at once
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                if any(x.cancelled() or not x.result() for x in done):
+                    break
+        finally:
+            self.__abort(link)
+
+    def __abort(self, link: Link):
+        self.__links.discard(link)
+
+        for task in link.tasks:
+            task.cancel()
+
+        for writer in (link.client, link.server):
+            if link.reset and (sock := writer.get_extra_info('socket')):
+                # Zero linger time makes close send RST instead of FIN
+                sock.setsockopt(SOL_SOCKET, SO_LINGER, struct.pack('ii', 1, 0))
+                writer.transport.abort()
+            else:
+                writer.close()
+
+    async def __pump(self, link: Link, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, down: bool) -> bool:
+        """
+        Forward one direction until end of stream. Returns False if connection is reset or broken.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.QUEUE_SIZE)
+
+        async def receive():
+            # None is end of stream, False is broken connection
+            try:
+                while data := await reader.read(self.READ_SIZE):
+                    delay = self.__faults.latency + self.__random.uniform(0, self.__faults.jitter)
+                    await queue.put((loop.time() + delay, data))
+            except OSError:
+                await queue.put(False)
+                return
+
+            await queue.put(None)
+
+        receiving = asyncio.create_task(receive())
+        free_at = 0.0
+
+        try:
+            while item := await queue.get():
+                deliver_at, data = item
+
+                if (delay := deliver_at - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+
+                if down:
+                    data = self.__corrupt(link, data)
+
+                for chunk in self.__chunks(data, self.__faults.fragment):
+                    faults = self.__faults
+
+                    if self.__must_reset(link, faults, len(chunk)):
+                        return False
+
+                    if self.__must_stall(link, faults):
+                        await asyncio.sleep(faults.stall)
+
+                    if faults.bandwidth:
+                        free_at = max(free_at, loop.time()) + len(chunk) / faults.bandwidth
+                        await asyncio.sleep(free_at - loop.time())
+
+                    writer.write(chunk)
+                    await writer.drain()
+
+                    link.bytes += len(chunk)
+                    link.bytes_down += len(chunk) if down else 0
+
+            if item is False:
+                return False
+
+            if writer.can_write_eof():
+                writer.write_eof()
+        except OSError:
+            return False
+        finally:
+            receiving.cancel()
+
+        return True
+
+    @staticmethod
+    def __chunks(data: bytes, size: int) -> Iterator[bytes]:
+        if not size:
+            yield data
+            return
+
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+
+    def __must_reset(self, link: Link, faults: Faults, size: int) -> bool:
+        over = faults.reset_after and link.bytes + size > faults.reset_after
+
+        if not over and not (faults.reset_rate and self.__random.random() < faults.reset_rate):
+            return False
+
+        link.reset = True
+        self.__stats['resets'] += 1
+
+        return True
+
+    def __must_stall(self, link: Link, faults: Faults) -> bool:
+        if link.stalled or not faults.stall or link.bytes < faults.stall_after:
+            return False
+
+        if faults.stall_rate and self.__random.random() >= faults.stall_rate:
+            return False
+
+        link.stalled = True
+        self.__stats['stalls'] += 1
+
+        return True
+
+    def __corrupt(self, link: Link, data: bytes) -> bytes:
+        offset = self.__faults.corrupt_at - link.bytes_down
+
+        if self.__faults.corrupt_at < 0 or not 0 <= offset < len(data):
+            return data
+
+        data = bytearray(data)
+        data[offset] ^= 0xFF
+        self.__stats['corrupted'] += 1
+
+        return bytes(data)
@@ -0,0 +1,6 @@
+from .FaultProxy import FaultProxy, Faults
+
+__all__ = [
+    'FaultProxy',
+    'Faults',
+]
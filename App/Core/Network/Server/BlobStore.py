@@ -0,0 +1,138 @@
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from App.Core import Config
+from App.Core.Logger import Log
+from App.Core.Network.Protocol.Streams import FileStream
+
+
+class BlobStore:
+    """
+    Content-addressed store of uploaded files on server.
+
+    Files are named by SHA-256 of content, so a client can ask whether the server already holds a file before
+    uploading it. Total size is bounded by `max_size`: least recently used files are evicted. Recency survives
+    restarts through modification time of files.
+    """
+
+    REGEX_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+    def __init__(self, log: Log, config: Config):
+        self.__log = log
+
+        self.__path = config.get('server.blobs.path')
+        self.__max_size = int(config.get('server.blobs.max_size'))
+
+        self.__lock = Lock()
+        self.__sizes: OrderedDict[str, int] = OrderedDict()
+        self.__size = 0
+
+        os.makedirs(self.__path, exist_ok=True)
+
+        for entry in sorted(os.scandir(self.__path), key=lambda x: x.stat().st_mtime):
+            if entry.is_file() and self.REGEX_DIGEST.match(entry.name):
+                self.__sizes[entry.name] = entry.stat().st_size
+                self.__size += entry.stat().st_size
+
+    def __file(self, digest: str) -> str:
+        if not self.REGEX_DIGEST.match(digest):
+            raise Exception(f"Invalid blob hash '{digest}'")
+
+        return os.path.join(self.__path, digest)
+
+    def __evict(self):
+        while self.__size > self.__max_size and self.__sizes:
+            digest, size = self.__sizes.popitem(last=False)
+            self.__size -= size
+
+            try:
+                os.remove(os.path.join(self.__path, digest))
+            except OSError as e:
+                self.__log.warning(f"Cannot remove blob {digest}. {e}", {'object': self})
+
+    def has(self, digest: str) -> bool:
+        """
+        Check the blob and mark it as recently used.
+        """
+        file = self.__file(digest)
+
+        with self.__lock:
+            if digest not in self.__sizes:
+                return False
+
+            self.__sizes.move_to_end(digest)
+
+        try:
+            os.utime(file)
+        except OSError:
+            with self.__lock:
+                self.__size -= self.__sizes.pop(digest, 0)
+
+            return False
+
+        return True
+
+    def checkout(self, digest: str) -> Optional[str]:
+        """
+        Copy of the blob in tmp dir (printing moves its file), None if the blob is evicted.
+        """
+        if not self.has(digest):
+            return None
+
+        fd, path = tempfile.mkstemp(prefix='rcl_blob_')
+        os.close(fd)
+
+        try:
+            shutil.copyfile(self.__file(digest), path)
+        except OSError:
+            os.remove(path)
+            return None
+
+        return path
+
+    def put(self, digest: str, path: str) -> bool:
+        """
+        Store copy of the file. File is stored only if its content matches `digest`.
+        """
+        file = self.__file(digest)
+
+        if self.has(digest):
+            return True
+
+        if (size := os.path.getsize(path)) > self.__max_size:
+            return False
+
+        if FileStream(path).digest() != digest:
+            self.__log.warning(f"Uploaded file does not match hash {digest}", {'object': self})
+            return False
+
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.__path)
+        os.close(fd)
+
+        try:
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, file)
+        except OSError as e:
+            self.__log.warning(f"Cannot store blob {digest}. {e}", {'object': self})
+
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+            return False
+
+        with self.__lock:
+            if digest not in self.__sizes:
+                self.__sizes[digest] = size
+                self.__size += size
+
+            self.__evict()
+
+        return True
+
+    def size(self) -> int:
+        return self.__size
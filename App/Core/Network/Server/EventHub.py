@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, List, Callable, Awaitable, Any, Optional, Tuple, Set
+
+Push = Callable[[Any, int, dict], Awaitable[None]]
+
+
+class EventHub:
+    """
+    Subscriptions of server connections to state changes.
+
+    State of a topic is a map of items by keys (printers by names, jobs by ids). `update` compares the state with the
+    last one and publishes changed and removed items, removed items are published as `{'key': ..., 'removed': True}`.
+
+    Bursts are coalesced: item changed several times in `coalesce_interval` seconds is pushed once in its last state,
+    all changes of the interval go to a subscriber in one 'event' message. New subscriber gets the known states first
+    (see `replay`), so reconnected client does not miss changes.
+    """
+
+    TOPIC_PRINTERS = 'printers'
+    TOPIC_JOBS = 'jobs'
+
+    TOPICS = [TOPIC_PRINTERS, TOPIC_JOBS]
+
+    def __init__(self, coalesce_interval: float, push: Push):
+        self.__coalesce_interval = coalesce_interval
+        self.__push = push
+
+        # Session -> (request id of 'subscribe' call, topics)
+        self.__subscribers: Dict[Any, Tuple[int, List[str]]] = {}
+        self.__states: Dict[str, Dict[str, dict]] = {}
+        self.__pending: Dict[str, Dict[str, dict]] = {}
+        self.__flush: Optional[asyncio.TimerHandle] = None
+        self.__tasks: Set[asyncio.Task] = set()
+
+    def subscribe(self, session, request_id: int, topics: List[str]) -> List[str]:
+        """
+        Subscribe session to topics. Unknown topics are skipped, returns subscribed topics.
+        """
+        topics = [x for x in dict.fromkeys(topics or self.TOPICS) if x in self.TOPICS]
+
+        self.__subscribers[session] = (request_id, topics)
+
+        return topics
+
+    def replay(self, session) -> None:
+        """
+        Push known states of session topics to session.
+        """
+        if not (subscriber := self.__subscribers.get(session)):
+            return
+
+        request_id, topics = subscriber
+
+        if event := {x: list(self.__states[x].values()) for x in topics if self.__states.get(x)}:
+            self.__deliver_later(session, request_id, event)
+
+    def unsubscribe(self, session) -> None:
+        self.__subscribers.pop(session, None)
+
+    def subscribed(self, topic: str) -> bool:
+        return any(topic in topics for _, topics in self.__subscribers.values())
+
+    def update(self, topic: str, items: Dict[str, dict]) -> None:
+        """
+        Set the whole state of topic. The first state of topic is not published, there is nothing to compare with.
+        """
+        if (last := self.__states.get(topic)) is not None:
+            for key, item in items.items():
+                if last.get(key) != item:
+                    self.publish(topic, key, item)
+
+            for key in last.keys() - items.keys():
+                self.publish(topic, key, {'key': key, 'removed': True})
+
+        self.__states[topic] = dict(items)
+
+    def publish(self, topic: str, key: str, item: dict) -> None:
+        self.__pending.setdefault(topic, {})[key] = item
+
+        if not self.__flush:
+            self.__flush = asyncio.get_running_loop().call_later(self.__coalesce_interval, self.__send)
+
+    def __send(self):
+        pending, self.__pending, self.__flush = self.__pending, {}, None
+
+        for session, (request_id, topics) in list(self.__subscribers.items()):
+            if event := {x: list(pending[x].values()) for x in topics if x in pending}:
+                self.__deliver_later(session, request_id, event)
+
+    def __deliver_later(self, session, request_id: int, event: dict):
+        self.__tasks.add(task := asyncio.create_task(self.__deliver(session, request_id, event)))
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __deliver(self, session, request_id: int, event: dict):
+        try:
+            await self.__push(session, request_id, event)
+        except Exception:
+            # Connection is closed, session is unsubscribed by server
+            self.unsubscribe(session)
@@ -0,0 +1,274 @@
+import asyncio
+from dataclasses import dataclass, field
+from socket import IPPROTO_TCP, TCP_NODELAY
+from typing import Dict, List, Optional, Set
+
+from App.Core import Config
+from App.Core.Logger import Log
+from App.Core.Network.Protocol import RCL, RCLProtocol, CallRequest
+from App.Core.Network.Protocol.Requests import StreamRequest
+from App.Core.Network.Protocol.Responses import AbstractResponse, ResponseSuccess, ResponseInternalError, ResponseEvent
+from App.Core.Network.Protocol.Streams import StreamAssembler
+
+from .EventHub import EventHub
+from .RequestDispatcher import RequestDispatcher
+
+
+@dataclass(eq=False)
+class Session:
+    """
+    State of one client connection.
+    """
+    writer: asyncio.StreamWriter
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    assembler: StreamAssembler = field(default_factory=StreamAssembler)
+    # Calls waiting for their stream messages: request id -> [call, streams left]
+    pending: Dict[int, list] = field(default_factory=dict)
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+    codecs: List[str] = field(default_factory=list)
+    binary: bool = False
+
+
+class RCLServer:
+    """
+    asyncio RCL server.
+
+    All connections are served by one event loop. Calls of a connection are handled concurrently and every response
+    repeats request id of its call, so pooled and multiplexed clients can share the connection. Blocking work runs on
+    worker threads of `RequestDispatcher`.
+
+    Backpressure:
+      - connections over `max_incoming_connections` are not read until one of served connections is closed;
+      - connection is not read while `max_pending_calls` calls of all connections wait for workers.
+
+    'ping' is answered on the loop with capabilities of server (compression codecs and response encodings).
+
+    'subscribe' call keeps the connection subscribed to changes of printers and jobs, they are pushed as 'event'
+    messages with request id of the call. Printers and jobs are polled (`server.events`) only while some connection
+    is subscribed to them, one poll serves all subscribers.
+    """
+
+    PING_COMMAND = 'ping'
+    SUBSCRIBE_COMMAND = 'subscribe'
+
+    def __init__(self, log: Log, config: Config, rcl: RCL, dispatcher: RequestDispatcher):
+        self.__log = log
+        self.__rcl = rcl
+        self.__dispatcher = dispatcher
+        self.__config = config.get('server')
+
+        self.__server: Optional[asyncio.AbstractServer] = None
+        self.__connections: Optional[asyncio.Semaphore] = None
+        self.__calls: Optional[asyncio.Semaphore] = None
+
+        events = self.__config['events']
+
+        self.__events = EventHub(float(events['coalesce_interval']), self.__push)
+        self.__watchers: List[asyncio.Task] = []
+
+    def __debug(self, message: str):
+        if self.__config['debug']:
+            self.__log.debug(message, {'object': self})
+
+    async def __read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        try:
+            header = await reader.readexactly(RCLProtocol.RCL_HEADERS_LENGTH)
+        except asyncio.IncompleteReadError:
+            return None
+
+        if (length := RCLProtocol.message_length(RCLProtocol.get_data_length(header))) > self.__rcl.max_packet_size():
+            raise Exception(f"Message len {length} is more than max packet size {self.__rcl.max_packet_size()}")
+
+        return header + await reader.readexactly(length - len(header))
+
+    async def __respond(self, session: Session, request_id: int, response: AbstractResponse, command: str = ''):
+        codec = self.__rcl.codec(command, session.codecs) if command else None
+
+        buffers = self.__rcl.create_response_buffers(response, request_id, codec, session.binary)
+
+        async with session.lock:
+            session.writer.writelines(buffers)
+            await session.writer.drain()
+
+    async def __push(self, session: Session, request_id: int, event: dict):
+        await self.__respond(session, request_id, ResponseEvent(event))
+
+    async def __watch(self, topic: str, interval: float, poll):
+        while True:
+            await asyncio.sleep(interval)
+
+            if not self.__events.subscribed(topic):
+                continue
+
+            try:
+                self.__events.update(topic, await poll())
+            except Exception as e:
+                self.__log.error(f"Cannot poll {topic}. {e}", {'object': self})
+
+    def __subscribe(self, session: Session, request_id: int, request: CallRequest) -> AbstractResponse:
+        topics = self.__events.subscribe(session, request_id, request.parameter('topics', []))
+
+        self.__debug(f"Subscribed to {', '.join(topics)}")
+
+        return ResponseSuccess(topics)
+
+    def __ping(self, session: Session, request: CallRequest) -> AbstractResponse:
+        capabilities = self.__rcl.capabilities(request)
+        parameters = request.parameters() or {}
+
+        # Plain ping (health check of old client) keeps capabilities negotiated on connection
+        if 'compression' in parameters:
+            session.codecs = capabilities['compression']
+
+        if 'encodings' in parameters:
+            session.binary = RCL.binary(capabilities)
+
+        return ResponseSuccess(capabilities)
+
+    async def __call(self, session: Session, request_id: int, request: CallRequest):
+        try:
+            request = session.assembler.resolve(request)
+
+            response = await self.__dispatcher.dispatch(request)
+
+            await self.__respond(session, request_id, response, request.command())
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            self.__log.error(f"Cannot respond to call '{request.command()}'. {e}", {'object': self})
+
+            # Response is written only when it is encoded, so the error can follow. Client would wait forever otherwise
+            try:
+                await self.__respond(session, request_id, ResponseInternalError(f"Call '{request.command()}' failed"))
+            except Exception:
+                pass
+
+    async def __start_call(self, session: Session, request_id: int, request: CallRequest):
+        if request.command() == self.PING_COMMAND:
+            await self.__respond(session, request_id, self.__ping(session, request))
+            return
+
+        if request.command() == self.SUBSCRIBE_COMMAND:
+            await self.__respond(session, request_id, self.__subscribe(session, request_id, request))
+            self.__events.replay(session)
+            return
+
+        # Wait for a free place in calls queue before reading next messages
+        await self.__calls.acquire()
+
+        session.tasks.add(task := asyncio.create_task(self.__call(session, request_id, request)))
+        task.add_done_callback(session.tasks.discard)
+        # Task cancelled before it starts does not run its code, the place is freed when task is done anyway
+        task.add_done_callback(lambda _: self.__calls.release())
+
+    async def __receive(self, session: Session, message: bytes):
+        request_id = RCLProtocol.get_request_id(message)
+
+        if not (request := self.__rcl.parse_request(message)):
+            await self.__respond(session, request_id, ResponseInternalError("Cannot parse request"))
+            return
+
+        if isinstance(request, StreamRequest):
+            if not session.assembler.feed(request):
+                return
+
+            if (call := session.pending.get(request_id)) is None:
+                raise Exception(f"Stream of unknown call {request_id}")
+
+            call[1] -= 1
+
+            if call[1] == 0:
+                await self.__start_call(session, request_id, session.pending.pop(request_id)[0])
+
+            return
+
+        if streams := session.assembler.expect(request):
+            session.pending[request_id] = [request, streams]
+            return
+
+        await self.__start_call(session, request_id, request)
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+
+        if self.__connections.locked():
+            self.__debug(f"Connections limit reached, {peer} is waiting")
+
+        async with self.__connections:
+            self.__debug(f"Connection {peer} opened")
+
+            writer.get_extra_info('socket').setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+            session = Session(writer)
+
+            try:
+                while (message := await self.__read_message(reader)) is not None:
+                    await self.__receive(session, message)
+
+                # Client can close its side after the last call, responses are still sent
+                await asyncio.gather(*session.tasks, return_exceptions=True)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                self.__log.error(f"Connection {peer} closed. {e}", {'object': self})
+            finally:
+                for task in session.tasks:
+                    task.cancel()
+
+                self.__events.unsubscribe(session)
+                session.assembler.abort()
+                writer.close()
+
+                self.__debug(f"Connection {peer} closed")
+
+    async def start(self, address: Optional[str] = None, port: Optional[int] = None) -> asyncio.AbstractServer:
+        """
+        Start listening on running loop. Returns asyncio server, its sockets contain the real port if `port` is 0.
+        """
+        self.__connections = asyncio.Semaphore(int(self.__config['max_incoming_connections']))
+        self.__calls = asyncio.Semaphore(int(self.__config['max_pending_calls']))
+
+        self.__server = await asyncio.start_server(
+            self.__serve,
+            address or self.__config['address'],
+            int(self.__config['port'] if port is None else port),
+            limit=int(self.__config['max_bytes_receive']),
+            reuse_address=bool(self.__config['reuse_socket']),
+        )
+
+        for sock in self.__server.sockets:
+            self.__log.info(f"RCL server listens on {sock.getsockname()}")
+
+        events = self.__config['events']
+
+        self.__watchers = [
+            asyncio.create_task(
+                self.__watch(EventHub.TOPIC_PRINTERS, float(events['printers_interval']), self.__dispatcher.printers)
+            ),
+            asyncio.create_task(
+                self.__watch(EventHub.TOPIC_JOBS, float(events['jobs_interval']), self.__dispatcher.jobs)
+            ),
+        ]
+
+        return self.__server
+
+    async def serve(self, address: Optional[str] = None, port: Optional[int] = None):
+        server = await self.start(address, port)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for watcher in self.__watchers:
+                watcher.cancel()
+
+            self.__dispatcher.shutdown()
+
+    def run(self, address: Optional[str] = None, port: Optional[int] = None):
+        """
+        Serve until interrupted.
+        """
+        try:
+            asyncio.run(self.serve(address, port))
+        except KeyboardInterrupt:
+            self.__log.info("RCL server stopped")
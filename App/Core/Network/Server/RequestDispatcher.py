@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, Tuple, Any
+
+from App.Core import Config, MimeTypeConfig, Platform
+from App.Core.Cache import CacheManager
+from App.Core.Console import Output
+from App.Core.Logger import Log
+from App.Core.Network.Protocol import CallRequest
+from App.Core.Network.Protocol.Responses import (
+    AbstractResponse,
+    ResponseSuccess,
+    ResponseInternalError,
+    ResponseNotModified,
+    ResponseNotFound,
+    ResponseBlobNotFound,
+)
+from App.Core.Network.Protocol.Streams import FileStream
+from App.Services import PrinterService
+from App.Subprocesses import PrintingSubprocess, ScanImage, LpstatSubprocess
+
+from .BlobStore import BlobStore
+
+Handler = Callable[[CallRequest], AbstractResponse]
+
+
+class RequestDispatcher:
+    """
+    Runs calls of RCL server by services of print host.
+
+    Handlers are blocking (`lp`, `scanimage`, `lpstat` subprocesses), so they run on a bounded pool of worker threads
+    and the event loop of server stays free for other connections. Scanning is serialized: scanner writes every image
+    into the same tmp file.
+
+    Printed files are kept in `BlobStore`. Client sends `file-hash` with the file, and next time only `file-hash`
+    if 'blobs exists' call confirms the server holds the file. Call with hash of evicted file gets 'blob_not_found'
+    error, client uploads the file then.
+
+    Printers and devices lists are versioned by hash of the list. Client sends `version` of the list it holds, and
+    gets 'not_modified' message instead of the list if it is the same.
+
+    Printed jobs are tracked until completed for 'jobs' events (see `jobs`).
+    """
+
+    CACHE_SCAN_DEVICES = "scan_devices"
+
+    # Length of list version (hex digits of SHA-256)
+    VERSION_LENGTH = 16
+
+    # Completed jobs kept in jobs states, the oldest ones are dropped
+    MAX_COMPLETED_JOBS = 64
+
+    ERROR_BLOB_NOT_FOUND = "File {} not found on server"
+
+    def __init__(
+        self,
+        log: Log,
+        config: Config,
+        cache: CacheManager,
+        output: Output,
+        mime: MimeTypeConfig,
+        platform: Platform,
+        blobs: BlobStore
+    ):
+        self.__log = log
+        self.__config = config
+        self.__cache = cache
+        self.__output = output
+        self.__mime = mime
+        self.__platform = platform
+        self.__blobs = blobs
+
+        self.__executor = ThreadPoolExecutor(int(config.get('server.workers')), thread_name_prefix='rcl-worker')
+        self.__scan_lock = Lock()
+        self.__versions: Dict[str, Tuple[Any, str]] = {}
+        self.__versions_lock = Lock()
+        self.__jobs: Dict[str, dict] = {}
+        self.__jobs_lock = Lock()
+
+        self.__handlers: Dict[Tuple[str, ...], Handler] = {
+            ('print',): self.__print,
+            ('blobs', 'exists'): self.__blobs_exists,
+            ('scan',): self.__scan,
+            ('scan', 'devices'): self.__scan_devices,
+            ('scan', 'queue'): self.__scan_queue,
+            (PrinterService.PRINTERS_COMMAND, PrinterService.PRINTERS_SUBCOMMAND_LIST): self.__printers_list,
+            (PrinterService.PRINTERS_COMMAND, PrinterService.PRINTERS_SUBCOMMAND_USE_CACHE): self.__printers_use_cache,
+        }
+
+    @staticmethod
+    def __result(ok: bool, data) -> AbstractResponse:
+        return ResponseSuccess(data) if ok else ResponseInternalError(data)
+
+    def __versioned(self, name: str, data, request: CallRequest) -> AbstractResponse:
+        """
+        Response with list `name` and its version, or 'not_modified' if client holds this version.
+        """
+        with self.__versions_lock:
+            # List is hashed only when changed, cached list is the same most of the time
+            if (last := self.__versions.get(name)) and last[0] == data:
+                version = last[1]
+            else:
+                digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+                version = digest.hexdigest()[:self.VERSION_LENGTH]
+                self.__versions[name] = (data, version)
+
+        if request.parameter('version', None) == version:
+            return ResponseNotModified(version)
+
+        return ResponseSuccess(data, version)
+
+    def __printer_service(self) -> PrinterService:
+        return PrinterService(self.__cache, self.__log, self.__config, self.__output)
+
+    def __store_blob(self, digest: str, file) -> None:
+        if isinstance(file, FileStream):
+            self.__blobs.put(digest, file.path())
+            return
+
+        fd, path = tempfile.mkstemp(prefix='rcl_blob_')
+
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(file)
+
+            self.__blobs.put(digest, path)
+        finally:
+            os.remove(path)
+
+    def __print(self, request: CallRequest) -> AbstractResponse:
+        parameters = dict(request.parameters() or {})
+
+        digest = parameters.pop('file-hash', None)
+
+        if parameters.get('file') is not None:
+            if digest:
+                self.__store_blob(digest, parameters['file'])
+        elif not digest:
+            return ResponseInternalError("File is missing")
+        elif path := self.__blobs.checkout(digest):
+            parameters['file'] = FileStream(path)
+        else:
+            return ResponseBlobNotFound(self.ERROR_BLOB_NOT_FOUND.format(digest))
+
+        subprocess = PrintingSubprocess(self.__log, self.__config, self.__mime, self.__platform)
+
+        ok, message = subprocess.print(parameters)
+
+        if ok and message:
+            with self.__jobs_lock:
+                self.__jobs[message] = {
+                    'job': message,
+                    'device': parameters.get('device'),
+                    'state': LpstatSubprocess.JOB_STATE_PENDING,
+                }
+
+        return self.__result(ok, message)
+
+    def __blobs_exists(self, request: CallRequest) -> AbstractResponse:
+        return ResponseSuccess(self.__blobs.has(request.parameter('hash', '')))
+
+    def __scan(self, request: CallRequest) -> AbstractResponse:
+        with self.__scan_lock:
+            return self.__result(*ScanImage(self.__log, self.__config).scan(dict(request.parameters() or {})))
+
+    def __scan_devices(self, request: CallRequest) -> AbstractResponse:
+        if request.parameter('update', False) or not self.__cache.has(self.CACHE_SCAN_DEVICES):
+            with self.__scan_lock:
+                self.__cache.set(self.CACHE_SCAN_DEVICES, ScanImage(self.__log, self.__config).device_list())
+
+        return self.__versioned(self.CACHE_SCAN_DEVICES, self.__cache.get(self.CACHE_SCAN_DEVICES), request)
+
+    @staticmethod
+    def __scan_queue(_: CallRequest) -> AbstractResponse:
+        # Scans are not queued on server, every call waits for its image
+        return ResponseSuccess([])
+
+    def __printers_list(self, request: CallRequest) -> AbstractResponse:
+        printers = self.__printer_service().get_printers(bool(request.parameter('update-cache', False)))
+
+        return self.__versioned(PrinterService.CACHE_PRINTER_DATA, printers, request)
+
+    def __printers_use_cache(self, _: CallRequest) -> AbstractResponse:
+        return ResponseSuccess(bool(self.__config.get('printing.use_cached_devices')))
+
+    def __printers(self) -> Dict[str, dict]:
+        service = self.__printer_service()
+
+        # Printers state is polled for all subscribed clients, the cache of 'printers list' is refreshed too
+        if not self.__config.get('printing.debug') and not service.update_printers_cache():
+            raise Exception("Cannot get printers")
+
+        return {x[PrinterService.PRINTER_PARAMETER_NAME]: x for x in service.get_printers()}
+
+    def __jobs_states(self) -> Dict[str, dict]:
+        with self.__jobs_lock:
+            if not self.__jobs:
+                return {}
+
+        ok, active = LpstatSubprocess(self.__log, self.__config).get_jobs()
+
+        with self.__jobs_lock:
+            for job, item in self.__jobs.items() if ok else []:
+                item['state'] = active.get(job, LpstatSubprocess.JOB_STATE_COMPLETED)
+
+            completed = [x for x, item in self.__jobs.items() if item['state'] == LpstatSubprocess.JOB_STATE_COMPLETED]
+
+            for job in completed[:max(0, len(completed) - self.MAX_COMPLETED_JOBS)]:
+                del self.__jobs[job]
+
+            return {job: dict(item) for job, item in self.__jobs.items()}
+
+    async def printers(self) -> Dict[str, dict]:
+        """
+        Printers by names, read from CUPS on worker thread.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.__printers)
+
+    async def jobs(self) -> Dict[str, dict]:
+        """
+        Printed jobs by ids with their states: 'pending', 'printing' or 'completed' (left CUPS queue).
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.__jobs_states)
+
+    def __run(self, handler: Handler, request: CallRequest) -> AbstractResponse:
+        try:
+            return handler(request)
+        except Exception as e:
+            self.__log.error(f"Call '{request.command()}' failed. {e}", {"object": self})
+
+            return ResponseInternalError(f"Call '{request.command()}' failed")
+
+    async def dispatch(self, request: CallRequest) -> AbstractResponse:
+        """
+        Run call handler on worker thread.
+        """
+        key = (request.command(), *(request.subcommands() or []))
+
+        if not (handler := self.__handlers.get(key)):
+            return ResponseNotFound(f"Command '{' '.join(key)}' not found")
+
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.__run, handler, request)
+
+    def shutdown(self):
+        self.__executor.shutdown(wait=False, cancel_futures=True)
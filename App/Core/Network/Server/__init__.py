@@ -0,0 +1,9 @@
+from .BlobStore import BlobStore
+from .RequestDispatcher import RequestDispatcher
+from .RCLServer import RCLServer
+
+__all__ = [
+    'BlobStore',
+    'RequestDispatcher',
+    'RCLServer',
+]
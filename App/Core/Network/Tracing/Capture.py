@@ -0,0 +1,191 @@
+import os
+import struct
+import time
+from threading import Lock
+from typing import Dict, Optional, Iterator, Tuple, List, BinaryIO, Union, Iterable
+
+from App.Core import Config
+from App.Core.Network.Protocol import RCL, RCLProtocol
+from App.Core.Network.Protocol.BufferWriter import Buffer
+from App.Core.Network.Protocol.Requests import AbstractRequest
+
+# (kind, process id, call id, time, latency, offset of frame in file, frame length)
+Record = Tuple[int, int, int, float, float, int, int]
+
+
+class Capture:
+    """
+    Opt-in log of client traffic (`client.capture`) for `replay` command.
+
+    Log is a binary file: `MAGIC`, then records of `RECORD` struct, each followed by its frame. Frames are RCL
+    messages as they are sent and received, so a capture is replayed by any server speaking the same framing.
+    Request messages are captured uncompressed, they are valid for servers without compression too.
+
+    Calls are identified by process id and call id, several processes can append to one file. Time is UNIX time of
+    sending request and receiving response, latency is seconds from sending to response or error. Failed calls have
+    error message instead of response frame.
+    """
+
+    MAGIC = b"RCLCAP\x01"
+
+    # kind, process id, call id, time, latency, frame length
+    RECORD = struct.Struct('>BIIddI')
+
+    KIND_REQUEST = 1
+    KIND_RESPONSE = 2
+    KIND_ERROR = 3
+
+    def __init__(self, config: Config, rcl: RCL):
+        conf = config.get('client.capture')
+
+        self.__enabled = bool(conf['enabled'])
+        self.__path = conf['path']
+        self.__rcl = rcl
+
+        self.__pid = os.getpid()
+        self.__calls = 0
+        self.__lock = Lock()
+
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def enable(self, enabled: bool = True, path: Optional[str] = None) -> None:
+        self.__enabled = enabled
+
+        if path is not None:
+            self.__path = path
+
+    def path(self) -> str:
+        return self.__path
+
+    def request(self, request: AbstractRequest) -> int:
+        """
+        Write request messages of call. Returns call id for `response` and `error`.
+        """
+        with self.__lock:
+            self.__calls += 1
+            call_id = self.__calls
+
+        at = time.time()
+
+        for message in self.__rcl.create_request_messages(request):
+            self.__write(self.KIND_REQUEST, call_id, at, 0.0, message)
+
+        return call_id
+
+    def response(self, call_id: int, data: bytes, latency: float) -> None:
+        self.__write(self.KIND_RESPONSE, call_id, time.time(), latency, [data])
+
+    def error(self, call_id: int, message: Optional[str], latency: float) -> None:
+        self.__write(self.KIND_ERROR, call_id, time.time(), latency, [(message or '').encode('utf-8')])
+
+    def __write(self, kind: int, call_id: int, at: float, latency: float, buffers: List[Buffer]):
+        if not self.__enabled:
+            return
+
+        length = sum(len(x) for x in buffers)
+
+        with self.__lock:
+            try:
+                if directory := os.path.dirname(self.__path):
+                    os.makedirs(directory, exist_ok=True)
+
+                with open(self.__path, 'ab') as file:
+                    if not file.tell():
+                        file.write(self.MAGIC)
+
+                    file.write(self.RECORD.pack(kind, self.__pid, call_id, at, latency, length))
+
+                    for buffer in buffers:
+                        file.write(buffer)
+            except OSError:
+                # Capture must not break calls
+                self.__enabled = False
+
+    @staticmethod
+    def records(file: BinaryIO) -> Iterator[Record]:
+        """
+        Records of capture file without frames, frames are read by `frame`. Truncated record at the end (process
+        killed while writing) is skipped.
+        """
+        if file.read(len(Capture.MAGIC)) != Capture.MAGIC:
+            raise Exception(f"File {file.name} is not RCL capture")
+
+        size = os.fstat(file.fileno()).st_size
+        position = file.tell()
+
+        # Position is kept, frames can be read between records
+        while position + Capture.RECORD.size <= size:
+            file.seek(position)
+            kind, pid, call_id, at, latency, length = Capture.RECORD.unpack(file.read(Capture.RECORD.size))
+            offset = position + Capture.RECORD.size
+
+            if offset + length > size:
+                return
+
+            position = offset + length
+
+            yield kind, pid, call_id, at, latency, offset, length
+
+    @staticmethod
+    def frame(file: BinaryIO, record: Record, limit: Optional[int] = None) -> bytes:
+        """
+        Frame of record, its first `limit` bytes if limit is set.
+        """
+        file.seek(record[5])
+
+        return file.read(record[6] if limit is None else min(limit, record[6]))
+
+    @staticmethod
+    def calls(path: str) -> List[dict]:
+        """
+        Calls of capture file in order of sending: request frames, recorded latency and result.
+        """
+        calls: Dict[Tuple[int, int], dict] = {}
+
+        with open(path, 'rb') as file:
+            for record in Capture.records(file):
+                kind, pid, call_id, at, latency, offset, length = record
+
+                call = calls.setdefault((pid, call_id), {
+                    'time': at,
+                    'requests': [],
+                    'latency': None,
+                    'ok': None,
+                    'bytes_out': 0,
+                    'bytes_in': 0,
+                })
+
+                if kind == Capture.KIND_REQUEST:
+                    call['requests'].append(record)
+                    call['bytes_out'] += length
+                    continue
+
+                call['latency'] = latency
+                call['ok'] = kind == Capture.KIND_RESPONSE and Capture.succeeded(
+                    Capture.frame(file, record, RCLProtocol.RCL_HEADERS_LENGTH)
+                )
+                call['bytes_in'] += length if kind == Capture.KIND_RESPONSE else 0
+
+        return sorted((x for x in calls.values() if x['requests']), key=lambda x: x['time'])
+
+    @staticmethod
+    def succeeded(message: Union[bytes, memoryview]) -> bool:
+        """
+        Response message is not an error.
+        """
+        if len(message) < RCLProtocol.RCL_HEADERS_LENGTH:
+            return False
+
+        _type = message[RCLProtocol.RCL_HEADER_INDEX_MESSAGE_TYPE] & ~RCLProtocol.RCL_MESSAGE_COMPRESSED_FLAG
+
+        return _type < RCLProtocol.RCL_MESSAGE_GROUP_CLIENT_ERRORS
+
+    @staticmethod
+    def messages(path: str, requests: Iterable[Record]) -> Iterator[bytes]:
+        """
+        Request frames of call read from capture file one by one.
+        """
+        with open(path, 'rb') as file:
+            for record in requests:
+                yield Capture.frame(file, record)
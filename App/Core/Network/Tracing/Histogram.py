@@ -0,0 +1,78 @@
+import math
+from typing import Dict
+
+
+class Histogram:
+    """
+    Log-scale histogram of positive values.
+
+    Values are counted in buckets growing by `GROWTH` (5% relative error of percentiles), so memory does not depend
+    on the number of values. Min, max and sum are exact.
+    """
+
+    GROWTH = 1.05
+
+    # Values below are counted in the first bucket (1 us for seconds)
+    MIN_VALUE = 1e-6
+
+    def __init__(self):
+        self.__buckets: Dict[int, int] = {}
+        self.__count = 0
+        self.__sum = 0.0
+        self.__min = math.inf
+        self.__max = 0.0
+
+    @staticmethod
+    def __bucket(value: float) -> int:
+        return max(0, math.ceil(math.log(max(value, Histogram.MIN_VALUE) / Histogram.MIN_VALUE, Histogram.GROWTH)))
+
+    def add(self, value: float) -> None:
+        bucket = self.__bucket(value)
+
+        self.__buckets[bucket] = self.__buckets.get(bucket, 0) + 1
+        self.__count += 1
+        self.__sum += value
+        self.__min = min(self.__min, value)
+        self.__max = max(self.__max, value)
+
+    def merge(self, other: 'Histogram') -> None:
+        for bucket, count in other.__buckets.items():
+            self.__buckets[bucket] = self.__buckets.get(bucket, 0) + count
+
+        self.__count += other.__count
+        self.__sum += other.__sum
+        self.__min = min(self.__min, other.__min)
+        self.__max = max(self.__max, other.__max)
+
+    def count(self) -> int:
+        return self.__count
+
+    def sum(self) -> float:
+        return self.__sum
+
+    def mean(self) -> float:
+        return self.__sum / self.__count if self.__count else 0.0
+
+    def min(self) -> float:
+        return self.__min if self.__count else 0.0
+
+    def max(self) -> float:
+        return self.__max
+
+    def percentile(self, percent: float) -> float:
+        """
+        Upper bound of the bucket holding `percent` of values, limited by exact min and max.
+        """
+        if not self.__count:
+            return 0.0
+
+        rank = math.ceil(self.__count * percent / 100)
+        seen = 0
+
+        for bucket in sorted(self.__buckets):
+            seen += self.__buckets[bucket]
+
+            if seen >= rank:
+                return min(max(self.MIN_VALUE * self.GROWTH ** bucket, self.__min), self.__max)
+
+        return self.__max
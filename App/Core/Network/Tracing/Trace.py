@@ -0,0 +1,75 @@
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+
+class Trace:
+    """
+    Timings of one call. Phases of all attempts are summed:
+
+    - connect: opening connection or taking it from the pool
+    - encode: creating messages of call
+    - upload: sending messages
+    - wait: from the last sent message to the response header (server processing)
+    - receive: from the response header to the whole response
+    - decode: parsing response
+    """
+
+    PHASES = ('connect', 'encode', 'upload', 'wait', 'receive', 'decode')
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started_at = time.time()
+        self.attempts = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.phases: Dict[str, float] = {}
+        self.total = 0.0
+        self.ok = False
+
+        self.__start = time.perf_counter()
+        self.__sent_at = self.__start
+        self.__lock = Lock()
+
+    @staticmethod
+    def now() -> float:
+        return time.perf_counter()
+
+    def add(self, phase: str, since: float, until: Optional[float] = None) -> float:
+        """
+        Add time from `since` to `until` (now by default) to phase. Returns `until`.
+        """
+        until = time.perf_counter() if until is None else until
+
+        with self.__lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + until - since
+
+        return until
+
+    def sent(self, size: int) -> None:
+        with self.__lock:
+            self.bytes_out += size
+            self.__sent_at = time.perf_counter()
+
+    def sent_at(self) -> float:
+        return self.__sent_at
+
+    def received(self, size: int) -> None:
+        with self.__lock:
+            self.bytes_in += size
+
+    def finish(self, ok: bool) -> None:
+        self.ok = ok
+        self.total = time.perf_counter() - self.__start
+
+    def to_dict(self) -> dict:
+        return {
+            'time': self.started_at,
+            'command': self.command,
+            'ok': self.ok,
+            'attempts': self.attempts,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'total': self.total,
+            'phases': dict(self.phases),
+        }
@@ -0,0 +1,113 @@
+import json
+import os
+from threading import Lock
+from typing import Dict, Optional, Iterable
+
+from App.Core import Config
+from App.Core.Network.Tracing.Histogram import Histogram
+from App.Core.Network.Tracing.Trace import Trace
+
+Stats = Dict[str, dict]
+
+
+class Tracer:
+    """
+    Opt-in timings of client calls by phases (`client.tracing`).
+
+    Finished traces are aggregated into histograms per command and, if `dump` is enabled, appended as JSON lines to
+    `path`, so traces of UI and console processes can be reported later by `tracing report` command.
+    """
+
+    METRICS = ('total', *Trace.PHASES, 'bytes_out', 'bytes_in')
+
+    def __init__(self, config: Config):
+        conf = config.get('client.tracing')
+
+        self.__enabled = bool(conf['enabled'])
+        self.__dump = bool(conf['dump'])
+        self.__path = conf['path']
+
+        self.__stats: Stats = {}
+        self.__lock = Lock()
+
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def enable(self, enabled: bool = True, dump: Optional[bool] = None) -> None:
+        self.__enabled = enabled
+
+        if dump is not None:
+            self.__dump = dump
+
+    def path(self) -> str:
+        return self.__path
+
+    def start(self, command: str) -> Optional[Trace]:
+        return Trace(command) if self.__enabled else None
+
+    def finish(self, trace: Trace, ok: bool) -> None:
+        trace.finish(ok)
+
+        record = trace.to_dict()
+
+        with self.__lock:
+            self.add(self.__stats, record)
+
+            if self.__dump:
+                self.__write(record)
+
+    def __write(self, record: dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+
+            with open(self.__path, 'a') as file:
+                file.write(json.dumps(record) + '\n')
+        except OSError:
+            # Tracing must not break calls
+            self.__dump = False
+
+    def stats(self) -> Stats:
+        with self.__lock:
+            return dict(self.__stats)
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__stats = {}
+
+    @staticmethod
+    def add(stats: Stats, record: dict) -> None:
+        """
+        Add trace record to stats: calls and errors count and histograms of metrics per command.
+        """
+        command = stats.setdefault(record['command'], {
+            'calls': 0,
+            'errors': 0,
+            'metrics': {name: Histogram() for name in Tracer.METRICS},
+        })
+
+        command['calls'] += 1
+        command['errors'] += 0 if record['ok'] else 1
+
+        metrics = command['metrics']
+        metrics['total'].add(record['total'])
+        metrics['bytes_out'].add(record['bytes_out'])
+        metrics['bytes_in'].add(record['bytes_in'])
+
+        for phase, seconds in record['phases'].items():
+            if phase in metrics:
+                metrics[phase].add(seconds)
+
+    @staticmethod
+    def load(lines: Iterable[str]) -> Stats:
+        """
+        Aggregate dumped JSON lines. Broken lines (process killed while writing) are skipped.
+        """
+        stats: Stats = {}
+
+        for line in lines:
+            try:
+                Tracer.add(stats, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+        return stats
@@ -0,0 +1,11 @@
+from .Capture import Capture
+from .Histogram import Histogram
+from .Trace import Trace
+from .Tracer import Tracer
+
+__all__ = [
+    'Capture',
+    'Histogram',
+    'Trace',
+    'Tracer',
+]
@@ -1,6 +1,7 @@
 from typing import Optional
 
 from App.Core.Abstract import AbstractDTO
+from App.Core.Network.Protocol.Streams import FileStream
 from App.Core.Utils import DocumentMediaType, DocumentOrder, MimeType
 from App.Core.Utils.PaperTray import PaperTray
 from App.Core.Utils.Ui.PrintingPagePolicy import PrintingPagePolicy
@@ -17,13 +18,6 @@ class PrintingDocumentDTO(AbstractDTO):
     mirror: bool = False
     landscape: bool = False
     transparency: bool = False
-    file: bytes = b""
+    file: Optional[FileStream] = None
     mime_type: Optional[MimeType] = None
     send_converted: bool = False
-
-    def as_dict(self) -> dict:
-        res = super(PrintingDocumentDTO, self).as_dict().copy()
-
-        res['file'] = b"..."
-
-        return res
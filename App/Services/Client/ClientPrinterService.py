@@ -1,18 +1,30 @@
-from typing import Optional, List
+from threading import Event
+from typing import Optional, List, Tuple
 
-from App.Core import Filesystem
 from App.Core.Network import NetworkManager
-from App.Core.Network.Client import ClientConfig, ResponseDataPromise
-from App.Core.Network.Protocol import CallRequest
+from App.Core.Network.Client import ClientConfig, ResponseDataPromise, Subscription, AsyncBridge
+from App.Core.Network.Protocol import CallRequest, RCLProtocol
+from App.Core.Network.Protocol.Streams import FileStream
 from App.Core.Network.Protocol.Responses.AbstractResponse import AbstractResponse
 from App.Core.Utils import MimeType, DocumentOrder, DocumentPagesUtil
 from App.Core.Utils.Ui.PrintingPagePolicy import PrintingPagePolicy
 from App.DTO.Client import PrintingDocumentDTO
 from App.Services import PrinterService
-from App.helpers import cache, logger, config, console, network_manager
+from App.Subprocesses import LpstatSubprocess
+from App.helpers import app, cache, logger, config, console, network_manager, in_thread
 
 
 class ClientPrinterService(PrinterService):
+    # Separates printer name and server in device keys of merged printers list
+    DEVICE_SERVER_SEPARATOR = '@'
+
+    # States after which job is not followed. Server reports no failures, failed job leaves CUPS queue as completed
+    JOB_FINAL_STATES = [LpstatSubprocess.JOB_STATE_COMPLETED]
+
+    # Seconds to wait for job state after subscription is connected again. Server pushes states it knows at once,
+    # job without state is unknown to server (restarted)
+    JOB_RECONNECT_GRACE = 5
+
     def __init__(self):
         super(ClientPrinterService, self).__init__(cache(), logger(), config(), console())
 
@@ -24,6 +36,62 @@ class ClientPrinterService(PrinterService):
     def on_error_print(self, device: str, path: str, message: Optional[str]):
         self._logger.error(f"Cannot send to printing ({device}). {message or ''}", {'object': self})
 
+    def on_job_status(self, device: str, path: str, job: str, state: str):
+        self._logger.info(f"Printing job {job} ({device}) is {state}", {'object': self})
+
+    def __watch_job(self, device: str, path: str, job: str):
+        """
+        Report states of printing job pushed by its server until the job is completed. Job is not followed after
+        `client.subscriptions.job_timeout` seconds, when server forgets it or does not know it after reconnecting.
+        """
+        _, client = self.split_device(device, ClientConfig.client_ui())
+        server = client.server_name()
+        finished = Event()
+        listeners = []
+        # Number of job states received
+        received = [0]
+
+        def finish():
+            finished.set()
+
+            # Event can come before the listener is returned
+            for remove in listeners:
+                remove()
+
+        def on_job(item: dict, from_server: str):
+            if from_server != server or finished.is_set():
+                return
+
+            # Server dropped the job from its states
+            if item.get('removed') and item.get('key') == job:
+                finish()
+                return
+
+            if item.get('job') != job:
+                return
+
+            received[0] += 1
+
+            if item['state'] in self.JOB_FINAL_STATES:
+                finish()
+
+            self.on_job_status(device, path, job, item['state'])
+
+        def on_reconnect(from_server: str):
+            if from_server != server or finished.is_set():
+                return
+
+            count = received[0]
+
+            AsyncBridge.call_later(self.JOB_RECONNECT_GRACE, lambda: received[0] == count and finish())
+
+        listeners.append(self._network_manager.listen(client, Subscription.TOPIC_JOBS, on_job, on_reconnect))
+
+        AsyncBridge.call_later(float(self._config.get('client.subscriptions')['job_timeout']), finish)
+
+        if finished.is_set():
+            listeners[0]()
+
     def send_to_print(
         self,
         printing_doc: PrintingDocumentDTO,
@@ -36,12 +104,17 @@ class ClientPrinterService(PrinterService):
     ) -> ResponseDataPromise:
         if printing_doc.send_converted and converted_path:
             printing_doc.mime_type = MimeType.PDF
-            printing_doc.file = Filesystem.read_file(converted_path, True)
+            printing_doc.file = FileStream(converted_path)
         else:
-            printing_doc.file = Filesystem.read_file(path, True)
+            printing_doc.file = FileStream(path)
 
         def success(response: AbstractResponse):
             self.on_success_print(printing_doc.device, path, response)
+
+            # Server returns id of printing job, the job is printed later
+            if isinstance(job := response.data(), str) and job:
+                self.__watch_job(printing_doc.device, path, job)
+
             on_success()
 
         def error(msg: Optional[str]):
@@ -69,8 +142,10 @@ class ClientPrinterService(PrinterService):
         if not doc.mime_type:
             raise Exception("Cannot send document to printer without a mime type")
 
+        device, client = self.split_device(doc.device, client)
+
         parameters = {
-            "device": doc.device,
+            "device": device,
             "copies": doc.copies,
             "paper-size": doc.paper_size.name,
             "file": doc.file
@@ -98,7 +173,61 @@ class ClientPrinterService(PrinterService):
         if mime_type := doc.mime_type:
             parameters.update({"mime-type": mime_type.name})
 
-        return manager.request(CallRequest("print", parameters=parameters), client)
+        return self.__request_print(manager, CallRequest("print", parameters=parameters), client)
+
+    def __request_print(self, manager: NetworkManager, request: CallRequest, client: ClientConfig) -> ResponseDataPromise:
+        """
+        Send file by content hash if server already holds it ('blobs exists' call), otherwise upload it. Cancelling
+        the promise cancels the call in flight.
+        """
+        options = self._config.get('client.deduplicate_uploads')
+        file = request.parameters()['file']
+
+        if not options['enabled'] or not isinstance(file, FileStream) or file.size() < options['min_size']:
+            return manager.request(request, client)
+
+        promise = ResponseDataPromise(app().get('rcl'))
+        current: List[ResponseDataPromise] = []
+
+        def call(step: CallRequest) -> ResponseDataPromise:
+            # Cancelled print sends no more calls, its promise is the result
+            if promise.cancelled():
+                return promise
+
+            current[:] = [result := manager.request(step, client)]
+
+            # Promise can be cancelled while the call is being sent
+            if promise.cancelled():
+                result.cancel()
+
+            return result
+
+        def send():
+            request.set_parameter('file-hash', digest := file.digest())
+
+            ok, response = call(CallRequest('blobs', ['exists'], {'hash': digest})).wait_result()
+
+            if ok and response.data():
+                self._logger.debug(f"File {file.path()} is held by server, upload skipped", {'object': self})
+                request.parameters().pop('file')
+
+            ok, response = (result := call(request)).wait_result()
+
+            # File can be evicted on server after the check
+            if not ok and result.error_type() == RCLProtocol.RCL_MESSAGE_TYPE_BLOB_NOT_FOUND:
+                request.set_parameter('file', file)
+                ok, response = (result := call(request)).wait_result()
+
+            if ok:
+                promise.set_result(result.data())
+            else:
+                promise.set_error(response)
+
+        promise.on_cancel(lambda: [x.cancel() for x in list(current)])
+
+        in_thread(send)
+
+        return promise
 
     @staticmethod
     def __resolve_pages_parameters(policy: PrintingPagePolicy, pages: str, max_page: int) -> List[int]:
@@ -113,17 +242,81 @@ class ClientPrinterService(PrinterService):
 
         return []
 
+    @staticmethod
+    def device_key(printer: dict) -> str:
+        """
+        Key of printer to send document to. Printers of merged list are keyed with their server.
+        """
+        if server := printer.get(PrinterService.PRINTER_PARAMETER_SERVER):
+            separator = ClientPrinterService.DEVICE_SERVER_SEPARATOR
+
+            return f"{printer[PrinterService.PRINTER_PARAMETER_NAME]}{separator}{server}"
+
+        return printer[PrinterService.PRINTER_PARAMETER_NAME]
+
+    @staticmethod
+    def device_title(printer: dict) -> str:
+        if server := printer.get(PrinterService.PRINTER_PARAMETER_SERVER):
+            return f"{printer[PrinterService.PRINTER_PARAMETER_DISPLAY_NAME]} ({server})"
+
+        return printer[PrinterService.PRINTER_PARAMETER_DISPLAY_NAME]
+
+    @staticmethod
+    def split_device(key: str, client: ClientConfig) -> Tuple[str, ClientConfig]:
+        """
+        Printer name and config of its server by device key (see `device_key`).
+        """
+        name, separator, server = key.rpartition(ClientPrinterService.DEVICE_SERVER_SEPARATOR)
+
+        if separator:
+            for address, port in client.endpoints():
+                if f"{address}:{port}" == server:
+                    return name, client.for_server(address, port)
+
+        return key, client
+
     @staticmethod
     def get_printers_promise(client: ClientConfig, manager: NetworkManager, update_cache: bool = False) -> ResponseDataPromise:
+        """
+        Printers of all servers of client. Printers of several servers are merged and tagged with their server.
+        """
         parameters = {}
 
         if update_cache:
             parameters.update({"update-cache": update_cache})
 
-        return manager.request(
-            CallRequest(PrinterService.PRINTERS_COMMAND, [PrinterService.PRINTERS_SUBCOMMAND_LIST], parameters),
-            client,
-        )
+        request = CallRequest(PrinterService.PRINTERS_COMMAND, [PrinterService.PRINTERS_SUBCOMMAND_LIST], parameters)
+
+        if len(client.endpoints()) == 1:
+            return manager.request(request, client)
+
+        rcl = app().get('rcl')
+        promise = ResponseDataPromise(rcl)
+
+        def merge():
+            printers, errors = [], []
+
+            for server, result in manager.broadcast(request, client).items():
+                ok, response = result.wait_result()
+
+                if not ok:
+                    errors.append(f"{server}: {response}")
+                    continue
+
+                for printer in response.data() or []:
+                    printers.append({**printer, PrinterService.PRINTER_PARAMETER_SERVER: server})
+
+            if errors:
+                logger().warning(f"Cannot get printers of servers. {'; '.join(errors)}")
+
+            if printers or not errors:
+                promise.set_result(rcl.response_success(printers), True)
+            else:
+                promise.set_error('; '.join(errors))
+
+        in_thread(merge)
+
+        return promise
 
     @staticmethod
     def get_printers_use_cache_promise(client: ClientConfig, manager: NetworkManager):
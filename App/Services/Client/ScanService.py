@@ -141,7 +141,15 @@ class ScanService:
         return os.path.join(ScanService.get_scan_dir(_dir), f"{name}.{_format.name.lower()}")
 
     @staticmethod
-    def save(_dir: Optional[str], content: bytes, name: str, _format: Format) -> Union[ScanError, List[ScanWarning]]:
+    def save(
+        _dir: Optional[str],
+        content: Union[str, bytes],
+        name: str,
+        _format: Format
+    ) -> Union[ScanError, List[ScanWarning]]:
+        """
+        Save scan content. Str content is a path of temporary file of scan, the file is moved.
+        """
         path = ScanService.get_scan_path(_dir, name, _format)
         _dir = ScanService.get_scan_dir(_dir)
 
@@ -154,7 +162,10 @@ class ScanService:
             warnings.append(ScanWarning(WarningCode.CREATE_DIRECTORY, {'path': _dir}))
 
         try:
-            res = Filesystem.write_file(path, content)
+            if isinstance(content, str):
+                res = Filesystem.move(content, path)
+            else:
+                res = Filesystem.write_file(path, content)
             err = ''
         except Exception as err:
             res = False
@@ -2,6 +2,7 @@ from typing import Optional
 
 from App.Core.Network.Protocol.Responses.AbstractResponse import AbstractResponse
 from App.Services.Client.ClientPrinterService import ClientPrinterService
+from App.Subprocesses import LpstatSubprocess
 from App.helpers import notification, lc
 
 
@@ -16,3 +17,9 @@ class UiPrinterService(ClientPrinterService):
 
         notification().error(lc('errors.printing_title'), lc('errors.printing_msg') % path)
 
+    def on_job_status(self, device: str, path: str, job: str, state: str):
+        super(UiPrinterService, self).on_job_status(device, path, job, state)
+
+        if state == LpstatSubprocess.JOB_STATE_COMPLETED:
+            notification().success(lc('success.printed_title'), lc('success.printed_msg') % path)
+
@@ -50,7 +50,7 @@ class UiScanService(ScanService):
         return res
 
     @staticmethod
-    def save(_dir: Optional[str], content: bytes, name: str, _format: Format) -> Optional[tuple]:
+    def save(_dir: Optional[str], content: Union[str, bytes], name: str, _format: Format) -> Optional[tuple]:
         res = ScanService.save(_dir, content, name, _format)
 
         if isinstance(res, ScanError):
@@ -23,6 +23,7 @@ class PrinterService:
     PRINTER_PARAMETER_INDEX = "index"
     PRINTER_PARAMETER_SCOPE = "scope"
     PRINTER_PARAMETER_NAME = "name"
+    PRINTER_PARAMETER_SERVER = "server"
 
     NETWORK_PROTOCOLS = ["lpd", "ipp", "ipps", "dnssd", "http", "https", "smb", "socket"]
     FILTER_PROTOCOLS = ["lpd"]
@@ -93,6 +94,10 @@ class PrinterService:
             self._console.line(indent=self.INDENT, message=f"Device:    {printer[self.PRINTER_PARAMETER_DEVICE]}")
             self._console.line(indent=self.INDENT, message=f"Hidden:    {printer[self.PRINTER_PARAMETER_HIDDEN]}")
             self._console.line(indent=self.INDENT, message=f"Available: {printer[self.PRINTER_PARAMETER_AVAILABLE]}")
+
+            if server := printer.get(self.PRINTER_PARAMETER_SERVER):
+                self._console.line(indent=self.INDENT, message=f"Server:    {server}")
+
             self._console.endl()
 
     @staticmethod
@@ -1,4 +1,5 @@
 import os
+import shutil
 from typing import Optional
 
 from App.Core import Config, Platform
@@ -27,12 +28,8 @@ class LibreofficePdfConvert(AbstractSubprocess):
             return self.__determinate_linux_bin_path()
 
     def __determinate_linux_bin_path(self) -> Optional[str]:
-        ok, out = self.run(["command", "v", self.LINUX_LIBREOFFICE_COMMAND])
-
-        if not ok:
-            return out
-
-        return None
+        # Called before subprocess is initialized, so binary is searched in PATH directly
+        return shutil.which(self.LINUX_LIBREOFFICE_COMMAND)
 
     def __determinate_windows_bin_path(self) -> Optional[str]:
         if not os.path.exists(self.WINDOWS_LIBREOFFICE_BIN_PATH):
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Tuple, Dict
 import re
 
 from App.Core import Config
@@ -9,6 +9,17 @@ from App.Core.Logger import Log
 class LpstatSubprocess(AbstractSubprocess):
     REGEX_DEVICES = re.compile(r"[^:]+ ([^:]+): ([^\n]+)")
 
+    # Jobs of `lpstat -o`: HP_LaserJet-12  user  1024  Mon 01 Jan 2024 10:00:00
+    REGEX_JOBS = re.compile(r"^(\S+-\d+)\s+\S+\s+\d+\s", re.MULTILINE)
+
+    # Printers of `lpstat -p`: printer HP_LaserJet now printing HP_LaserJet-12.  enabled since ...
+    REGEX_PRINTING_JOBS = re.compile(r"now printing (\S+-\d+)\.")
+
+    JOB_STATE_PENDING = "pending"
+    JOB_STATE_PRINTING = "printing"
+    # Job is not listed anymore
+    JOB_STATE_COMPLETED = "completed"
+
     def __init__(self, log: Log, config: Config):
         super(LpstatSubprocess, self).__init__(log, config, "lpstat")
 
@@ -23,3 +34,23 @@ class LpstatSubprocess(AbstractSubprocess):
             return False, []
 
         return True, self.REGEX_DEVICES.findall(out)
+
+    def get_jobs(self) -> Tuple[bool, Dict[str, str]]:
+        """
+        States of not completed jobs by job ids: 'printing' or 'pending'.
+        """
+        if self._config['debug']:
+            return False, {}
+
+        ok, out = self.run(parameters={"o": True, "p": True})
+
+        if not ok:
+            self._log.error(f"Cannot get list of jobs. {out}", {"object": self})
+            return False, {}
+
+        printing = set(self.REGEX_PRINTING_JOBS.findall(out))
+
+        return True, {
+            job: self.JOB_STATE_PRINTING if job in printing else self.JOB_STATE_PENDING
+            for job in self.REGEX_JOBS.findall(out)
+        }
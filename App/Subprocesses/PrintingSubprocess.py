@@ -1,10 +1,11 @@
-import hashlib
-from datetime import datetime
-from typing import Tuple
+import re
+import uuid
+from typing import Tuple, Optional
 
 from App.Core import Config, MimeTypeConfig, Platform, Filesystem
 from App.Core.Abstract import AbstractSubprocess
 from App.Core.Logger import Log
+from App.Core.Network.Protocol.Streams import FileStream
 from App.Core.Utils import MimeType, DocumentOrder
 from App.Core.Utils.DocumentPagesUtil import DocumentPagesUtil
 from App.Core.Utils.OfficeSuite import OfficeSuite
@@ -14,6 +15,9 @@ from App.Services.MimeConvertor import MimeConvertor
 class PrintingSubprocess(AbstractSubprocess):
     COMMAND = 'lp'
 
+    # Output of `lp`: request id is HP_LaserJet-12 (1 file(s))
+    REGEX_JOB = re.compile(r"request id is (\S+)")
+
     DEVICE_PRINTING_PARAMETER_PRINTER = "d"
     DEVICE_PRINTING_PARAMETER_COPIES = "n"
     DEVICE_PRINTING_PARAMETER_MEDIA = "media"
@@ -92,11 +96,14 @@ class PrintingSubprocess(AbstractSubprocess):
         mime_type = MimeType[parameters[self._DEVICE_PRINTING_PARAMETER_MIME_TYPE]]
 
         content = parameters.get(self._DEVICE_PRINTING_PARAMETER_FILE)
+        streamed = isinstance(content, FileStream)
 
-        name = hashlib.md5(content + hashlib.md5(str(datetime.now()).encode()).digest()).hexdigest()
-        path = Filesystem.create_tmp_path(f"{name}.{MimeType.mime_extension(mime_type)}")
+        # Unique name without hashing the content again
+        path = Filesystem.create_tmp_path(f"{uuid.uuid4().hex}.{MimeType.mime_extension(mime_type)}")
 
-        if not Filesystem.write_file(path, content):
+        if streamed:
+            Filesystem.move(content.path(), path)
+        elif not Filesystem.write_file(path, content):
             return False, "Failed to write file"
 
         if not MimeType.is_server_side_convert_type(mime_type.value):
@@ -120,7 +127,10 @@ class PrintingSubprocess(AbstractSubprocess):
         if order is not None:
             parameters.update({key: DocumentOrder[order].value})
 
-    def print(self, parameters: dict) -> Tuple[bool, str]:
+    def print(self, parameters: dict) -> Tuple[bool, Optional[str]]:
+        """
+        Print file. Returns error message if failed, otherwise id of printing job if `lp` reported it.
+        """
         cli = {}
 
         self.__resolve_media_type(parameters)
@@ -149,10 +159,12 @@ class PrintingSubprocess(AbstractSubprocess):
 
         ok, message = self.run(parameters=cli, options={"additional": [self.create_windows_path_for_linux(res)]})
 
+        # `lp` is not run in debug mode, there is no job
         if self._config['debug']:
-            return True, "Debug mode enabled"
+            return True, None
 
         if not ok:
             self._log.error(message, {"object": self})
+            return False, message
 
-        return ok, message if not ok else None
+        return True, job.group(1) if (job := self.REGEX_JOB.search(message)) else None
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Union
 
 from PySide6.QtWidgets import QWidget, QFileDialog
 
@@ -33,7 +33,7 @@ class ScanTools:
 
         self.__scan_helpers.load_document(device, DocumentMediaType.A4, lambda x: self.open_document_modal(x, Format.TIFF))
 
-    def open_document_modal(self, image: bytes, _format: Format):
+    def open_document_modal(self, image: Union[str, bytes], _format: Format):
         DocumentModal(self.__debug_mode, _format, image, self.parent)
 
     def open_document_modal_debug(self):
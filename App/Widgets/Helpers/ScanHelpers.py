@@ -1,8 +1,10 @@
+import uuid
 from typing import Optional
 
 from PySide6.QtWidgets import QWidget, QSizePolicy
 
-from App.Core.Network.Client import ResponseDataPromise, ClientConfig
+from App.Core import Filesystem
+from App.Core.Network.Client import ResponseDataPromise, ClientConfig, ResponseSink
 from App.Core.Network.Protocol.Responses import AbstractResponse
 from App.Core.Utils import DocumentMediaType
 from App.Services.Client.DeviceService import DeviceService
@@ -81,11 +83,15 @@ class ScanHelpers:
         )
 
     def load_document(self, device: Optional[str], media: DocumentMediaType, on_success: callable):
+        """
+        Scan document to temporary file, `on_success` gets path of the file.
+        """
         self.__create_loading_modal(lc('loading.scanDocument'))
 
         return DeviceService(self.__config).get_document(
             self.__create_success_signal_callback(on_success),
             self.__create_error_signal_callback(),
             media,
-            device
+            device,
+            ResponseSink(Filesystem.create_tmp_path(f"scan_{uuid.uuid4().hex}.tiff"))
         )
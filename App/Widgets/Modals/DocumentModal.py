@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Union
 
 from PySide6.QtWidgets import QWidget, QPushButton
 
@@ -24,7 +24,7 @@ class DocumentModal(AbstractModal):
     FACTOR = DOC_HEIGHT / DOC_WIDTH
     PARAMETERS_WIDTH = 500
 
-    def __init__(self, debug: bool, _format: Format, image: bytes, parent: QWidget = None):
+    def __init__(self, debug: bool, _format: Format, image: Union[str, bytes], parent: QWidget = None):
         super(DocumentModal, self).__init__(parent)
         self.setObjectName("DocumentModal")
         self.setStyleSheet(styles(["documentModal"]))
@@ -32,7 +32,8 @@ class DocumentModal(AbstractModal):
         self.setMinimumSize(self.DOC_WIDTH * 2 + self.PARAMETERS_WIDTH, self.DOC_HEIGHT * 2)
 
         self.__format = _format
-        self.__image_bytes = image
+        # Content or path of scanned temporary file
+        self.__image_content = image
 
         self.__central_layout = UIHelpers.h_layout()
 
@@ -132,7 +133,7 @@ class DocumentModal(AbstractModal):
         name = self.__settings['name']
         _dir = ini('scans.dir')
 
-        err = UiScanService.save(_dir, self.__image_bytes, name, self.__format)
+        err = UiScanService.save(_dir, self.__image_content, name, self.__format)
 
         if err:
             ErrorModal(err[0], err[1], self)
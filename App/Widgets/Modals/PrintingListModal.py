@@ -4,7 +4,7 @@ from PySide6.QtGui import QDragEnterEvent, QDropEvent, QDragLeaveEvent, QCloseEv
 from PySide6.QtWidgets import QWidget, QLabel
 from PySide6.QtCore import QUrl, Qt, Signal
 
-from App.Core.Network.Client import ClientConfig
+from App.Core.Network.Client import ClientConfig, Subscription
 from App.Core.Network.Protocol.Responses.AbstractResponse import AbstractResponse
 from App.Core.Utils import MimeType
 from App.Services import PDFService
@@ -26,6 +26,7 @@ class PrintingListModal(AbstractModal):
     set_visible_errors_widget_signal = Signal(bool)
     set_enabled_file_signal = Signal(bool)
     update_view = Signal()
+    printers_changed_signal = Signal()
 
     def __init__(self, files: List[QUrl], accepted: List[QUrl], parent: QWidget = None):
         super().__init__(parent)
@@ -143,6 +144,14 @@ class PrintingListModal(AbstractModal):
 
         self.__start_loading_devices()
 
+        # Servers push changes of printers, the list is reloaded without polling
+        self.printers_changed_signal.connect(self.__reload_changed_devices)
+        self.__stop_listening_printers = network_manager().listen(
+            ClientConfig.client_ui(),
+            Subscription.TOPIC_PRINTERS,
+            lambda *_: self.printers_changed_signal.emit()
+        )
+
         UIHelpers.set_disabled_parent_recursive(self, "MainWindow", True)
         self.setEnabled(True)
 
@@ -157,6 +166,8 @@ class PrintingListModal(AbstractModal):
         self.__scroll_area.setVisible(enable)
 
     def closeEvent(self, event: QCloseEvent):
+        self.__stop_listening_printers()
+
         UIHelpers.set_disabled_parent_recursive(self, "MainWindow", False)
 
         super(PrintingListModal, self).closeEvent(event)
@@ -186,6 +197,11 @@ class PrintingListModal(AbstractModal):
     def __set_visible_errors_widget(self, enable: bool):
         self.__errors_widget.setVisible(enable)
 
+    def __reload_changed_devices(self):
+        # Changed printers of one event come one by one, the first one reloads the list
+        if not self.__loading_devices_widget.isVisible():
+            self.__start_loading_devices()
+
     def __start_loading_devices(self, update_server_cache: bool = False):
         self.__set_enable_loading_animation(True)
 
@@ -207,7 +223,7 @@ class PrintingListModal(AbstractModal):
             self.__devices_loaded = True
 
             self.__devices = dict(map(
-                lambda x: (x[UiPrinterService.PRINTER_PARAMETER_NAME], x[UiPrinterService.PRINTER_PARAMETER_DISPLAY_NAME]),
+                lambda x: (UiPrinterService.device_key(x), UiPrinterService.device_title(x)),
                 UiPrinterService.filter_hidden_devices(response.data() or [])
             ))
 
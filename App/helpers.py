@@ -18,7 +18,8 @@ from App.Core.Ui.Screens import Screens
 from App.Services.Client.Ui.UiNotificationService import UiNotificationService
 from typing import List, Type
 from App.Core.Network.Protocol.Requests import AbstractRequest
-from App.Core.Network.Client import ResponseDataPromise, ClientConfig
+from App.Core.Network.Client import ResponseDataPromise, ClientConfig, AsyncClient, ResponseSink
+from App.Core.Network.Protocol.Responses import AbstractResponse
 
 
 def app(_type: Application.ApplicationType = None) -> Application:
@@ -108,8 +109,21 @@ def mime_convertor() -> MimeConvertor:
 
 
 
-def request(_request: AbstractRequest, _config: ClientConfig) -> ResponseDataPromise:
-    return app().call(['network.manager', 'request'], _request, _config)
+def request(
+    _request: AbstractRequest,
+    _config: ClientConfig,
+    _sink: Optional[ResponseSink] = None
+) -> ResponseDataPromise:
+    # Optional arguments are passed too, container resolves only the missing ones
+    return app().call(['network.manager', 'request'], _request, _config, None, _sink)
+
+
+async def request_async(_request: AbstractRequest, _config: ClientConfig) -> AbstractResponse:
+    return await network_manager().request_async(_request, _config)
+
+
+def rcl_client(_config: ClientConfig) -> AsyncClient:
+    return network_manager().async_client(_config)
 
 
 def icon(name: str) -> QIcon:
@@ -1,4 +1,5 @@
 from App.helpers import env
+from config import LOGS_PATH
 
 __CONFIG__ = {
     # Socket hostname
@@ -7,11 +8,135 @@ __CONFIG__ = {
     # Socket port
     'port': env('CLIENT_PORT', 9587),
 
+    # Other print servers of the site as 'host:port, host:port'. Calls are routed to the fastest available server
+    # and fail over to others. Printers of all servers are listed together
+    'servers': env('CLIENT_SERVERS', ''),
+
+    # Seconds between latency probes of servers by 'ping' call
+    'servers_probe_interval': env('CLIENT_SERVERS_PROBE_INTERVAL', 30),
+
     # Max len of socket packet (32 Kb)
     'max_bytes_receive': env("CLIENT_MAX_BYTES_RECEIVE", 1024 * 32),
 
+    # Max len of response message (512 Mb). Server sending longer message breaks the protocol, connection is closed
+    'max_message_size': env("CLIENT_MAX_MESSAGE_SIZE", 1024 * 1024 * 512),
+
     # Show debug messages from client connection
     'debug': env("CLIENT_CONNECTION_DEBUG", False),
 
     'timeout': env("CLIENT_CONNECTION_TIMEOUT", 60),
+
+    # Seconds to establish connection. Unreachable server is detected without waiting for the whole timeout
+    'connect_timeout': env("CLIENT_CONNECT_TIMEOUT", 5),
+
+    # Send all calls over one persistent connection per server. Server must repeat request id in responses
+    'multiplex': env("CLIENT_MULTIPLEX", False),
+
+    # Disable Nagle's algorithm for small calls
+    'tcp_nodelay': env("CLIENT_TCP_NODELAY", True),
+
+    # Enable TCP keep-alive probes on persistent connections
+    'keepalive': env("CLIENT_KEEPALIVE", True),
+
+    # Max calls in flight of one asyncio client
+    'concurrency': env("CLIENT_CONCURRENCY", 32),
+
+    # Do not upload files already held by server. Client asks server by content hash first
+    'deduplicate_uploads': {
+        'enabled': env("CLIENT_DEDUPLICATE_UPLOADS", True),
+
+        # Smaller files are uploaded without asking (64 Kb)
+        'min_size': env("CLIENT_DEDUPLICATE_MIN_SIZE", 1024 * 64),
+    },
+
+    # Retries of idempotent calls on connection errors. Delay before attempt N is random in
+    # [0, min(max_delay, base_delay * 2 ^ (N - 2))] seconds
+    'retry': {
+        'attempts': env("CLIENT_RETRY_ATTEMPTS", 3),
+
+        'base_delay': env("CLIENT_RETRY_BASE_DELAY", 0.2),
+
+        'max_delay': env("CLIENT_RETRY_MAX_DELAY", 5),
+
+        # Calls, which are safe to repeat
+        'idempotent': ['ping', 'printers list', 'scan devices'],
+
+        # Seconds for the whole call with retries. Calls not listed are limited by connection timeout only
+        'deadlines': {
+            'ping': env("CLIENT_DEADLINE_PING", 5),
+            'printers list': env("CLIENT_DEADLINE_PRINTERS_LIST", 15),
+            'scan devices': env("CLIENT_DEADLINE_SCAN_DEVICES", 30),
+        },
+    },
+
+    # Calls to server are rejected at once after `failures` connection errors in a row, until `reset_timeout` seconds
+    # pass
+    'circuit_breaker': {
+        'failures': env("CLIENT_CIRCUIT_BREAKER_FAILURES", 5),
+
+        'reset_timeout': env("CLIENT_CIRCUIT_BREAKER_RESET_TIMEOUT", 30),
+    },
+
+    # Responses of read-only calls
+    'cache': {
+        'enabled': env("CLIENT_CACHE_ENABLED", True),
+
+        # Seconds response is returned without call
+        'ttl': {
+            'printers list': env("CLIENT_CACHE_TTL_PRINTERS_LIST", 60),
+            'printers use_cache': env("CLIENT_CACHE_TTL_PRINTERS_USE_CACHE", 300),
+            'scan devices': env("CLIENT_CACHE_TTL_SCAN_DEVICES", 60),
+        },
+
+        # Seconds after ttl response is returned at once and refreshed in background (stale-while-revalidate)
+        'stale_ttl': env("CLIENT_CACHE_STALE_TTL", 600),
+
+        # Calls with these parameters set (reload devices) skip cache and replace cached response
+        'refresh_parameters': ['update-cache', 'update'],
+    },
+
+    # Long-lived connections receiving changes of printers and printing jobs from servers
+    'subscriptions': {
+        'enabled': env("CLIENT_SUBSCRIPTIONS_ENABLED", True),
+
+        # Seconds before reconnecting, doubled on every failed attempt up to `max_reconnect_delay`
+        'reconnect_delay': env("CLIENT_SUBSCRIPTIONS_RECONNECT_DELAY", 1),
+
+        'max_reconnect_delay': env("CLIENT_SUBSCRIPTIONS_MAX_RECONNECT_DELAY", 30),
+
+        # Seconds to follow states of printed job, job is not followed after that
+        'job_timeout': env("CLIENT_SUBSCRIPTIONS_JOB_TIMEOUT", 3600),
+    },
+
+    # Timings of calls by phases (connect, encode, upload, wait, receive, decode). See `tracing` command
+    'tracing': {
+        'enabled': env("CLIENT_TRACING", False),
+
+        # Append every finished call as JSON line to `path`
+        'dump': env("CLIENT_TRACING_DUMP", False),
+
+        'path': f"{LOGS_PATH}/rcl-trace.jsonl",
+    },
+
+    # Binary log of request and response messages of calls. See `replay` command
+    'capture': {
+        'enabled': env("CLIENT_CAPTURE", False),
+
+        'path': f"{LOGS_PATH}/rcl-capture.bin",
+    },
+
+    # Persistent connections pool. Connections are kept per (address, port)
+    'pool': {
+        # Reuse connections between calls. If disabled, every call opens a new connection
+        'enabled': env("CLIENT_POOL_ENABLED", True),
+
+        # Max opened connections to one server
+        'max_connections': env("CLIENT_POOL_MAX_CONNECTIONS", 4),
+
+        # Close connections unused more than this seconds
+        'idle_timeout': env("CLIENT_POOL_IDLE_TIMEOUT", 60),
+
+        # Check idle connections by 'ping' call every this seconds
+        'health_check_interval': env("CLIENT_POOL_HEALTH_CHECK_INTERVAL", 20),
+    },
 }
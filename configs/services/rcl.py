@@ -1,10 +1,32 @@
+import os
+
 from App.helpers import env
-from config import ROOT
+from config import ROOT, CACHE_PATH
 
 __CONFIG__ = {
     # Proto yaml file path
     "proto_file_path": env("PROTO_FILE_PATH", f"{ROOT}/proto.yaml"),
 
-    # Proto max packet size
+    # Compiled proto file cache dir. Set empty to parse proto file on every start
+    "compiled_path": env("PROTO_COMPILED_PATH", os.path.join(CACHE_PATH, "proto")),
+
+    # Proto max packet size (16 Kb). Bigger `bytes` parameters are sent by stream messages of this size
     "max_packet_size": env("PROTO_MAX_PACKET_SIZE", 1024 * 16),
+
+    # Encode and decode headers field by field with validation (slow). Use for protocol debugging only
+    "validate_headers": env("PROTO_VALIDATE_HEADERS", False),
+
+    # Messages compression. Codec of command is set by `compression` in proto file. Codecs are negotiated by 'ping'
+    "compression": {
+        "enabled": env("PROTO_COMPRESSION", True),
+
+        # Smaller messages data is not compressed
+        "threshold": env("PROTO_COMPRESSION_THRESHOLD", 1024),
+
+        # zlib level 1-9
+        "zlib_level": env("PROTO_COMPRESSION_ZLIB_LEVEL", 6),
+
+        # lzma preset 0-9
+        "lzma_preset": env("PROTO_COMPRESSION_LZMA_PRESET", 1),
+    },
 }
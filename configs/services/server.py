@@ -1,9 +1,18 @@
+import os
+
 from App.helpers import env
+from config import CACHE_PATH
 
 __CONFIG__ = {
-    # Socket listen
+    # Socket listen. Connections over the limit wait until one of served connections is closed
     "max_incoming_connections": env("SERVER_MAX_INCOMING_CONNECTION", 10),
 
+    # Worker threads for blocking calls (printing, scanning)
+    "workers": env("SERVER_WORKERS", 4),
+
+    # Calls of all connections waiting for workers. Connections are not read while the queue is full
+    "max_pending_calls": env("SERVER_MAX_PENDING_CALLS", 64),
+
     # Socket hostname
     "address": env("SERVER_ADDRESS", "0.0.0.0"),
 
@@ -21,4 +30,22 @@ __CONFIG__ = {
 
     # Show debug messages for server connection
     "debug": env("SERVER_DEBUG_CONNECTIONS", False),
+
+    # Changes of printers and printing jobs pushed to subscribed clients ('subscribe' call)
+    "events": {
+        # Seconds to collect changes into one message. Item changed several times is sent in the last state
+        "coalesce_interval": env("SERVER_EVENTS_COALESCE_INTERVAL", 0.5),
+
+        # Seconds between polls of CUPS while some client is subscribed
+        "printers_interval": env("SERVER_EVENTS_PRINTERS_INTERVAL", 30),
+        "jobs_interval": env("SERVER_EVENTS_JOBS_INTERVAL", 2),
+    },
+
+    # Printed files by content hash. Clients do not upload files already held here
+    "blobs": {
+        "path": env("SERVER_BLOBS_PATH", os.path.join(CACHE_PATH, "blobs")),
+
+        # Least recently printed files are removed over this size (512 Mb)
+        "max_size": env("SERVER_BLOBS_MAX_SIZE", 1024 * 1024 * 512),
+    },
 }
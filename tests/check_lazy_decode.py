@@ -0,0 +1,89 @@
+"""
+Check that response payload is decoded once: by the first `data()` call of any consumer of the promise.
+
+Run from the project root: python tests/check_lazy_decode.py
+"""
+import os
+import sys
+from threading import Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from App import Application
+
+if not Application(Application.ApplicationType.Console):
+    sys.exit(1)
+
+from App.Core.Network.Client import ResponseDataPromise
+from App.Core.Network.Protocol.Resolvers import ResponseMessageSuccessResolver
+from App.Core.Network.Protocol.Responses import ResponseSuccess
+from App.helpers import app
+
+PAYLOADS = {
+    'json': [{'name': f"printer-{x}", 'available': x % 2 == 0} for x in range(200)],
+    'str': 'x' * 4096,
+}
+
+decodes = [0]
+decode = ResponseMessageSuccessResolver.decode
+
+
+def counted(self, data):
+    decodes[0] += 1
+
+    return decode(self, data)
+
+
+def check(rcl, name: str, payload, codec, binary: bool) -> bool:
+    decodes[0] = 0
+    seen = []
+
+    promise = ResponseDataPromise(rcl)
+    shared = promise.share()
+
+    promise.then(lambda response: seen.append(response.data())).then(lambda response: seen.append(response.data()))
+    shared.then(lambda response: seen.append(response.data()))
+
+    promise.set_result(rcl.create_response(ResponseSuccess(payload), 1, codec, binary))
+
+    ok, response = promise.wait_result()
+    seen.extend([response.data(), response.data(), shared.wait_result()[1].data()])
+
+    threads = [Thread(target=lambda: seen.append(response.data())) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    passed = ok and decodes[0] == 1 and all(x == payload for x in seen)
+
+    print(f"{name:<8}{codec or 'plain':<8}{'binary' if binary else 'json':<8}{decodes[0]} decode(s)  "
+          f"{'ok' if passed else 'FAILED'}")
+
+    return passed
+
+
+def main():
+    rcl = app().get('rcl')
+    codecs = [None, *rcl.compression().codecs()]
+
+    ResponseMessageSuccessResolver.decode = counted
+
+    try:
+        results = [
+            check(rcl, name, payload, codec, binary)
+            for name, payload in PAYLOADS.items()
+            for codec in codecs
+            for binary in (False, True)
+        ]
+    finally:
+        ResponseMessageSuccessResolver.decode = decode
+
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()